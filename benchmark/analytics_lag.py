@@ -0,0 +1,77 @@
+"""
+Event-loop lag while analysing finished matches, inline vs AnalyticsExecutor.
+
+A sampler task sleeps 5 ms in a loop and records how late it wakes up,
+which is the latency a websocket reader would see on a live board.
+
+    python benchmark/analytics_lag.py [matches] [turns]
+"""
+import asyncio
+import random
+import sys
+import time
+
+from autodarts.analytics import AnalyticsExecutor, MatchBatch, analyse_batch
+
+INTERVAL = 0.005
+
+
+def make_match(index: int, turns: int) -> dict:
+    rng = random.Random(index)
+    players = [{"id": f"p{index}-{i}"} for i in range(2)]
+    return {
+        "id": f"m{index}",
+        "finished": True,
+        "players": players,
+        "turns": [
+            {
+                "playerId": players[t % 2]["id"],
+                "points": rng.randint(0, 180),
+                "throws": [{"coords": {"x": rng.gauss(0, 0.3), "y": rng.gauss(0.6, 0.3)}} for _ in range(3)],
+            }
+            for t in range(turns)
+        ],
+    }
+
+
+async def sample_lag(lags: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(INTERVAL)
+        lags.append(time.perf_counter() - start - INTERVAL)
+
+
+async def run(mode: str, matches: list) -> None:
+    if mode == "executor":
+        executor = AnalyticsExecutor(max_pending=8)
+        # Start the worker processes before measuring.
+        await executor.async_analyse(matches[0])
+    lags, stop = [], asyncio.Event()
+    sampler = asyncio.create_task(sample_lag(lags, stop))
+    start = time.perf_counter()
+    if mode == "inline":
+        for state in matches:
+            analyse_batch(MatchBatch.from_state(state))
+            await asyncio.sleep(0)
+    else:
+        await asyncio.gather(*(executor.async_analyse(state) for state in matches))
+        executor.close()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await sampler
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0
+    print(f"{mode:9} total {elapsed:6.2f}s  lag p99 {p99 * 1000:7.2f}ms  max {lags[-1] * 1000 if lags else 0:7.2f}ms")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    matches = [make_match(i, turns) for i in range(count)]
+    print(f"{count} matches of {turns} turns")
+    asyncio.run(run("inline", matches))
+    asyncio.run(run("executor", matches))
+
+
+if __name__ == "__main__":
+    main()
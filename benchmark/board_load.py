@@ -0,0 +1,41 @@
+"""
+Stress the client with simulated boards on the fake server.
+
+    python benchmark/board_load.py [--boards N] [--rate R] [--profile steady|bursty|jittery]
+                                   [--duration S] [--uvloop]
+"""
+import argparse
+import asyncio
+
+import aiohttp
+
+from autodarts import AutoDartSession
+from autodarts.loadgen import BoardLoadGenerator, LoadProfile
+from autodarts.runner import new_event_loop
+from autodarts.testing import FakeAutodartsServer
+
+
+async def main(args) -> None:
+    async with FakeAutodartsServer() as server:
+        generator = BoardLoadGenerator(server, boards=args.boards, profile=LoadProfile.named(args.profile, args.rate))
+        session = AutoDartSession(**server.session_kwargs(), connector=aiohttp.TCPConnector(limit=0))
+        try:
+            report = await generator.async_run(session, duration=args.duration)
+        finally:
+            await session.async_close()
+        print(f"{args.profile} {args.rate}/s per board: {report}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--boards", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=1.0, help="throws per second per board")
+    parser.add_argument("--profile", default="steady", choices=["steady", "bursty", "jittery"])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--uvloop", action="store_true")
+    args = parser.parse_args()
+    loop = new_event_loop(args.uvloop)
+    try:
+        loop.run_until_complete(main(args))
+    finally:
+        loop.close()
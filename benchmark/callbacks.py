@@ -0,0 +1,85 @@
+"""
+Callback dispatch and unregister with 1k callbacks: CallbackRegistry vs the
+former dict-of-lists storage (emulated here).
+
+    python benchmark/callbacks.py [callbacks] [frames]
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import defaultdict
+
+from autodarts.callbacks import CallbackRegistry
+
+EVENTS = [f"Event {i}" for i in range(50)]
+
+
+class LegacyRegistry:
+    """The dict-of-lists storage and dispatch AutoDartEndpointWs used before CallbackRegistry."""
+
+    def __init__(self) -> None:
+        self.event_cb = defaultdict(list)
+        self.async_event_cb = defaultdict(list)
+
+    def register(self, cb, event=None):
+        self.event_cb[event].append(cb)
+        return lambda: self.event_cb[event].remove(cb)
+
+    async def dispatch(self, event, payload):
+        if event:
+            for cb in self.async_event_cb.get(event, []):
+                await cb(payload)
+            for cb in self.event_cb.get(event, []):
+                cb(payload)
+        for cb in self.async_event_cb.get(None, []):
+            await cb(payload)
+        for cb in self.event_cb.get(None, []):
+            cb(payload)
+
+
+def noop(payload) -> None:
+    pass
+
+
+async def bench(name: str, registry, register, dispatch, count: int, frames: int, events=EVENTS) -> None:
+    rng = random.Random(0)
+    unregisters = [
+        register(lambda payload: None, rng.choice(events + [None] * 2)) for _ in range(count)
+    ]
+    events = [rng.choice(events) for _ in range(frames)]
+
+    start = time.perf_counter()
+    for event in events:
+        await dispatch(event, {})
+    dispatch_time = time.perf_counter() - start
+
+    rng.shuffle(unregisters)
+    start = time.perf_counter()
+    for unregister in unregisters:
+        unregister()
+    unregister_time = time.perf_counter() - start
+    print(f"{name:8} dispatch {frames / dispatch_time:10.0f} frames/s   unregister {count} in {unregister_time * 1000:7.2f}ms")
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    print(f"{count} callbacks, {frames} frames")
+
+    for label, events in (("spread", EVENTS), ("one event", EVENTS[:1])):
+        print(f"callbacks on {label}:")
+        legacy = LegacyRegistry()
+        asyncio.run(bench("legacy", legacy, legacy.register, legacy.dispatch, count, frames, events))
+
+        registry = CallbackRegistry(["state"])
+        asyncio.run(bench(
+            "indexed", registry,
+            lambda cb, event: registry.register(cb, event, "state", is_async=False),
+            lambda event, payload: registry.dispatch("state", event, payload),
+            count, frames, events,
+        ))
+
+
+if __name__ == "__main__":
+    main()
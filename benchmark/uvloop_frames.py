@@ -0,0 +1,122 @@
+"""
+Frame throughput of AutoDartEndpointWs on the asyncio and uvloop loops.
+
+A local websocket stub server, in its own process on the default loop,
+answers the subscriptions of a board with a burst of state frames and
+closes. The client side parses and dispatches every frame through
+AutoDartEndpointWs, with a few callbacks registered, until the reader
+task ends.
+
+    python benchmark/uvloop_frames.py [frames] [rounds]
+"""
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+import weakref
+
+import aiohttp
+from aiohttp import web
+
+from autodarts.endpoint import AutoDartEndpointWs
+from autodarts.runner import new_event_loop, uvloop_available
+
+BOARD_ID = "stub-board"
+
+
+def serve(port_queue, frames: int) -> None:
+    state_frames = [
+        json.dumps({
+            "channel": "autodarts.boards",
+            "topic": f"{BOARD_ID}.state",
+            "data": {
+                "event": "Throw detected",
+                "numThrows": i % 3 + 1,
+                "throws": [{"segment": {"name": "T20", "number": 20, "multiplier": 3},
+                            "coords": {"x": 0.01 * (i % 7), "y": 0.61}}] * (i % 3 + 1),
+            },
+        })
+        for i in range(frames)
+    ]
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        # Wait for the state and event subscriptions.
+        await ws.receive()
+        await ws.receive()
+        for frame in state_frames:
+            await ws.send_str(frame)
+        await ws.close()
+        return ws
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/ws", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port_queue.put(site._server.sockets[0].getsockname()[1])
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+class StubSession:
+    """The parts of AutoDartSession used by the websocket reader, without authentication."""
+
+    def __init__(self) -> None:
+        self.session = aiohttp.ClientSession()
+        self.entities = weakref.WeakValueDictionary()
+
+    async def headers(self) -> dict:
+        return {}
+
+
+async def run_round(url: str) -> float:
+    session = StubSession()
+    board = AutoDartEndpointWs({"id": BOARD_ID}, session, "boards", "autodarts.boards", ws_url=url)
+    board.heartbeat_interval = 0
+    throws = []
+    board.register_callback(lambda state: throws.append(state["state"]["numThrows"]), "Throw detected")
+    board.register_callback(lambda state: None)
+    ended = asyncio.Event()
+    board.register_callback(lambda data: ended.set(), "task_ended", topic="events")
+
+    start = time.perf_counter()
+    board.connect()
+    await ended.wait()
+    elapsed = time.perf_counter() - start
+    await session.session.close()
+    return len(throws) / elapsed
+
+
+def bench(name: str, url: str, use_uvloop: bool, rounds: int) -> None:
+    loop = new_event_loop(use_uvloop)
+    try:
+        rates = [loop.run_until_complete(run_round(url)) for _ in range(rounds + 1)][1:]
+    finally:
+        loop.close()
+    rates.sort()
+    print(f"{name:8} {type(loop).__module__:16} median {rates[len(rates) // 2]:9.0f} frames/s"
+          f"  best {rates[-1]:9.0f} frames/s")
+
+
+if __name__ == "__main__":
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve, args=(port_queue, frames), daemon=True)
+    server.start()
+    url = f"http://127.0.0.1:{port_queue.get()}/ws"
+    try:
+        bench("asyncio", url, False, rounds)
+        if uvloop_available():
+            bench("uvloop", url, True, rounds)
+        else:
+            print("uvloop is not installed, pip install autodarts[uvloop]")
+    finally:
+        server.terminate()
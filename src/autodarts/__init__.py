@@ -5,4 +5,23 @@ from .lobby import Lobby
 from .session import AutoDartSession
 from .player import Player
 from .match import Match
-from .endpoint import AutoDartException, AutoDartMissingIdException, AutoDartInvalidStateException
\ No newline at end of file
+from .endpoint import AutoDartException, AutoDartMissingIdException, AutoDartInvalidStateException
+from .stats import BulkStatsFetcher, StatsTable, async_bulk_stats
+from .scoring import X01Scorer, PlayerScore
+from .snapshot import SnapshotStore
+from .archive import EventArchive
+from .health import ConnectionHealth
+from .heatmap import Heatmap, HeatmapAccumulator
+from .analytics import AnalyticsExecutor
+from .sync import SyncClient, SyncProxy
+from .history import EventHistory, EventRecord
+from .runner import run, new_event_loop, uvloop_available, cancel_all_tasks
+from .tournament import Fixture, TournamentScheduler, round_robin, single_elimination
+from .throwlog import ThrowLogReader, ThrowLogWriter
+from .commands import BoardCommand, BoardCommandQueue
+from .selectors import Selector, depends_on, current_remaining, darts_left, leg_average
+from .profiler import FrameProfiler, SlowRecord, StageStats
+from .sharding import HashRing, ShardCoordinator, ShardFrame
+from .livetable import LiveStateTable, LiveStateReader
+from .relay import RelayClient, RelayServer
+from .simulator import ThrowSimulator, checkout_routes, classify_codes
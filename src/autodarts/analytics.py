@@ -0,0 +1,230 @@
+from typing import Any, Callable, Dict, List, Optional, Set
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import math
+import os
+
+from .match import Match
+from .segments import SEGMENTS, classify_code
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+HEATMAP_BINS = 32
+HEATMAP_EXTENT = 1.2
+
+
+class MatchBatch:
+    """
+    Array-encoded throws and turns of a match, cheap to send to a worker process.
+
+    Attributes:
+    - match_id (str): The match ID.
+    - players (List[str]): The player IDs, by index.
+    - throw_player (bytes): uint8 player index of each throw.
+    - throw_x (bytes): float32 x of each throw (NaN without coords).
+    - throw_y (bytes): float32 y of each throw (NaN without coords).
+    - turn_player (bytes): uint8 player index of each turn.
+    - turn_points (bytes): int16 points of each turn.
+    """
+
+    __slots__ = ("match_id", "players", "throw_player", "throw_x", "throw_y", "turn_player", "turn_points")
+
+    def __init__(self, match_id: str, players: List[str], throw_player: bytes, throw_x: bytes, throw_y: bytes,
+                 turn_player: bytes, turn_points: bytes) -> None:
+        self.match_id = match_id
+        self.players = players
+        self.throw_player = throw_player
+        self.throw_x = throw_x
+        self.throw_y = throw_y
+        self.turn_player = turn_player
+        self.turn_points = turn_points
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "MatchBatch":
+        """Encode the turns and throws of a match state."""
+        players = [p.get("id") for p in state.get("players") or []]
+        index = {player_id: i for i, player_id in enumerate(players)}
+        throw_player, throw_x, throw_y = array("B"), array("f"), array("f")
+        turn_player, turn_points = array("B"), array("h")
+        for turn in state.get("turns") or []:
+            player = index.get(turn.get("playerId"), 255)
+            turn_player.append(player)
+            turn_points.append(0 if turn.get("busted") else int(turn.get("points") or 0))
+            for throw in turn.get("throws") or []:
+                coords = throw.get("coords") or {}
+                throw_player.append(player)
+                throw_x.append(coords.get("x", float("nan")))
+                throw_y.append(coords.get("y", float("nan")))
+        return cls(state.get("id"), players, throw_player.tobytes(), throw_x.tobytes(), throw_y.tobytes(),
+                   turn_player.tobytes(), turn_points.tobytes())
+
+
+def analyse_batch(batch: MatchBatch) -> Dict[str, Any]:
+    """
+    Compute the post-match analysis of a batch, in a worker process.
+
+    Every throw with coords is classified into a segment, and binned into a
+    coarse heatmap per player. Turn points give averages and score bands.
+
+    Returns:
+    Dict[str, Any]: The match ID and, per player ID, the darts, classified points,
+    segment hits, turn stats and heatmap counts.
+    """
+    throw_player = array("B", batch.throw_player)
+    throw_x, throw_y = array("f"), array("f")
+    throw_x.frombytes(batch.throw_x)
+    throw_y.frombytes(batch.throw_y)
+    turn_player, turn_points = array("B"), array("h")
+    turn_player.frombytes(batch.turn_player)
+    turn_points.frombytes(batch.turn_points)
+
+    scale = HEATMAP_BINS / (2 * HEATMAP_EXTENT)
+    players = {
+        i: {"darts": 0, "points": 0, "segments": {}, "turns": 0, "turn_points": 0, "max_turn": 0,
+            "100+": 0, "140+": 0, "180": 0, "heatmap": [0] * (HEATMAP_BINS * HEATMAP_BINS)}
+        for i in range(len(batch.players))
+    }
+
+    for player, x, y in zip(throw_player, throw_x, throw_y):
+        stats = players.get(player)
+        if stats is None or x != x or y != y:
+            continue
+        name, number, multiplier = SEGMENTS[classify_code(x, y)]
+        stats["darts"] += 1
+        stats["points"] += number * multiplier
+        stats["segments"][name] = stats["segments"].get(name, 0) + 1
+        row = math.floor((HEATMAP_EXTENT - y) * scale)
+        col = math.floor((x + HEATMAP_EXTENT) * scale)
+        if 0 <= row < HEATMAP_BINS and 0 <= col < HEATMAP_BINS:
+            stats["heatmap"][row * HEATMAP_BINS + col] += 1
+
+    for player, points in zip(turn_player, turn_points):
+        stats = players.get(player)
+        if stats is None:
+            continue
+        stats["turns"] += 1
+        stats["turn_points"] += points
+        stats["max_turn"] = max(stats["max_turn"], points)
+        stats["100+"] += 100 <= points < 140
+        stats["140+"] += 140 <= points < 180
+        stats["180"] += points == 180
+
+    for stats in players.values():
+        stats["average"] = stats["turn_points"] / stats["turns"] if stats["turns"] else 0.0
+
+    return {
+        "match_id": batch.match_id,
+        "players": {batch.players[i]: stats for i, stats in players.items()},
+    }
+
+
+def _init_worker(niceness: int) -> None:
+    """Lower the priority of a worker process, so live websocket readers keep the CPU."""
+    if niceness and hasattr(os, "nice"):
+        os.nice(niceness)
+
+
+class AnalyticsExecutor:
+    """
+    Run post-match analysis in a process pool, off the event loop.
+
+    Submissions are bounded: at most ``max_pending`` batches are queued or
+    running, further submissions wait for a slot.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: int = 32,
+                 analyse: Callable[[MatchBatch], Any] = analyse_batch, niceness: int = 10) -> None:
+        """
+        Initialize an AnalyticsExecutor instance.
+
+        Parameters:
+        - max_workers (int|None): The number of worker processes, the CPU count if None.
+        - max_pending (int): The maximum number of batches submitted and not done.
+        - analyse (Callable): The picklable function run on each batch.
+        - niceness (int): The priority decrease of the worker processes (POSIX only).
+
+        Returns:
+        None
+        """
+        self.pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(niceness,))
+        self.analyse = analyse
+        self._semaphore = asyncio.Semaphore(max_pending)
+        # The analyses started by attach(), referenced until they end.
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def async_analyse(self, state: Dict[str, Any]) -> Any:
+        """
+        Analyse a finished match state.
+
+        Parameters:
+        - state (Dict[str, Any]): The match state, with its turns.
+
+        Returns:
+        Any: The result of the analyse function.
+        """
+        async with self._semaphore:
+            # Encode only when a slot is free, so a burst of submissions doesn't stall the loop.
+            batch = MatchBatch.from_state(state)
+            return await asyncio.get_running_loop().run_in_executor(self.pool, self.analyse, batch)
+
+    def attach(self, match: Match, on_result: Callable[[Any], Any]) -> Callable[[], None]:
+        """
+        Analyse a match when it finishes.
+
+        Parameters:
+        - match (Match): The match, connected to receive frames.
+        - on_result (Callable): Called with the result, awaited if it is a coroutine function.
+
+        Returns:
+        Callable[[], None]: The function to detach the executor.
+        """
+        async def analyse(state):
+            try:
+                result = await self.async_analyse(state)
+            except Exception as e:
+                logger.warning(f"Analysis of match {match.id} failed: {e}")
+                return
+            if asyncio.iscoroutinefunction(on_result):
+                await on_result(result)
+            else:
+                on_result(result)
+
+        def on_state(state):
+            if state.get("finished") and not done:
+                detach()
+                # Don't hold the websocket reader while waiting for a pool slot.
+                task = asyncio.create_task(analyse(dict(state)))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+        done = []
+        unregister = match.register_callback(on_state)
+
+        def detach() -> None:
+            if not done:
+                done.append(True)
+                unregister()
+        return detach
+
+    def close(self, wait: bool = True) -> None:
+        """Cancel the analyses of attached matches still running and shut the process pool down."""
+        for task in list(self._tasks):
+            task.cancel()
+        self._tasks.clear()
+        self.pool.shutdown(wait=wait)
+
+    async def async_close(self) -> None:
+        """Wait for the analyses of attached matches, then shut the process pool down."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -0,0 +1,336 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+from .session import AutoDartException
+from .endpoint import AutoDartEndpointWs
+from .match import Match, ThrowCursor
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS matches (
+    id TEXT PRIMARY KEY,
+    variant TEXT,
+    base_score INTEGER,
+    created_at TEXT,
+    finished INTEGER,
+    winner INTEGER,
+    updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS legs (
+    match_id TEXT,
+    set_no INTEGER,
+    leg_no INTEGER,
+    winner INTEGER,
+    PRIMARY KEY (match_id, set_no, leg_no)
+);
+CREATE TABLE IF NOT EXISTS turns (
+    id TEXT PRIMARY KEY,
+    match_id TEXT,
+    set_no INTEGER,
+    leg_no INTEGER,
+    round INTEGER,
+    player_id TEXT,
+    player_index INTEGER,
+    points INTEGER,
+    busted INTEGER,
+    ts REAL
+);
+CREATE TABLE IF NOT EXISTS throws (
+    turn_id TEXT,
+    idx INTEGER,
+    match_id TEXT,
+    player_id TEXT,
+    segment TEXT,
+    number INTEGER,
+    multiplier INTEGER,
+    x REAL,
+    y REAL,
+    ts REAL,
+    PRIMARY KEY (turn_id, idx)
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    entity_id TEXT,
+    event TEXT,
+    ts REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS turns_player ON turns (player_id, ts);
+CREATE INDEX IF NOT EXISTS turns_match ON turns (match_id, set_no, leg_no);
+CREATE INDEX IF NOT EXISTS throws_player ON throws (player_id, ts);
+CREATE INDEX IF NOT EXISTS throws_match ON throws (match_id);
+CREATE INDEX IF NOT EXISTS events_entity ON events (entity_id, ts);
+"""
+
+STATEMENTS = {
+    "match": "INSERT OR REPLACE INTO matches VALUES (?, ?, ?, ?, ?, ?, ?)",
+    "leg": "INSERT OR REPLACE INTO legs VALUES (?, ?, ?, ?)",
+    "turn": "INSERT OR REPLACE INTO turns VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "throw": "INSERT OR REPLACE INTO throws VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+    "event": "INSERT INTO events (entity_id, event, ts, data) VALUES (?, ?, ?, ?)",
+    # Undone throws: (turn ID, first undone index), and turns removed by an undo: (turn ID,).
+    "undo_throws": "DELETE FROM throws WHERE turn_id = ? AND idx >= ?",
+    "undo_turn": "DELETE FROM turns WHERE id = ?",
+}
+
+_STOP = object()
+
+
+class EventArchive:
+    """
+    Archive match throws and entity events into SQLite.
+
+    Rows are queued from the event loop and written by a dedicated thread in
+    bulk transactions. The queue is bounded: when it is full, the async
+    callbacks wait for room, which slows the websocket reader down instead
+    of growing memory.
+    """
+
+    def __init__(self, path: str, max_queue: int = 10000, batch_size: int = 500, flush_interval: float = 1.0) -> None:
+        """
+        Initialize an EventArchive instance.
+
+        Parameters:
+        - path (str): The SQLite database path.
+        - max_queue (int): The maximum number of rows waiting to be written.
+        - batch_size (int): The maximum number of rows per transaction.
+        - flush_interval (float): The maximum seconds a row waits before being written.
+
+        Returns:
+        None
+        """
+        self.path = path
+        self.queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.thread: Optional[threading.Thread] = None
+        self._cursors: Dict[str, ThrowCursor] = {}
+        self._legs: Dict[str, Tuple[Any, Any, Any]] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def start(self) -> None:
+        """Create the schema and start the writer thread."""
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+        self.thread = threading.Thread(target=self._writer, name="autodarts-archive", daemon=True)
+        self.thread.start()
+
+    def close(self) -> None:
+        """Write the queued rows and stop the writer thread."""
+        if self.thread:
+            self.queue.put(_STOP)
+            self.thread.join()
+            self.thread = None
+
+    async def async_close(self) -> None:
+        """Write the queued rows and stop the writer thread, without blocking the loop."""
+        await asyncio.to_thread(self.close)
+
+    def _writer(self) -> None:
+        db = self._connect()
+        try:
+            running = True
+            while running:
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        running = False
+                        break
+                    batch.append(item)
+                if batch:
+                    self._write(db, batch)
+        finally:
+            db.close()
+
+    def _write(self, db: sqlite3.Connection, batch: List[Tuple[str, tuple]]) -> None:
+        # Runs of rows of the same kind, in order, so an undo only deletes the throws queued before it.
+        runs: List[Tuple[str, List[tuple]]] = []
+        for kind, row in batch:
+            if runs and runs[-1][0] == kind:
+                runs[-1][1].append(row)
+            else:
+                runs.append((kind, [row]))
+        try:
+            with db:
+                for kind, values in runs:
+                    db.executemany(STATEMENTS[kind], values)
+            self.written += len(batch)
+        except Exception as e:
+            # The writer thread keeps going, a bad batch only loses its own rows.
+            logger.error(f"Can't archive {len(batch)} rows: {e}")
+
+    @staticmethod
+    def _check_kind(kind: str) -> None:
+        if kind not in STATEMENTS:
+            raise AutoDartException(f"Unknown archive row kind {kind}, expected one of {', '.join(STATEMENTS)}")
+
+    def put(self, kind: str, row: tuple) -> None:
+        """Queue a row, blocking when the queue is full."""
+        self._check_kind(kind)
+        self.queue.put((kind, row))
+
+    async def async_put(self, kind: str, row: tuple) -> None:
+        """Queue a row, waiting without blocking the loop when the queue is full."""
+        self._check_kind(kind)
+        try:
+            self.queue.put_nowait((kind, row))
+        except queue.Full:
+            await asyncio.to_thread(self.queue.put, (kind, row))
+
+    def match_rows(self, state: Dict[str, Any]) -> List[Tuple[str, tuple]]:
+        """
+        Get the rows to write for a match state frame.
+
+        Only the turns with new throws are returned, with their new throws,
+        after the deletes of the throws undone since the last frame.
+        """
+        match_id = state.get("id")
+        now = time.time()
+        rows = []
+        cursor = self._cursors.setdefault(match_id, ThrowCursor())
+        players = {p.get("id"): i for i, p in enumerate(state.get("players") or [])}
+
+        leg = (state.get("set"), state.get("leg"), state.get("gameWinner") if state.get("gameFinished") else None)
+        if self._legs.get(match_id) != leg:
+            self._legs[match_id] = leg
+            rows.append(("leg", (match_id, leg[0], leg[1], leg[2])))
+            rows.append(("match", self._match_row(state, now)))
+        elif state.get("finished"):
+            rows.append(("match", self._match_row(state, now)))
+
+        turns = {}
+        new_throws = cursor.advance(state)
+        for key, turn in cursor.rewound_turns:
+            if turn is not None:
+                rows.append(("undo_throws", (self._turn_id(match_id, state, turn), len(turn.get("throws") or []))))
+            else:
+                # Only the key of a removed turn is left: its ID, or (round, player ID).
+                turn_id = key if isinstance(key, str) else self._turn_id(match_id, state,
+                                                                         {"round": key[0], "playerId": key[1]})
+                rows.append(("undo_throws", (turn_id, 0)))
+                rows.append(("undo_turn", (turn_id,)))
+        # The new throws of a turn are the last ones of its list.
+        index = {}
+        for turn, throw in new_throws:
+            index[id(turn)] = index.get(id(turn), len(turn["throws"])) - 1
+        for turn, throw in new_throws:
+            idx = index[id(turn)]
+            index[id(turn)] += 1
+            turn_id = self._turn_id(match_id, state, turn)
+            if turn_id not in turns:
+                turns[turn_id] = turn
+                rows.append(("turn", (
+                    turn_id, match_id, state.get("set"), state.get("leg"), turn.get("round"),
+                    turn.get("playerId"), players.get(turn.get("playerId")),
+                    turn.get("points"), int(bool(turn.get("busted"))), now,
+                )))
+            segment = throw.get("segment") or {}
+            coords = throw.get("coords") or {}
+            rows.append(("throw", (
+                turn_id, idx, match_id, turn.get("playerId"),
+                segment.get("name"), segment.get("number"), segment.get("multiplier"),
+                coords.get("x"), coords.get("y"), now,
+            )))
+
+        if state.get("finished"):
+            self._cursors.pop(match_id, None)
+            self._legs.pop(match_id, None)
+        return rows
+
+    @staticmethod
+    def _turn_id(match_id: str, state: Dict[str, Any], turn: Dict[str, Any]) -> str:
+        return turn.get("id") or f"{match_id}:{state.get('set')}:{state.get('leg')}:{turn.get('round')}:{turn.get('playerId')}"
+
+    @staticmethod
+    def _match_row(state: Dict[str, Any], now: float) -> tuple:
+        return (
+            state.get("id"), state.get("variant"), (state.get("settings") or {}).get("baseScore"),
+            state.get("createdAt"), int(bool(state.get("finished"))), state.get("winner"), now,
+        )
+
+    def attach(self, entity: AutoDartEndpointWs) -> Callable[[], None]:
+        """
+        Archive the frames of an entity.
+
+        A Match archives its turns and throws from state frames. Every entity
+        archives its events (state frames carrying an event, and the events topic).
+
+        Parameters:
+        - entity (AutoDartEndpointWs): The entity, connected to receive frames.
+
+        Returns:
+        Callable[[], None]: The function to detach the archive.
+        """
+        async def on_state(state):
+            if isinstance(entity, Match):
+                for kind, row in self.match_rows(state):
+                    await self.async_put(kind, row)
+            # The frame of this call, a replayed one may be older than ws_data.
+            data = entity.frame_data(state)
+            if data.get("event"):
+                await self.async_put("event", (entity.id, data.get("event"), time.time(), json.dumps(data, default=str)))
+
+        async def on_event(data):
+            await self.async_put("event", (entity.id, data.get("event"), time.time(), json.dumps(data, default=str)))
+
+        unregisters = [
+            entity.register_async_callback(on_state, topic="state"),
+            entity.register_async_callback(on_event, topic="events"),
+        ]
+
+        def detach() -> None:
+            for unregister in unregisters:
+                unregister()
+        return detach
+
+    def _query(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        db = sqlite3.connect(self.path)
+        db.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in db.execute(sql, params)]
+        finally:
+            db.close()
+
+    async def async_player_throws(self, player_id: str, since: float = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get the last throws of a player, most recent first (uses the throws_player index)."""
+        return await asyncio.to_thread(
+            self._query,
+            "SELECT * FROM throws WHERE player_id = ? AND ts >= ? ORDER BY ts DESC LIMIT ?",
+            (player_id, since, limit),
+        )
+
+    async def async_player_turns(self, player_id: str, since: float = 0, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Get the last turns of a player, most recent first (uses the turns_player index)."""
+        return await asyncio.to_thread(
+            self._query,
+            "SELECT * FROM turns WHERE player_id = ? AND ts >= ? ORDER BY ts DESC LIMIT ?",
+            (player_id, since, limit),
+        )
+
+    async def async_player_segments(self, player_id: str, since: float = 0) -> Dict[str, int]:
+        """Get how many times a player hit each segment."""
+        rows = await asyncio.to_thread(
+            self._query,
+            "SELECT segment, COUNT(*) AS hits FROM throws WHERE player_id = ? AND ts >= ? GROUP BY segment",
+            (player_id, since),
+        )
+        return {row["segment"]: row["hits"] for row in rows}
@@ -2,6 +2,8 @@ from typing import Optional, List
 
 from .endpoint import AutoDartEndpointWs, AutoDartBase, AutoDartEndpoint
 from .session import AutoDartSession
+from .commands import BoardCommandQueue
+import aiohttp
 
 import logging
 
@@ -56,23 +58,31 @@ class CloudBoard(AutoDartEndpointWs):
         'Throw detected',
     ]
 
-    def __init__(self, state: dict, session: AutoDartSession, ws_url: str = AutoDartEndpointWs.WS_ENDPOINT,
-                 endpoint: str = ENDPOINT, channel: str = CHANNEL, api_url: str = AutoDartEndpoint.API_URL) -> None:
+    def __init__(self, state: dict, session: AutoDartSession, ws_url: Optional[str] = None,
+                 endpoint: str = ENDPOINT, channel: str = CHANNEL, api_url: Optional[str] = None) -> None:
         """
         Initialize a CloudBoard instance.
 
         Parameters:
         - state (dict): The initial state of the dartboard.
         - session (AutoDartSession): The session object for making API requests.
-        - ws_url (str): The WebSocket endpoint URL.
+        - ws_url (str|None): The WebSocket endpoint URL, the one of the session if None.
         - endpoint (str): The API endpoint for the dartboard.
         - channel (str): The WebSocket channel for dartboard events.
-        - api_url (str): The base API URL.
+        - api_url (str|None): The base API URL, the one of the session if None.
 
         Returns:
         None
         """
         super().__init__(state, session, endpoint, ws_url=ws_url, api_url=api_url, channel=channel)
+        self._commands: Optional[BoardCommandQueue] = None
+
+    @property
+    def commands(self) -> BoardCommandQueue:
+        """Get the queue serializing and coalescing the start, stop and reset commands of the dartboard."""
+        if self._commands is None :
+            self._commands = BoardCommandQueue(self)
+        return self._commands
 
     @property
     def name(self) -> Optional[str]:
@@ -141,32 +151,41 @@ class CloudBoard(AutoDartEndpointWs):
     async def async_load(self):
         """Asynchronously load the state of the entity."""
         await self.async_load_data()
+        self.invalidate_selectors()
     
     async def async_load_data(self):
         """Asynchronously load the state of the entity."""
-        board = await self.__class__.from_id(self.session,self.id)
-        self._state.update(board._state)
+        async for board in self.__class__.factory(self.session) :
+            if board.id == self.id :
+                if board is not self :
+                    self._state.update(board._state)
+                return
     
     async def async_load_state(self):
         """Asynchronously load the state of the entity."""
         if self.state.get('connected') :
             self._state["state"].update(await (await self.session.get(self.get_endpoint("state"), timeout=10)).json())
     
-    async def async_start(self) -> None:
-        """Start the dartboard."""
-        await self.session.put(self.get_endpoint("start"))
+    async def async_start(self) -> aiohttp.ClientResponse:
+        """Start the dartboard, see commands to serialize and coalesce the control commands."""
+        return await self.async_optimistic("start", self.session.put(self.get_endpoint("start")), {"running": True})
 
-    async def async_stop(self) -> None:
-        """Stop the dartboard."""
-        await self.session.put(self.get_endpoint("stop"))
+    async def async_stop(self) -> aiohttp.ClientResponse:
+        """Stop the dartboard, see commands to serialize and coalesce the control commands."""
+        return await self.async_optimistic("stop", self.session.put(self.get_endpoint("stop")), {"running": False})
 
-    async def async_reset(self) -> None:
-        """Reset the dartboard."""
-        await self.session.put(self.get_endpoint("reset"))
+    async def async_reset(self) -> aiohttp.ClientResponse:
+        """Reset the dartboard, see commands to serialize and coalesce the control commands."""
+        return await self.async_optimistic("reset", self.session.put(self.get_endpoint("reset")), {"numThrows": 0, "throws": []})
     
     @classmethod
     async def from_id(cls, session: AutoDartSession, id: str) -> "AutoDartEndpoint":
-        """Create an instance of the entity from its ID."""
+        """Get the instance of the entity from its ID, the live one if any."""
+        board = cls.lookup(session, id)
+        if board is not None :
+            if not board.is_connected :
+                await board.async_load()
+            return board
         async for board in cls.factory(session) :
             if board.id == id :
                 return board
@@ -0,0 +1,174 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import fnmatch
+import inspect
+import itertools
+import time
+import weakref
+
+PATTERN_CHARS = set("*?[")
+
+
+def is_pattern(event: Optional[str]) -> bool:
+    """Check if an event name is a glob pattern, such as ``Throw*``."""
+    return event is not None and not PATTERN_CHARS.isdisjoint(event)
+
+
+def event_matches(event: Optional[str], pattern: str) -> bool:
+    """Check if an event is selected by an event name or glob pattern, as in dispatch."""
+    if is_pattern(pattern):
+        return event is not None and fnmatch.fnmatchcase(event, pattern)
+    return event == pattern
+
+
+class CallbackRegistry:
+    """
+    Callbacks indexed by (topic, event).
+
+    Registration returns an unregister function working in O(1). The
+    callbacks of a (topic, event) are resolved once into a dispatch tuple,
+    cached until a registration of that topic changes. Events may be glob
+    patterns, and callbacks may be held by weak reference, in which case
+    they unregister themselves when collected.
+
+    Dispatch order: async then sync callbacks of the event (exact or
+    pattern), then async then sync callbacks of all events (event None),
+    each in registration order.
+    """
+
+    def __init__(self, topics: Iterable[str]) -> None:
+        """
+        Initialize a CallbackRegistry instance.
+
+        Parameters:
+        - topics (Iterable[str]): The supported topics.
+
+        Returns:
+        None
+        """
+        self.topics = tuple(topics)
+        self._exact: Dict[Tuple[str, Optional[str]], Dict[int, tuple]] = {}
+        self._patterns: Dict[str, Dict[int, tuple]] = {topic: {} for topic in self.topics}
+        self._cache: Dict[str, Dict[Optional[str], tuple]] = {topic: {} for topic in self.topics}
+        self._tokens = itertools.count()
+
+    def register(self, cb: Callable, event: Optional[str] = None, topic: str = "state",
+                 is_async: Optional[bool] = None, weak: bool = False) -> Callable[[], None]:
+        """
+        Register a callback.
+
+        Parameters:
+        - cb (Callable): The callback.
+        - event (str|None): The event name or glob pattern, all events if None.
+        - topic (str): The topic.
+        - is_async (bool|None): If the callback is awaited, detected if None.
+        - weak (bool): Hold the callback by weak reference (WeakMethod for bound methods).
+
+        Returns:
+        Callable[[], None]: The function to unregister the callback.
+        """
+        if is_async is None:
+            is_async = inspect.iscoroutinefunction(cb)
+        token = next(self._tokens)
+        pattern = is_pattern(event)
+        bucket = self._patterns[topic] if pattern else self._exact.setdefault((topic, event), {})
+
+        cache = self._cache[topic]
+        key = None if pattern else event
+
+        def unregister(*_) -> None:
+            if bucket.pop(token, None) is not None:
+                if key is None:
+                    cache.clear()
+                else:
+                    cache.pop(key, None)
+
+        if weak:
+            ref = weakref.WeakMethod(cb, unregister) if inspect.ismethod(cb) else weakref.ref(cb, unregister)
+            entry = (token, is_async, True, ref, event if pattern else None)
+        else:
+            entry = (token, is_async, False, cb, event if pattern else None)
+        bucket[token] = entry
+        self._invalidate(topic, None if pattern else event)
+        return unregister
+
+    def _invalidate(self, topic: str, event: Optional[str]) -> None:
+        if event is None:
+            # Patterns and catch-all callbacks are part of every dispatch tuple of the topic.
+            self._cache[topic].clear()
+        else:
+            self._cache[topic].pop(event, None)
+
+    def dispatch_tuple(self, topic: str, event: Optional[str]) -> Tuple[bool, tuple]:
+        """
+        Get the callbacks of a frame.
+
+        The result is computed once per (topic, event) and cached.
+
+        Returns:
+        Tuple[bool, tuple]: (True, callbacks) when they are all sync and strongly
+        referenced, else (False, (is_async, weak, callback) tuples).
+        """
+        cache = self._cache[topic]
+        dispatch = cache.get(event)
+        if dispatch is None:
+            matched = []
+            if event is not None:
+                matched.extend(self._exact.get((topic, event), {}).values())
+                matched.extend(
+                    entry for entry in self._patterns[topic].values() if event_matches(event, entry[4])
+                )
+                matched.sort(key=lambda entry: entry[0])
+            catch_all = list(self._exact.get((topic, None), {}).values())
+            callbacks = tuple(
+                (is_async, weak, cb)
+                for group in (matched, catch_all)
+                for is_async_first in (True, False)
+                for _, is_async, weak, cb, _ in group
+                if is_async == is_async_first
+            )
+            if not any(is_async or weak for is_async, weak, _ in callbacks):
+                dispatch = (True, tuple(cb for _, _, cb in callbacks))
+            else:
+                dispatch = (False, callbacks)
+            cache[event] = dispatch
+        return dispatch
+
+    async def dispatch(self, topic: str, event: Optional[str], payload: Any,
+                       timer: Optional[Callable[[str, Callable, float], None]] = None) -> None:
+        """
+        Call the callbacks of a frame with payload.
+
+        Parameters:
+        - topic (str): The topic.
+        - event (str|None): The event of the frame.
+        - payload (Any): The callback parameter.
+        - timer (Callable|None): Called with ("callback", callback, seconds) after each callback, to profile them.
+
+        Returns:
+        None
+        """
+        plain, callbacks = self.dispatch_tuple(topic, event)
+        if plain:
+            if timer is None:
+                for cb in callbacks:
+                    cb(payload)
+                return
+            callbacks = tuple((False, False, cb) for cb in callbacks)
+        for is_async, weak, cb in callbacks:
+            if weak:
+                cb = cb()
+                if cb is None:
+                    continue
+            start = time.perf_counter()
+            if is_async:
+                await cb(payload)
+            else:
+                cb(payload)
+            if timer is not None:
+                timer("callback", cb, time.perf_counter() - start)
+
+    def count(self, topic: Optional[str] = None) -> int:
+        """Get the number of registered callbacks, of a topic or of all."""
+        buckets = [bucket for (t, _), bucket in self._exact.items() if topic is None or t == topic]
+        buckets += [bucket for t, bucket in self._patterns.items() if topic is None or t == topic]
+        return sum(len(bucket) for bucket in buckets)
@@ -0,0 +1,189 @@
+from typing import Any, Deque, Dict, List, Optional
+import asyncio
+import collections
+import functools
+import time
+
+from .session import AutoDartException
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BoardCommand:
+    """
+    A control command waiting in a BoardCommandQueue.
+
+    Attributes:
+    - name (str): start, stop or reset.
+    - submitted (float): The time.monotonic() of the last submission merged into it.
+    - waiters (List[asyncio.Future]): The futures of the submissions it answers.
+    """
+
+    # The board event confirming each command.
+    EVENTS = {"start": "Started", "stop": "Stopped", "reset": "Manual_reset"}
+    # Commands of which only the last one queued matters.
+    RUNNING = ("start", "stop")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.submitted = time.monotonic()
+        self.waiters: List[asyncio.Future] = []
+
+    def resolve(self, result: Optional[str] = None, error: Optional[BaseException] = None) -> None:
+        """Resolve the waiters with the name of the command sent, or an error."""
+        for waiter in self.waiters:
+            if waiter.done():
+                continue
+            if error is not None:
+                waiter.set_exception(error)
+            else:
+                waiter.set_result(result)
+
+    def __repr__(self) -> str:
+        return f"<BoardCommand {self.name} waiters={len(self.waiters)}>"
+
+
+class BoardCommandQueue:
+    """
+    Serialize the start, stop and reset commands of a board, collapsing redundant ones.
+
+    One command is sent at a time, and the next one waits until the board
+    confirmed it with its event (Started, Stopped or Manual_reset) on the
+    websocket, or only its HTTP response when the board is not connected.
+    A command submitted while the same one is last in line, or in flight
+    and not confirmed yet, joins it. A start or stop replaces a start or
+    stop still queued, only the last running state asked for being sent.
+    With a window, a command waits that long after its last submission
+    before being sent, so the commands sent in a burst collapse.
+    """
+
+    def __init__(self, board: "CloudBoard", window: float = 0.0, timeout: float = 10.0) -> None:
+        """
+        Initialize a BoardCommandQueue instance.
+
+        Parameters:
+        - board (CloudBoard): The board to control.
+        - window (float): The seconds a command waits for later ones to collapse with, before being sent.
+        - timeout (float): The seconds to wait for the confirmation event of a command.
+
+        Returns:
+        None
+        """
+        self.board = board
+        self.window = window
+        self.timeout = timeout
+        self.sent = 0
+        self.collapsed = 0
+        self._queue: Deque[BoardCommand] = collections.deque()
+        self._current: Optional[BoardCommand] = None
+        self._confirmed: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        # One callback per confirmation event, routed by the event of each frame.
+        self._unregisters = [board.register_callback(functools.partial(self._on_state, event), event)
+                             for event in BoardCommand.EVENTS.values()]
+
+    @property
+    def pending(self) -> List[str]:
+        """Get the names of the command in flight and of the queued ones."""
+        commands = ([self._current] if self._current else []) + list(self._queue)
+        return [command.name for command in commands]
+
+    def submit(self, name: str) -> asyncio.Future:
+        """
+        Queue a command.
+
+        Parameters:
+        - name (str): start, stop or reset.
+
+        Returns:
+        asyncio.Future: Resolved with the name of the command sent for it, which differs when it was
+        replaced, or failed with an AutoDartException.
+        """
+        if name not in BoardCommand.EVENTS:
+            raise ValueError(f"Unknown command {name}, expected one of {', '.join(BoardCommand.EVENTS)}")
+        waiter = asyncio.get_running_loop().create_future()
+        last = self._queue[-1] if self._queue else self._current
+        if last is not None and last.name == name and not (last is self._current and self._confirmed.is_set()):
+            self.collapsed += 1
+        elif self._queue and name in BoardCommand.RUNNING and self._queue[-1].name in BoardCommand.RUNNING:
+            # A start then a stop, or the reverse, only the last one is sent.
+            replaced = self._queue.pop()
+            last = BoardCommand(name)
+            last.waiters = replaced.waiters
+            self._queue.append(last)
+            self.collapsed += 1
+        else:
+            last = BoardCommand(name)
+            self._queue.append(last)
+        if last is not self._current:
+            last.submitted = time.monotonic()
+        last.waiters.append(waiter)
+
+        if not self._worker or self._worker.done():
+            self._worker = asyncio.create_task(self._async_run())
+        return waiter
+
+    async def async_start(self) -> Optional[str]:
+        """Queue a start command and wait for it."""
+        return await self.submit("start")
+
+    async def async_stop(self) -> Optional[str]:
+        """Queue a stop command and wait for it."""
+        return await self.submit("stop")
+
+    async def async_reset(self) -> Optional[str]:
+        """Queue a reset command and wait for it."""
+        return await self.submit("reset")
+
+    def _on_state(self, event: str, state: Dict[str, Any]) -> None:
+        if self._current is not None and event == BoardCommand.EVENTS[self._current.name]:
+            self._confirmed.set()
+
+    async def _async_run(self) -> None:
+        while self._queue:
+            command = self._queue[0]
+            delay = command.submitted + self.window - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                # Submissions may have replaced or delayed it in the meantime.
+                continue
+            self._queue.popleft()
+            self._current = command
+            try:
+                await self._async_send(command)
+            except Exception as err:
+                command.resolve(error=err if isinstance(err, AutoDartException)
+                                else AutoDartException(f"{command.name} failed: {err}"))
+            else:
+                command.resolve(command.name)
+            finally:
+                self._current = None
+
+    async def _async_send(self, command: BoardCommand) -> None:
+        self._confirmed = asyncio.Event()
+        # Listen before sending, the event may come before the HTTP response.
+        response = await getattr(self.board, f"async_{command.name}")()
+        self.sent += 1
+        if response is not None and not response.ok:
+            raise AutoDartException(f"{command.name} failed with status {response.status}")
+        if not self.board.is_connected:
+            return
+        try:
+            await asyncio.wait_for(self._confirmed.wait(), self.timeout)
+        except asyncio.TimeoutError:
+            raise AutoDartException(f"No {BoardCommand.EVENTS[command.name]} event from board {self.board.id} "
+                                    f"{self.timeout}s after {command.name}") from None
+
+    def close(self) -> None:
+        """Stop listening to the board and cancel the queued commands and their waiters."""
+        for unregister in self._unregisters:
+            unregister()
+        if self._worker:
+            self._worker.cancel()
+        for command in ([self._current] if self._current else []) + list(self._queue):
+            for waiter in command.waiters:
+                waiter.cancel()
+        self._queue.clear()
+        self._current = None
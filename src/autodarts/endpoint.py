@@ -1,10 +1,16 @@
-from typing import Any, Awaitable, Callable, Dict, Optional
-from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Union
 import asyncio
+import copy
+import itertools
 import aiohttp
 from .session import AutoDartSession, AutoDartException
+from .health import ConnectionHealth
+from .history import EventHistory
+from .callbacks import CallbackRegistry
+from .selectors import Selector
 from posixpath import join as urljoin
 import json
+import time
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,6 +20,58 @@ class AutoDartMissingIdException(AutoDartException):
 class AutoDartInvalidStateException(AutoDartException):
     pass
 
+class PendingOperation:
+    """
+    An action applied locally before the server confirmed it.
+
+    Attributes:
+    - id (int): The pending operation ID.
+    - name (str): The name of the action.
+    - changes (dict): The expected values of the changed state keys.
+    - previous (dict): The values of those keys before the change.
+    - status (str): pending, confirmed, rolled_back (failed or contradicted by
+      the server) or unconfirmed (sent, but no frame confirmed it in time, the
+      local change is withdrawn).
+    - sent (bool): True once the HTTP request succeeded.
+    """
+
+    PENDING = "pending"
+    CONFIRMED = "confirmed"
+    ROLLED_BACK = "rolled_back"
+    UNCONFIRMED = "unconfirmed"
+
+    _ids = itertools.count(1)
+
+    def __init__(self, name: str, changes: Dict[str, Any], confirm: Optional[Callable[[Dict[str, Any]], bool]] = None) -> None:
+        self.id = next(self._ids)
+        self.name = name
+        self.changes = changes
+        self.previous: Dict[str, Any] = {}
+        self.status = self.PENDING
+        self.sent = False
+        self._confirm = confirm
+
+    def matches(self, data: Dict[str, Any]) -> Optional[bool]:
+        """
+        Check an authoritative state frame against the expected change.
+
+        A confirm function only confirms: a frame it doesn't accept may come
+        before the server applied the action. Without confirm nor changes,
+        no frame tells.
+
+        Returns:
+        bool|None: True if confirmed, False if contradicted, None if the frame doesn't tell.
+        """
+        if self._confirm is not None:
+            return True if self._confirm(data) else None
+        if not self.changes or not all(key in data for key in self.changes):
+            return None
+        return all(data[key] == value for key, value in self.changes.items())
+
+    def __repr__(self) -> str:
+        return f"<PendingOperation {self.id} {self.name} {self.status}>"
+
+
 class AutoDartBase:
     """
     Represents the base class for AutoDARTS entities.
@@ -40,7 +98,7 @@ class AutoDartEndpoint(AutoDartBase):
 
     ENDPOINT = None
     
-    def __init__(self, state: Dict[str, Any], session: AutoDartSession, endpoint: str, api_url: str = API_URL) -> None:
+    def __init__(self, state: Dict[str, Any], session: AutoDartSession, endpoint: str, api_url: Optional[str] = None) -> None:
         """
         Initialize an AutoDartEndpoint instance.
 
@@ -48,7 +106,7 @@ class AutoDartEndpoint(AutoDartBase):
         - state (dict): The initial state of the entity.
         - session (AutoDartSession): The session used for communication.
         - endpoint (str): The API endpoint for the entity.
-        - api_url (str): The base API URL.
+        - api_url (str|None): The base API URL, the one of the session if None.
 
         Raises:
         - AutoDartMissingIdException: If the entity's state lacks an 'id'.
@@ -60,7 +118,10 @@ class AutoDartEndpoint(AutoDartBase):
             raise AutoDartMissingIdException(f"Can't init {self.__class__.__name__} without id in state")
         super().__init__(state, session=session)
         self.collection_endpoint = endpoint
-        self.api_url = api_url
+        self.api_url = api_url or self.base_url(session)
+        identity_map = getattr(session, "entities", None)
+        if identity_map is not None :
+            identity_map.setdefault((self.__class__, self.id), self)
     
     def __await__(self):
         self.async_load_state().__await__()
@@ -89,22 +150,48 @@ class AutoDartEndpoint(AutoDartBase):
         pass
         self._state.update(await (await self.session.get(self.get_endpoint("state"), timeout=10)).json())
     
+    @classmethod
+    def base_url(cls, session: AutoDartSession) -> str:
+        """Get the base API URL of the session, API_URL if it has none."""
+        return getattr(session, "api_url", None) or cls.API_URL
+
+    @classmethod
+    def lookup(cls, session: AutoDartSession, id: str) -> Optional["AutoDartEndpoint"]:
+        """Get the live instance of an entity ID in the session, if any."""
+        identity_map = getattr(session, "entities", None)
+        return identity_map.get((cls, id)) if identity_map is not None else None
+
+    @classmethod
+    def from_state(cls, session: AutoDartSession, state: Dict[str, Any]) -> "AutoDartEndpoint":
+        """Get the live instance of an entity updated with state, or create it."""
+        item = cls.lookup(session, state.get('id')) if state else None
+        if item is None :
+            return cls(state, session=session)
+        item._state.update(state)
+        return item
+
     @classmethod
     async def from_id(cls, session: AutoDartSession, id: str) -> "AutoDartEndpoint":
-        """Create an instance of the entity from its ID."""
-        endpoint = urljoin(cls.API_URL, cls.ENDPOINT, id)
+        """Get the instance of the entity from its ID, the live one if any."""
+        item = cls.lookup(session, id)
+        if item is not None :
+            # A connected entity is kept up to date by its websocket.
+            if not getattr(item, "is_connected", False) :
+                await item.async_load()
+            return item
+        endpoint = urljoin(cls.base_url(session), cls.ENDPOINT, id)
         state = await session.get(endpoint)
-        item = cls(await state.json(),session=session)
+        item = cls.from_state(session, await state.json())
         await item.async_load_state()
         return item
     
     @classmethod
     async def factory(cls, session: AutoDartSession):
         """Create instances of the entity using a factory method."""
-        endpoint = urljoin(cls.API_URL, cls.ENDPOINT)
+        endpoint = urljoin(cls.base_url(session), cls.ENDPOINT)
         states = await session.get(endpoint)
         for state in await states.json():
-            item = cls(state, session=session)
+            item = cls.from_state(session, state)
             await item.async_load_state()
             yield item
 
@@ -114,6 +201,10 @@ class AutoDartEndpointWs(AutoDartEndpoint):
     Represents an endpoint with WebSocket support in the AutoDARTS system.
     """
     WS_ENDPOINT = "wss://api.autodarts.io/ms/v0/subscribe"
+    HEARTBEAT_INTERVAL = 15
+    STALE_TIMEOUT = 45
+    # The FrameProfiler timing frame handling, of every entity when set on the class.
+    profiler: Optional["FrameProfiler"] = None
 
     event_topics = [
         "state",
@@ -124,7 +215,7 @@ class AutoDartEndpointWs(AutoDartEndpoint):
     ]
 
     def __init__(self, state: Dict[str, Any], session: AutoDartSession, endpoint: str, channel: str,
-                 ws_url: str = WS_ENDPOINT, api_url: str = AutoDartEndpoint.API_URL) -> None:
+                 ws_url: Optional[str] = None, api_url: Optional[str] = None) -> None:
         """
         Initialize an AutoDartEndpointWs instance.
 
@@ -133,8 +224,8 @@ class AutoDartEndpointWs(AutoDartEndpoint):
         - session (AutoDartSession): The session used for communication.
         - endpoint (str): The API endpoint for the entity.
         - channel (str): The WebSocket channel.
-        - ws_url (str): The WebSocket URL.
-        - api_url (str): The base API URL.
+        - ws_url (str|None): The WebSocket URL, the one of the session if None.
+        - api_url (str|None): The base API URL, the one of the session if None.
 
         Returns:
         None
@@ -144,13 +235,34 @@ class AutoDartEndpointWs(AutoDartEndpoint):
         self.channel = channel
         self.last_event = None
         self.task = None
-        self.ws_url = ws_url
-        self.event_cb = { name: defaultdict(list) for name in self.event_topics } 
-        self.async_event_cb = { name: defaultdict(list) for name in self.event_topics }
+        self.ws_url = ws_url or getattr(session, "ws_url", None) or self.WS_ENDPOINT
+        self.callbacks = CallbackRegistry(self.event_topics)
+        self.optimistic = False
+        self.optimistic_timeout = 10
+        self.pending: Dict[int, PendingOperation] = {}
+        self.pending_cb = []
+        self.heartbeat_interval = self.HEARTBEAT_INTERVAL
+        self.stale_timeout = self.STALE_TIMEOUT
+        self.health = ConnectionHealth()
+        self._subscribers = []
+        self.history: Optional[EventHistory] = None
+        self._stale = False
+        self.selectors: List[Selector] = []
+        # Change counters of the ws_data keys selectors depend on.
+        self._key_versions: Dict[str, int] = {}
+        # Running replay tasks, referenced so they are not collected before they end.
+        self._replays: Set[asyncio.Task] = set()
 
     @property
     def is_connected(self) :
-        return True if self.task and not self.task.done() else False 
+        if not self.task or self.task.done() :
+            return False
+        return not self.health.is_stale(self.stale_timeout)
+
+    @property
+    def rtt_percentiles(self) -> Dict[float, Optional[float]]:
+        """Get the ping round-trip time percentiles (p50, p90, p99) of the connection, in seconds."""
+        return self.health.percentiles()
     
     @property
     def state_topic(self) -> str:
@@ -162,37 +274,113 @@ class AutoDartEndpointWs(AutoDartEndpoint):
         """Get the event topic for the entity."""
         return self.id + ".events"
         
-    def connect(self, on_event_cb=None, on_state_cb=None) -> None:
-        """Connect to the WebSocket channel."""
-        self.task = asyncio.create_task(
-            self.async_messages_task(on_event_cb, on_state_cb)
-        )
+    @property
+    def subscribers(self) -> int:
+        """Get the number of connect() calls not yet disconnected."""
+        return len(self._subscribers)
 
-    def disconnect(self) -> None:
-        """Disconnect from the WebSocket channel."""
-        self.task.cancel()
-        self.task = None
+    def connect(self, on_event_cb=None, on_state_cb=None) -> Callable[[], None]:
+        """
+        Connect to the WebSocket channel.
+
+        The connection is shared: each call adds a subscriber, with its optional
+        raw frame callbacks, and only the first one opens the socket.
+
+        Returns:
+        Callable[[], None]: The function removing this subscriber, closing the socket if it is the last one.
+        """
+        entry = (on_event_cb, on_state_cb)
+        self._subscribers.append(entry)
+        if not self.task or self.task.done() :
+            self.task = asyncio.create_task(self.async_messages_task())
+        connected = True
+
+        def disconnect() -> None:
+            nonlocal connected
+            if connected :
+                connected = False
+                self._remove_subscriber(entry)
+        return disconnect
+
+    def disconnect(self, on_event_cb=None, on_state_cb=None) -> None:
+        """
+        Disconnect from the WebSocket channel, the socket is closed when the last subscriber leaves.
+
+        The subscriber connected with the same raw frame callbacks leaves, one
+        connected without any if none are given. Nothing happens if there is none.
+        """
+        self._remove_subscriber((on_event_cb, on_state_cb))
+
+    def _remove_subscriber(self, entry) -> None:
+        if entry in self._subscribers :
+            self._subscribers.remove(entry)
+        if not self._subscribers and self.task :
+            self.task.cancel()
+            self.task = None
 
     async def async_messages_task(self, on_event_cb=None, on_state_cb=None) -> None:
-        """Asynchronously handle messages from the WebSocket channel."""
+        """Asynchronously handle messages from the WebSocket channel, recycling stale connections."""
         try:
-            async with self.session.session.ws_connect(url=self.ws_url, headers=await self.session.headers()) as ws:
+            while await self._async_connection(on_event_cb, on_state_cb) :
+                self.health.reconnects += 1
+                logger.warning(f'No frame from {self.id} for {self.stale_timeout}s, reconnecting')
+                await self.on_event_message({'event' : 'stale'})
+        except asyncio.CancelledError:
+            pass
+        except Exception as e :
+            await self.on_event_message({'event' : 'error', 'data' : e})
+            logger.warning(f'Uncatch exception in wait msg {e}')
+        finally :
+            self.health.on_disconnect()
+            await self.on_event_message({'event' : 'task_ended'})
+
+    async def _async_connection(self, on_event_cb=None, on_state_cb=None) -> bool:
+        """
+        Run one WebSocket connection.
+
+        Returns:
+        bool: True if the connection was closed by the heartbeat for being stale.
+        """
+        self._stale = False
+        async with self.session.session.ws_connect(url=self.ws_url, headers=await self.session.headers(), autoping=False) as ws:
+            self.ws = ws
+            self.health.on_connect()
+            heartbeat = asyncio.create_task(self._async_heartbeat(ws)) if self.heartbeat_interval else None
+            try:
                 await self._subscribe_channel(ws, self.state_topic)
                 await self._subscribe_channel(ws, self.event_topic)
+                await self.on_event_message({'event' : 'subscribed'})
                 async for msg in ws: 
+                    self.health.on_frame()
                     if msg.type == aiohttp.WSMsgType.TEXT:
+                        profiler = self.profiler
+                        if profiler is not None :
+                            start = time.perf_counter()
                         msg = msg.json()
                         topic = msg['topic'] 
                         if  topic == "info" :
                             continue
-                        elif topic == self.state_topic :
-                            await self.on_state_message(msg["data"])
-                            if on_state_cb :
-                                await on_state_cb(msg["data"])
+                        timer = None
+                        if profiler is not None :
+                            timer = profiler.frame_timer(self, msg.get("data"))
+                            timer("decode", None, time.perf_counter() - start)
+                            start = time.perf_counter()
+                            self._route(topic, msg.get("data"))
+                            timer("route", None, time.perf_counter() - start)
+                        if topic == self.state_topic :
+                            await self.on_state_message(msg["data"], timer)
+                            for _, state_cb in self._frame_callbacks(on_event_cb, on_state_cb) :
+                                if state_cb :
+                                    await self._async_frame_callback(state_cb, msg["data"], timer)
                         elif topic == self.event_topic :
-                            await self.on_event_message(msg["data"])
-                            if on_event_cb :
-                                await on_event_cb(msg["data"])
+                            await self.on_event_message(msg["data"], timer)
+                            for event_cb, _ in self._frame_callbacks(on_event_cb, on_state_cb) :
+                                if event_cb :
+                                    await self._async_frame_callback(event_cb, msg["data"], timer)
+                    elif msg.type == aiohttp.WSMsgType.PING:
+                        await ws.pong(msg.data)
+                    elif msg.type == aiohttp.WSMsgType.PONG:
+                        self.health.on_pong(msg.data)
                     elif msg.type == aiohttp.WSMsgType.ERROR:
                         await self.on_event_message({'event' : 'error', 'data' : ws.exception()})
                         logger.error('ws connection closed with exception %s' % ws.exception())
@@ -200,13 +388,48 @@ class AutoDartEndpointWs(AutoDartEndpoint):
                     elif msg.type == aiohttp.WSMsgType.CLOSED:
                         await self.on_event_message({'event' : 'disconnected'})
                         break
-        except asyncio.CancelledError:
-            pass
-        except Exception as e :
-            await self.on_event_message({'event' : 'error', 'data' : e})
-            logger.warning(f'Uncatch exception in wait msg {e}')
-        finally :
-            await self.on_event_message({'event' : 'task_ended'})
+            finally:
+                if heartbeat :
+                    heartbeat.cancel()
+                self.ws = None
+        return self._stale
+
+    def _route(self, topic, data) -> None:
+        """Match the topic of a frame and look its callbacks up, as the frame path does, to time it."""
+        if topic == self.state_topic :
+            kind = "state"
+        elif topic == self.event_topic :
+            kind = "events"
+        else :
+            return
+        # Cached by the registry, so the dispatch of the frame doesn't look them up again.
+        self.callbacks.dispatch_tuple(kind, (data.get('event') if isinstance(data, dict) else None) or None)
+
+    @staticmethod
+    async def _async_frame_callback(cb, data, timer=None) -> None:
+        if timer is None :
+            await cb(data)
+            return
+        start = time.perf_counter()
+        await cb(data)
+        timer("frame_callback", cb, time.perf_counter() - start)
+
+    def _frame_callbacks(self, on_event_cb=None, on_state_cb=None) -> list:
+        """Get the raw frame callbacks of the subscribers, and of the task."""
+        callbacks = list(self._subscribers)
+        if on_event_cb or on_state_cb :
+            callbacks.append((on_event_cb, on_state_cb))
+        return callbacks
+
+    async def _async_heartbeat(self, ws) -> None:
+        """Ping the server periodically, close the connection when it went silent."""
+        while not ws.closed :
+            await asyncio.sleep(self.heartbeat_interval)
+            if self.health.is_stale(self.stale_timeout) :
+                self._stale = True
+                await ws.close()
+                return
+            await ws.ping(self.health.ping_payload())
 
     async def _subscribe_channel(self, ws, topic) -> None:
         """Subscribe to a WebSocket channel."""
@@ -218,73 +441,313 @@ class AutoDartEndpointWs(AutoDartEndpoint):
             }
         )
 
+    async def async_load(self):
+        """Asynchronously load the state of the entity."""
+        await super().async_load()
+        self.invalidate_selectors()
+
     @property
     def ws_data(self) :
-        if not self._state['state'] :
+        if not self._state.get('state') :
             self._state['state'] = {}
         return self._state['state']
 
 
-    async def on_state_message(self, data) -> None:
-        """Handle state messages from the WebSocket channel."""
-        if not self._state['state'] :
-            self._state['state'] = {}
-        
+    async def on_state_message(self, data, timer=None) -> None:
+        """
+        Handle state messages from the WebSocket channel.
+
+        timer(stage, callback, seconds), given by the profiler, times the merge,
+        each callback and the selectors. Without it, the clock is not read.
+        """
+        if timer is None :
+            self._merge_state(data)
+            await self.callbacks.dispatch("state", data.get('event') or None, self._state)
+            if self.selectors :
+                self._refresh_selectors()
+            return
+        start = time.perf_counter()
+        self._merge_state(data)
+        timer("merge", None, time.perf_counter() - start)
+        await self.callbacks.dispatch("state", data.get('event') or None, self._state, timer)
+        if self.selectors :
+            start = time.perf_counter()
+            self._refresh_selectors()
+            timer("callback", self._refresh_selectors, time.perf_counter() - start)
+
+    def _merge_state(self, data) -> None:
+        """Merge a state frame into the state, before the callbacks."""
+        if self.selectors :
+            ws_data = self.ws_data
+            self._touch(key for key in self._key_versions if key in data and data[key] != ws_data.get(key))
         self.ws_data.update(data)
+        if self.history is not None :
+            self.history.append("state", data, state=dict(self.ws_data))
+        if self.pending :
+            self._reconcile_pending(data)
 
-        event = data.get('event')
-        
-        if event :       
-            for cb in self.async_event_cb["state"].get(event,[])  :
-                await cb(self._state)
-            for cb in self.event_cb["state"].get(event,[]) :       
-                cb(self._state)    
-                
-        for cb in self.async_event_cb["state"].get(None,[]) :
-            await cb(self._state)
-        
-        for cb in self.event_cb["state"].get(None,[]) :
-            cb(self._state)
+    async def on_event_message(self, data, timer=None) -> None:
+        """Handle event messages from the WebSocket channel, timed as state messages."""
+        if timer is None :
+            self._record_event(data)
+        else :
+            start = time.perf_counter()
+            self._record_event(data)
+            timer("merge", None, time.perf_counter() - start)
+        await self.callbacks.dispatch("events", data.get('event') or None, data, timer)
 
-    async def on_event_message(self, data) -> None:
-        """Handle event messages from the WebSocket channel."""
+    def _record_event(self, data) -> None:
         self.last_event = data
-        
-        event = data.get('event')
-        if event :       
-            for cb in self.async_event_cb["events"].get(event,[])  :
-                await cb(data)
-            for cb in self.event_cb["events"].get(event,[]) :        
-                cb(data)    
-                
-        for cb in self.async_event_cb["events"].get(None,[]) :
-            await cb(data)
-        
-        for cb in self.event_cb["events"].get(None,[]) :
-            cb(data)
+        if self.history is not None :
+            self.history.append("events", data)
+
+    def enable_history(self, maxlen: int = 256) -> EventHistory:
+        """Keep the last maxlen state and event frames of the entity."""
+        if self.history is None or self.history.maxlen != maxlen :
+            self.history = EventHistory(maxlen)
+        return self.history
+
+    def _replay_records(self, event, topic, since) -> list:
+        if self.history is None or since is None :
+            return []
+        return self.history.between(start=since, topic=topic, event=event)
+
+    def _state_payload(self, ws_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Get a state callback payload, shaped like the live one (the whole state), from a copy of ws_data."""
+        if self.ws_data is self._state :
+            return ws_data
+        return dict(self._state, state=ws_data)
+
+    def frame_data(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Get the ws_data a state callback was called with, from its payload (the whole state)."""
+        if self.ws_data is self._state :
+            return payload
+        return payload.get("state") or {}
+
+    def _replay_payload(self, record) -> Any:
+        if record.topic == "state" and record.state is not None :
+            return self._state_payload(record.state)
+        return record.data
 
-                
-    def register_async_callback(self, cb, event=None , topic="state") -> Callable[[], None]:
-        """Register a callback for a specific event and topic."""
+    def register_async_callback(self, cb, event=None , topic="state", replay_since: Optional[float] = None,
+                                weak: bool = False) -> Callable[[], None]:
+        """
+        Register a callback for a specific event and topic.
+
+        The event may be a glob pattern such as "Throw*". With weak, the
+        callback is held by weak reference and unregistered when collected.
+        With history enabled, replay_since (a time.time() value, 0 for all)
+        first replays the recorded frames since then to the callback, in a
+        task. The frames received meanwhile are passed after the replay.
+        """
         #if event not in self.events :
         #    raise AutoDartInvalidStateException(f"Event not supported, allowed events are {','.join(self.events)}")        
         if topic not in self.event_topics :
             raise AutoDartInvalidStateException(f"Topic not supported, allowed topics are {','.join(self.event_topics)}")
-        
-        self.async_event_cb[topic][event].append(cb)
-        
-        def unregister() -> None:
-            self.async_event_cb[topic][event].remove(cb)
-        
-        return unregister
 
-    def register_callback(self, cb,event=None, topic="state") -> Callable[[], None]:
-        """Register a callback for a specific event and topic."""
+        records = self._replay_records(event, topic, replay_since)
+        if not records :
+            return self.callbacks.register(cb, event, topic, is_async=True, weak=weak)
+
+        # Live frames wait here until the replay is done, copied as the state changes meanwhile.
+        buffered = []
+
+        def buffer(payload) -> None:
+            buffered.append(self._state_payload(dict(self.ws_data)) if topic == "state" else payload)
+
+        unregister = self.callbacks.register(buffer, event, topic, is_async=False)
+        cancelled = False
+
+        async def replay() -> None:
+            nonlocal unregister
+            try:
+                for record in records :
+                    if cancelled :
+                        return
+                    await cb(self._replay_payload(record))
+                while buffered and not cancelled :
+                    await cb(buffered.pop(0))
+            except Exception as err :
+                logger.warning(f'Replay to {cb} failed: {err}')
+            finally :
+                # No await from the last buffered frame on, so none is missed nor passed twice.
+                unregister()
+                if not cancelled :
+                    unregister = self.callbacks.register(cb, event, topic, is_async=True, weak=weak)
+
+        task = asyncio.create_task(replay())
+        self._replays.add(task)
+        task.add_done_callback(self._replays.discard)
+
+        def stop() -> None:
+            nonlocal cancelled
+            cancelled = True
+            unregister()
+        return stop
+
+    def register_callback(self, cb,event=None, topic="state", replay_since: Optional[float] = None,
+                          weak: bool = False) -> Callable[[], None]:
+        """
+        Register a callback for a specific event and topic.
+
+        The event may be a glob pattern such as "Throw*". With weak, the
+        callback is held by weak reference and unregistered when collected.
+        With history enabled, replay_since (a time.time() value, 0 for all)
+        first replays the recorded frames since then to the callback.
+        """
         #if event not in self.events :
         #    raise AutoDartInvalidStateException(f"Event not supported, allowed events are {','.join(self.events)}")        
         if topic not in self.event_topics :
             raise AutoDartInvalidStateException(f"Topic not supported, allowed topics are {','.join(self.event_topics)}")
-        self.event_cb[topic][event].append(cb)
+        for record in self._replay_records(event, topic, replay_since) :
+            cb(self._replay_payload(record))
+        return self.callbacks.register(cb, event, topic, is_async=False, weak=weak)
+
+    def select(self, fn: Callable[[Dict[str, Any]], Any], deps: Optional[Sequence[str]] = None,
+               name: Optional[str] = None) -> Selector:
+        """
+        Derive a memoized value from the state.
+
+        Parameters:
+        - fn (Callable[[dict], Any]): The function computing the value from ws_data.
+        - deps (Sequence[str]|None): The ws_data keys fn reads, those declared with depends_on if None.
+        - name (str|None): The name of the selector.
+
+        Returns:
+        Selector: The selector, whose value is computed again only when a dependency changed.
+        """
+        deps = deps if deps is not None else getattr(fn, "deps", None)
+        if not deps :
+            raise AutoDartInvalidStateException(f"Selector {name or fn} has no dependencies")
+        selector = Selector(self, fn, deps, name)
+        for key in selector.deps :
+            self._key_versions.setdefault(key, 0)
+        self.selectors.append(selector)
+        return selector
+
+    def _remove_selector(self, selector: Selector) -> None:
+        if selector in self.selectors :
+            self.selectors.remove(selector)
+        deps = {key for other in self.selectors for key in other.deps}
+        for key in list(self._key_versions) :
+            if key not in deps :
+                del self._key_versions[key]
+
+    def _touch(self, keys) -> None:
+        """Mark ws_data keys as changed for the selectors."""
+        versions = self._key_versions
+        for key in keys :
+            if key in versions :
+                versions[key] += 1
+
+    def invalidate_selectors(self) -> None:
+        """Compute the selectors again, after the state was changed other than by frames (REST loads)."""
+        self._touch(list(self._key_versions))
+        self._refresh_selectors()
+
+    def _refresh_selectors(self) -> None:
+        for selector in list(self.selectors) :
+            selector._refresh()
+
+    def register_pending_callback(self, cb: Callable[[PendingOperation], None]) -> Callable[[], None]:
+        """Register a callback called when a pending operation is applied, confirmed or rolled back."""
+        self.pending_cb.append(cb)
         def unregister() -> None:
-            self.event_cb[topic][event].remove(cb)
+            self.pending_cb.remove(cb)
         return unregister
+
+    def _notify_pending(self, op: PendingOperation) -> None:
+        for cb in list(self.pending_cb) :
+            cb(op)
+
+    def _apply_changes(self, op: PendingOperation) -> None:
+        for key, value in op.changes.items() :
+            self.ws_data[key] = value
+        if self.selectors :
+            self._touch(op.changes)
+            self._refresh_selectors()
+
+    def _settle_pending(self, op: PendingOperation, status: str) -> None:
+        if op.status != PendingOperation.PENDING :
+            return
+        self.pending.pop(op.id, None)
+        op.status = status
+        self._notify_pending(op)
+
+    def _rollback_pending(self, op: PendingOperation, keys=(), status: str = PendingOperation.ROLLED_BACK) -> None:
+        """Restore the keys changed by an operation, except those set by the server."""
+        if op.status != PendingOperation.PENDING :
+            return
+        for key, value in op.previous.items() :
+            if key not in keys :
+                self.ws_data[key] = value
+        if self.selectors :
+            self._touch(op.previous)
+            self._refresh_selectors()
+        self._settle_pending(op, status)
+
+    def _reconcile_pending(self, data: Dict[str, Any]) -> None:
+        """Confirm or roll back pending operations against an authoritative state frame."""
+        for op in list(self.pending.values()) :
+            result = op.matches(data)
+            if result :
+                self._settle_pending(op, PendingOperation.CONFIRMED)
+            elif result is False and op.sent :
+                self._rollback_pending(op, data)
+            else :
+                # Not decided yet, keep showing the expected state.
+                op.previous.update({key: copy.deepcopy(data[key]) for key in op.changes if key in data})
+                self._apply_changes(op)
+
+    async def async_optimistic(self, name: str, request: Awaitable[aiohttp.ClientResponse],
+                               changes: Union[Dict[str, Any], Callable[[Dict[str, Any]], Dict[str, Any]], None] = None,
+                               confirm: Optional[Callable[[Dict[str, Any]], bool]] = None) -> aiohttp.ClientResponse:
+        """
+        Run an action request, applying its expected state change first in optimistic mode.
+
+        Parameters:
+        - name (str): The name of the action.
+        - request (Awaitable[aiohttp.ClientResponse]): The HTTP request of the action.
+        - changes (dict|Callable|None): The expected state keys, or a function computing them from the current state.
+        - confirm (Callable|None): Decide from a state frame if the action is confirmed, instead of comparing changes.
+          The operation is unconfirmed, and its change withdrawn, if no frame confirms it within optimistic_timeout.
+
+        Returns:
+        aiohttp.ClientResponse: The response object.
+
+        Raises:
+        - AutoDartException: In optimistic mode, if the request failed (the change is rolled back).
+        """
+        if not self.optimistic :
+            return await request
+
+        if callable(changes) :
+            try:
+                changes = changes(self.ws_data)
+            except BaseException:
+                if asyncio.iscoroutine(request) :
+                    # Never sent, don't leave it unawaited.
+                    request.close()
+                raise
+        op = PendingOperation(name, changes or {}, confirm=confirm)
+        op.previous = {key: copy.deepcopy(self.ws_data.get(key)) for key in op.changes}
+        self.pending[op.id] = op
+        self._apply_changes(op)
+        self._notify_pending(op)
+
+        try:
+            response = await request
+        except Exception as err :
+            self._rollback_pending(op)
+            raise AutoDartException(f"{name} failed: {err}") from err
+        if not response.ok :
+            self._rollback_pending(op)
+            raise AutoDartException(f"{name} failed with status {response.status}")
+
+        op.sent = True
+        if op.status == PendingOperation.PENDING :
+            # The HTTP success doesn't tell the server state, withdraw the change if no frame confirms it.
+            asyncio.get_running_loop().call_later(
+                self.optimistic_timeout, self._rollback_pending, op, (), PendingOperation.UNCONFIRMED
+            )
+        return response
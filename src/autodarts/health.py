@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, Optional
+from collections import deque
+import struct
+import time
+
+
+class ConnectionHealth:
+    """
+    Heartbeat bookkeeping of a WebSocket connection.
+
+    Attributes:
+    - rtts (deque): The last ping/pong round-trip times, in seconds.
+    - last_frame (float|None): The monotonic time of the last received frame.
+    - connected_at (float|None): The monotonic time of the current connection.
+    - reconnects (int): The number of times a stale connection was recycled.
+    """
+
+    _PAYLOAD = struct.Struct("<d")
+
+    def __init__(self, samples: int = 256) -> None:
+        """
+        Initialize a ConnectionHealth instance.
+
+        Parameters:
+        - samples (int): The number of RTT samples kept for percentiles.
+
+        Returns:
+        None
+        """
+        self.rtts: deque = deque(maxlen=samples)
+        self.last_frame: Optional[float] = None
+        self.connected_at: Optional[float] = None
+        self.reconnects = 0
+        self.pings_sent = 0
+        self.pongs_received = 0
+
+    def on_connect(self) -> None:
+        """Start tracking a new connection."""
+        self.connected_at = self.last_frame = time.monotonic()
+
+    def on_disconnect(self) -> None:
+        """Stop tracking the connection."""
+        self.connected_at = self.last_frame = None
+
+    def on_frame(self) -> None:
+        """Record that a frame was received."""
+        self.last_frame = time.monotonic()
+
+    def ping_payload(self) -> bytes:
+        """Get the payload of a new ping, carrying its send time."""
+        self.pings_sent += 1
+        return self._PAYLOAD.pack(time.monotonic())
+
+    def on_pong(self, payload: bytes) -> Optional[float]:
+        """
+        Record a pong.
+
+        Returns:
+        float|None: The round-trip time, None if the payload isn't one of our pings.
+        """
+        now = time.monotonic()
+        self.last_frame = now
+        if len(payload) != self._PAYLOAD.size:
+            return None
+        rtt = now - self._PAYLOAD.unpack(payload)[0]
+        self.pongs_received += 1
+        self.rtts.append(rtt)
+        return rtt
+
+    @property
+    def silence(self) -> Optional[float]:
+        """Get the seconds since the last received frame, None when not connected."""
+        if self.last_frame is None:
+            return None
+        return time.monotonic() - self.last_frame
+
+    def is_stale(self, timeout: float) -> bool:
+        """Check if nothing was received for more than timeout seconds."""
+        silence = self.silence
+        return silence is not None and silence > timeout
+
+    @property
+    def rtt(self) -> Optional[float]:
+        """Get the last round-trip time."""
+        return self.rtts[-1] if self.rtts else None
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Get a round-trip time percentile (0-100) over the kept samples."""
+        if not self.rtts:
+            return None
+        values = sorted(self.rtts)
+        rank = (len(values) - 1) * p / 100
+        low = int(rank)
+        high = min(low + 1, len(values) - 1)
+        return values[low] + (values[high] - values[low]) * (rank - low)
+
+    def percentiles(self, ps: Iterable[float] = (50, 90, 99)) -> Dict[float, Optional[float]]:
+        """Get several round-trip time percentiles."""
+        return {p: self.percentile(p) for p in ps}
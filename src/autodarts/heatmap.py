@@ -0,0 +1,219 @@
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import math
+
+from .session import AutoDartException
+from .match import Match, ThrowCursor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class Heatmap:
+    """
+    Fixed-size 2D histogram of throws in the normalized board coordinates of FIELD_COORDS.
+
+    The board center is (0, 0) and the outer double ring has radius 1.
+    Row 0 is the top of the board, so ``counts`` renders as an image as is.
+
+    Attributes:
+    - bins (int): The number of bins per axis.
+    - extent (float): The half width of the covered square.
+    - counts (numpy.ndarray): The (bins, bins) uint32 counts.
+    - outside (int): The number of throws outside the covered square.
+    """
+
+    EXTENT = 1.2
+
+    def __init__(self, bins: int = 64, extent: float = EXTENT) -> None:
+        """
+        Initialize a Heatmap instance.
+
+        Parameters:
+        - bins (int): The number of bins per axis.
+        - extent (float): The half width of the covered square.
+
+        Returns:
+        None
+        """
+        if np is None:
+            raise AutoDartException("numpy is required for heatmaps, install autodarts[numpy]")
+        self.bins = bins
+        self.extent = extent
+        self.counts = np.zeros((bins, bins), dtype=np.uint32)
+        self.outside = 0
+        self._scale = bins / (2 * extent)
+
+    @property
+    def total(self) -> int:
+        """Get the number of throws added, outside ones included."""
+        return int(self.counts.sum()) + self.outside
+
+    def add(self, x: float, y: float) -> None:
+        """Add one throw."""
+        col = math.floor((x + self.extent) * self._scale)
+        row = math.floor((self.extent - y) * self._scale)
+        if 0 <= row < self.bins and 0 <= col < self.bins:
+            self.counts[row, col] += 1
+        else:
+            self.outside += 1
+
+    def remove(self, x: float, y: float) -> None:
+        """Remove one throw added before (an undone one)."""
+        col = math.floor((x + self.extent) * self._scale)
+        row = math.floor((self.extent - y) * self._scale)
+        if 0 <= row < self.bins and 0 <= col < self.bins:
+            if self.counts[row, col]:
+                self.counts[row, col] -= 1
+        elif self.outside:
+            self.outside -= 1
+
+    def add_many(self, xs: Iterable[float], ys: Iterable[float]) -> None:
+        """Add many throws at once."""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        cols = np.floor((xs + self.extent) * self._scale).astype(np.int64)
+        rows = np.floor((self.extent - ys) * self._scale).astype(np.int64)
+        inside = (rows >= 0) & (rows < self.bins) & (cols >= 0) & (cols < self.bins)
+        self.outside += int((~inside).sum())
+        flat = np.bincount(rows[inside] * self.bins + cols[inside], minlength=self.bins * self.bins)
+        self.counts += flat.reshape(self.bins, self.bins).astype(np.uint32)
+
+    def merge(self, other: "Heatmap") -> "Heatmap":
+        """Add the counts of another heatmap with the same geometry, in place."""
+        if (other.bins, other.extent) != (self.bins, self.extent):
+            raise ValueError("Can't merge heatmaps with different bins or extent")
+        self.counts += other.counts
+        self.outside += other.outside
+        return self
+
+    def __iadd__(self, other: "Heatmap") -> "Heatmap":
+        return self.merge(other)
+
+    def copy(self) -> "Heatmap":
+        """Get an independent copy."""
+        heatmap = Heatmap(self.bins, self.extent)
+        heatmap.counts[:] = self.counts
+        heatmap.outside = self.outside
+        return heatmap
+
+    def snapshot(self) -> "np.ndarray":
+        """Get a copy of the counts."""
+        return self.counts.copy()
+
+    def density(self) -> "np.ndarray":
+        """Get the counts normalized to sum to 1 (float32)."""
+        total = self.counts.sum()
+        return (self.counts / total if total else self.counts).astype(np.float32)
+
+    def export(self) -> Dict[str, Any]:
+        """Get a JSON serializable snapshot."""
+        return {
+            "bins": self.bins,
+            "extent": self.extent,
+            "outside": self.outside,
+            "counts": self.counts.tolist(),
+        }
+
+    @classmethod
+    def from_export(cls, data: Dict[str, Any]) -> "Heatmap":
+        """Create a heatmap from an export() snapshot."""
+        heatmap = cls(data["bins"], data["extent"])
+        heatmap.counts[:] = np.asarray(data["counts"], dtype=np.uint32)
+        heatmap.outside = data["outside"]
+        return heatmap
+
+
+class HeatmapAccumulator:
+    """
+    Heatmaps per (player ID, board ID), fed by match state frames.
+    """
+
+    def __init__(self, bins: int = 64, extent: float = Heatmap.EXTENT) -> None:
+        """
+        Initialize a HeatmapAccumulator instance.
+
+        Parameters:
+        - bins (int): The number of bins per axis of each heatmap.
+        - extent (float): The half width of the covered square.
+
+        Returns:
+        None
+        """
+        self.bins = bins
+        self.extent = extent
+        self.heatmaps: Dict[Tuple[Optional[str], Optional[str]], Heatmap] = {}
+
+    def add(self, player_id: Optional[str], board_id: Optional[str], x: float, y: float) -> None:
+        """Add one throw of a player on a board."""
+        heatmap = self.heatmaps.get((player_id, board_id))
+        if heatmap is None:
+            heatmap = self.heatmaps[(player_id, board_id)] = Heatmap(self.bins, self.extent)
+        heatmap.add(x, y)
+
+    def remove(self, player_id: Optional[str], board_id: Optional[str], x: float, y: float) -> None:
+        """Remove one throw of a player on a board, added before."""
+        heatmap = self.heatmaps.get((player_id, board_id))
+        if heatmap is not None:
+            heatmap.remove(x, y)
+
+    def attach(self, match: Match) -> Callable[[], None]:
+        """
+        Add the throws of a match as they arrive.
+
+        Parameters:
+        - match (Match): The match, connected to receive frames.
+
+        Returns:
+        Callable[[], None]: The function to detach the accumulator.
+        """
+        cursor = ThrowCursor()
+        # The throws added per turn key, None for those without coords, to remove the undone ones.
+        added: Dict[Any, list] = {}
+
+        def on_state(state):
+            boards = {p.get("id"): p.get("boardId") for p in state.get("players") or []}
+            new = cursor.advance(state)
+            for key, turn in cursor.rewound_turns:
+                throws = added.get(key) or []
+                kept = len(turn.get("throws") or []) if turn is not None else 0
+                for throw in throws[kept:]:
+                    if throw is not None:
+                        self.remove(*throw)
+                del throws[kept:]
+            for turn, throw in new:
+                coords = throw.get("coords")
+                player_id = turn.get("playerId")
+                entry = (player_id, boards.get(player_id), coords["x"], coords["y"]) if coords else None
+                added.setdefault(ThrowCursor.turn_key(turn), []).append(entry)
+                if entry is not None:
+                    self.add(*entry)
+
+        return match.register_callback(on_state)
+
+    def heatmap(self, player_id: Optional[str] = None, board_id: Optional[str] = None) -> Heatmap:
+        """
+        Get a merged heatmap.
+
+        Parameters:
+        - player_id (str|None): Only this player, all players if None.
+        - board_id (str|None): Only this board, all boards if None.
+
+        Returns:
+        Heatmap: A new heatmap with the merged counts.
+        """
+        merged = Heatmap(self.bins, self.extent)
+        for (player, board), heatmap in self.heatmaps.items():
+            if (player_id is None or player == player_id) and (board_id is None or board == board_id):
+                merged.merge(heatmap)
+        return merged
+
+    def merge(self, other: "HeatmapAccumulator") -> "HeatmapAccumulator":
+        """Add the heatmaps of another accumulator, in place."""
+        for key, heatmap in other.heatmaps.items():
+            if key in self.heatmaps:
+                self.heatmaps[key].merge(heatmap)
+            else:
+                self.heatmaps[key] = heatmap.copy()
+        return self
@@ -0,0 +1,125 @@
+from typing import Any, Dict, Iterator, List, Optional
+import time
+
+from .callbacks import event_matches
+
+
+class EventRecord:
+    """
+    A frame received on a topic.
+
+    Attributes:
+    - ts (float): The reception time (time.time()).
+    - topic (str): The topic, state or events.
+    - event (str|None): The event of the frame.
+    - data (dict): The frame.
+    - state (dict|None): A copy of the merged state after a state frame, None for events.
+    """
+
+    __slots__ = ("ts", "topic", "event", "data", "state")
+
+    def __init__(self, ts: float, topic: str, event: Optional[str], data: Dict[str, Any],
+                 state: Optional[Dict[str, Any]] = None) -> None:
+        self.ts = ts
+        self.topic = topic
+        self.event = event
+        self.data = data
+        self.state = state
+
+    def __repr__(self) -> str:
+        return f"<EventRecord {self.ts:.3f} {self.topic} {self.event}>"
+
+
+class EventHistory:
+    """
+    Fixed-size ring buffer of the last frames of an entity.
+
+    The buffer is preallocated and overwritten in place, so its memory stays
+    constant however long the entity runs. Records are in reception order,
+    which lets time-range queries use binary search.
+    """
+
+    def __init__(self, maxlen: int = 256) -> None:
+        """
+        Initialize an EventHistory instance.
+
+        Parameters:
+        - maxlen (int): The number of frames kept.
+
+        Returns:
+        None
+        """
+        if maxlen <= 0:
+            raise ValueError("maxlen must be positive")
+        self.maxlen = maxlen
+        self._records: List[Optional[EventRecord]] = [None] * maxlen
+        self._start = 0
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _at(self, index: int) -> EventRecord:
+        return self._records[(self._start + index) % self.maxlen]
+
+    def __iter__(self) -> Iterator[EventRecord]:
+        for index in range(self._count):
+            yield self._at(index)
+
+    def append(self, topic: str, data: Dict[str, Any], ts: Optional[float] = None,
+               state: Optional[Dict[str, Any]] = None) -> EventRecord:
+        """Record a frame, with the merged state it led to for state frames, dropping the oldest one when full."""
+        ts = time.time() if ts is None else ts
+        if self._count:
+            # Keep the records sorted even if the clock goes back.
+            ts = max(ts, self._at(self._count - 1).ts)
+        record = EventRecord(ts, topic, data.get("event"), data, state)
+        if self._count < self.maxlen:
+            self._records[(self._start + self._count) % self.maxlen] = record
+            self._count += 1
+        else:
+            self._records[self._start] = record
+            self._start = (self._start + 1) % self.maxlen
+        return record
+
+    def clear(self) -> None:
+        """Drop all the records."""
+        self._records = [None] * self.maxlen
+        self._start = self._count = 0
+
+    def _bisect(self, ts: float) -> int:
+        """Get the index of the first record at or after ts."""
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._at(mid).ts < ts:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def between(self, start: Optional[float] = None, end: Optional[float] = None,
+                topic: Optional[str] = None, event: Optional[str] = None) -> List[EventRecord]:
+        """
+        Get the records received in a time range.
+
+        Parameters:
+        - start (float|None): The first time included, from the oldest record if None.
+        - end (float|None): The last time excluded, up to the newest record if None.
+        - topic (str|None): Only this topic, all if None.
+        - event (str|None): Only this event or glob pattern, all if None.
+
+        Returns:
+        List[EventRecord]: The records, oldest first.
+        """
+        first = 0 if start is None else self._bisect(start)
+        last = self._count if end is None else self._bisect(end)
+        return [
+            record for record in (self._at(index) for index in range(first, last))
+            if (topic is None or record.topic == topic) and (event is None or event_matches(record.event, event))
+        ]
+
+    def last(self, n: int = 1) -> List[EventRecord]:
+        """Get the n newest records, oldest first."""
+        n = min(n, self._count)
+        return [self._at(index) for index in range(self._count - n, self._count)]
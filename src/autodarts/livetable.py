@@ -0,0 +1,387 @@
+"""
+Live board and match state in shared memory, for readers in other processes.
+
+A LiveStateTable publishes the key live fields of entities into fixed-size
+rows of a memory-mapped file, in /dev/shm when available so that it stays
+in memory. Readers in other local processes map the same file read-only
+with LiveStateReader and read it without any socket.
+
+Each row is guarded by a sequence lock: the writer makes the sequence odd,
+writes the row, then makes it even again. A reader copies the row between
+two reads of the sequence, and retries when they differ or are odd. There
+must be a single writer per table. Row layout (little-endian, ROW_STRUCT,
+128 bytes):
+
+    seq u4 | kind u1 | status u1 | flags u1 | player u1 | round u2 |
+    throws u1 | segment u1 | players u1 | pad 3 | x f4 | y f4 |
+    updated f8 | scores 8 x i4 | id 64s
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+from .session import AutoDartException
+from .segments import SEGMENTS, SEGMENT_CODES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+LIVETABLE_MAGIC = b"ADLIVE"
+LIVETABLE_VERSION = 1
+_HEADER = struct.Struct("<6sHII")
+HEADER_SIZE = 64
+_SEQ = struct.Struct("<I")
+# The row without its sequence.
+_ROW = struct.Struct("<BBBBHBBB3xffd8i64s")
+ROW_SIZE = _SEQ.size + _ROW.size
+MAX_SCORES = 8
+
+KINDS = ("", "board", "match")
+BOARD_STATUSES = ("", "Stopped", "Starting", "Throw", "Takeout", "Stopping", "Calibration", "Offline")
+UNKNOWN = 255
+
+FLAG_RUNNING = 1
+FLAG_CONNECTED = 2
+FLAG_FINISHED = 4
+
+ROW_DTYPE = None
+if np is not None:
+    ROW_DTYPE = np.dtype({
+        "names": ["seq", "kind", "status", "flags", "player", "round", "throws", "segment", "players",
+                  "x", "y", "updated", "scores", "id"],
+        "formats": ["<u4", "u1", "u1", "u1", "u1", "<u2", "u1", "u1", "u1",
+                    "<f4", "<f4", "<f8", ("<i4", (MAX_SCORES,)), "S64"],
+        "offsets": [0, 4, 5, 6, 7, 8, 10, 11, 12, 16, 20, 24, 32, 64],
+        "itemsize": ROW_SIZE,
+    })
+
+
+class AutoDartLiveTableException(AutoDartException):
+    """Exception raised for full or invalid live state tables."""
+    pass
+
+
+def default_path() -> str:
+    """Get a new table path, in /dev/shm when it exists."""
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    fd, path = tempfile.mkstemp(prefix="autodarts-live-", suffix=".tbl", dir=directory)
+    os.close(fd)
+    return path
+
+
+def _last_throw(state: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], int]:
+    """Get the last throw of a board or match state and the throws of the current turn."""
+    turns = state.get("turns")
+    if turns is not None:
+        throws = (turns[-1].get("throws") or []) if turns else []
+    else:
+        throws = state.get("throws") or []
+    return (throws[-1] if throws else None), len(throws)
+
+
+def row_fields(kind: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the row fields of an entity state.
+
+    Parameters:
+    - kind (str): board or match.
+    - state (dict): The ws_data of the entity.
+
+    Returns:
+    Dict[str, Any]: The fields, as accepted by LiveStateTable.update.
+    """
+    throw, throws = _last_throw(state)
+    segment = (throw or {}).get("segment") or {}
+    coords = (throw or {}).get("coords") or {}
+    fields = {
+        "throws": throws,
+        "segment": segment.get("name"),
+        "x": coords.get("x"),
+        "y": coords.get("y"),
+    }
+    if kind == "board":
+        fields.update(status=state.get("status"), running=bool(state.get("running")),
+                      connected=bool(state.get("connected", True)))
+    else:
+        fields.update(player=state.get("player"), round=state.get("round"),
+                      scores=state.get("gameScores") or [], finished=bool(state.get("finished")))
+    return fields
+
+
+class LiveStateTable:
+    """
+    Writer of a memory-mapped table of live entity states.
+
+    Rows are assigned to entity IDs on first update and freed by remove.
+    """
+
+    def __init__(self, rows: int = 256, path: Optional[str] = None) -> None:
+        """
+        Initialize a LiveStateTable instance, creating its file.
+
+        Parameters:
+        - rows (int): The number of rows, entities published at once.
+        - path (str|None): The file path, a new one in /dev/shm (or the temp directory) if None.
+
+        Returns:
+        None
+        """
+        self.rows = rows
+        self.path = path or default_path()
+        with open(self.path, "w+b") as f:
+            f.truncate(HEADER_SIZE + rows * ROW_SIZE)
+            self._mmap = mmap.mmap(f.fileno(), HEADER_SIZE + rows * ROW_SIZE)
+        self.buf = memoryview(self._mmap)
+        _HEADER.pack_into(self.buf, 0, LIVETABLE_MAGIC, LIVETABLE_VERSION, rows, ROW_SIZE)
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = list(range(rows - 1, -1, -1))
+        self.writes = 0
+
+    def _row(self, id: str) -> int:
+        row = self._rows.get(id)
+        if row is None:
+            if not self._free:
+                raise AutoDartLiveTableException(f"The live state table is full ({self.rows} rows)")
+            row = self._rows[id] = self._free.pop()
+        return row
+
+    def _write(self, row: int, payload: bytes) -> None:
+        offset = HEADER_SIZE + row * ROW_SIZE
+        buf = self.buf
+        seq = _SEQ.unpack_from(buf, offset)[0]
+        _SEQ.pack_into(buf, offset, (seq + 1) & 0xFFFFFFFF)
+        buf[offset + _SEQ.size:offset + ROW_SIZE] = payload
+        _SEQ.pack_into(buf, offset, (seq + 2) & 0xFFFFFFFF)
+        self.writes += 1
+
+    def update(self, id: str, kind: str, status: Optional[str] = None, running: bool = False,
+               connected: bool = False, finished: bool = False, player: Optional[int] = None,
+               round: Optional[int] = None, throws: int = 0, segment: Optional[str] = None,
+               x: Optional[float] = None, y: Optional[float] = None, scores: List[int] = ()) -> None:
+        """
+        Write the row of an entity.
+
+        Parameters:
+        - id (str): The entity ID, at most 64 bytes in UTF-8.
+        - kind (str): board or match.
+        - status (str|None): The board status, one of BOARD_STATUSES.
+        - running, connected, finished (bool): The flags.
+        - player (int|None): The index of the current player.
+        - round (int|None): The round.
+        - throws (int): The throws of the current turn.
+        - segment (str|None): The segment name of the last throw.
+        - x, y (float|None): The coords of the last throw, NaN if None.
+        - scores (List[int]): The scores of the players, up to MAX_SCORES.
+        """
+        flags = (FLAG_RUNNING if running else 0) | (FLAG_CONNECTED if connected else 0) | \
+                (FLAG_FINISHED if finished else 0)
+        scores = [int(score or 0) for score in list(scores)[:MAX_SCORES]]
+        payload = _ROW.pack(
+            KINDS.index(kind),
+            BOARD_STATUSES.index(status) if status in BOARD_STATUSES else UNKNOWN,
+            flags,
+            UNKNOWN if player is None else min(int(player), UNKNOWN - 1),
+            min(int(round or 0), 0xFFFF),
+            min(int(throws), 0xFF),
+            SEGMENT_CODES.get(segment, UNKNOWN) if segment else UNKNOWN,
+            len(scores),
+            float("nan") if x is None else x,
+            float("nan") if y is None else y,
+            time.time(),
+            *(scores + [0] * (MAX_SCORES - len(scores))),
+            id.encode()[:64],
+        )
+        self._write(self._row(id), payload)
+
+    def publish(self, entity: "AutoDartEndpointWs") -> None:
+        """Write the row of a CloudBoard or Match from its state."""
+        kind = "match" if entity.channel == "autodarts.matches" else "board"
+        self.update(entity.id, kind, **row_fields(kind, entity.ws_data))
+
+    def attach(self, entity: "AutoDartEndpointWs") -> Callable[[], None]:
+        """
+        Publish a CloudBoard or Match on each of its state frames.
+
+        Returns:
+        Callable[[], None]: The function to detach the entity, freeing its row.
+        """
+        self.publish(entity)
+        unregister = entity.register_callback(lambda state: self.publish(entity))
+
+        def detach() -> None:
+            unregister()
+            self.remove(entity.id)
+        return detach
+
+    def remove(self, id: str) -> None:
+        """Free the row of an entity."""
+        row = self._rows.pop(id, None)
+        if row is not None:
+            self._write(row, bytes(_ROW.size))
+            self._free.append(row)
+
+    def close(self, unlink: bool = True) -> None:
+        """Close the table, and delete its file with unlink."""
+        self.buf.release()
+        self._mmap.close()
+        if unlink:
+            os.unlink(self.path)
+
+    def __enter__(self) -> "LiveStateTable":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class LiveStateReader:
+    """
+    Reader of a LiveStateTable, from any local process.
+
+    Row reads are consistent copies of 128 bytes, retried while the writer
+    is writing the row. The array property is a zero-copy NumPy view of all
+    the rows, for scans that tolerate a row being rewritten meanwhile, and
+    snapshot() a consistent copy of it.
+    """
+
+    def __init__(self, path: str, timeout: float = 0.1) -> None:
+        """
+        Initialize a LiveStateReader instance.
+
+        Parameters:
+        - path (str): The path of the table.
+        - timeout (float): The seconds to wait for a row being written before giving up.
+
+        Raises:
+        - AutoDartLiveTableException: If the file is not a live state table.
+
+        Returns:
+        None
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf = memoryview(self._mmap)
+        magic, version, self.rows, row_size = _HEADER.unpack_from(self.buf, 0)
+        if magic != LIVETABLE_MAGIC or version != LIVETABLE_VERSION or row_size != ROW_SIZE:
+            self.close()
+            raise AutoDartLiveTableException(f"{path} is not a live state table version {LIVETABLE_VERSION}")
+        self.timeout = timeout
+        self._index: Dict[str, int] = {}
+
+    def _read_row(self, row: int) -> Optional[bytes]:
+        """Get a consistent copy of a row, sequence included, None if it kept being written."""
+        offset = HEADER_SIZE + row * ROW_SIZE
+        buf = self.buf
+        deadline = None
+        attempts = 0
+        while True:
+            seq = _SEQ.unpack_from(buf, offset)[0]
+            if not seq & 1:
+                data = bytes(buf[offset:offset + ROW_SIZE])
+                if _SEQ.unpack_from(buf, offset)[0] == seq:
+                    return data
+            attempts += 1
+            if attempts % 64 == 0:
+                # The writer may have been preempted in the middle of the row, let it run.
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + self.timeout
+                elif now > deadline:
+                    return None
+                time.sleep(0)
+
+    @staticmethod
+    def _decode(data: bytes) -> Optional[Dict[str, Any]]:
+        (kind, status, flags, player, round, throws, segment, players, x, y, updated,
+         *scores, id) = _ROW.unpack_from(data, _SEQ.size)
+        if not kind:
+            return None
+        return {
+            "id": id.rstrip(b"\0").decode(),
+            "kind": KINDS[kind],
+            "status": BOARD_STATUSES[status] if status < len(BOARD_STATUSES) else None,
+            "running": bool(flags & FLAG_RUNNING),
+            "connected": bool(flags & FLAG_CONNECTED),
+            "finished": bool(flags & FLAG_FINISHED),
+            "player": None if player == UNKNOWN else player,
+            "round": round,
+            "throws": throws,
+            "segment": SEGMENTS[segment][0] if segment < len(SEGMENTS) else None,
+            "x": x,
+            "y": y,
+            "scores": scores[:players],
+            "updated": updated,
+        }
+
+    def _get(self, row: int) -> Optional[Dict[str, Any]]:
+        data = self._read_row(row)
+        if data is None:
+            raise AutoDartLiveTableException(f"Row {row} kept being written for {self.timeout}s")
+        return self._decode(data)
+
+    def read(self, id: str) -> Optional[Dict[str, Any]]:
+        """Get the fields of an entity, None if it is not in the table."""
+        row = self._index.get(id)
+        if row is not None:
+            fields = self._get(row)
+            if fields is not None and fields["id"] == id:
+                return fields
+        # Rows are reassigned when entities leave, look it up again.
+        for fields, row in self._scan():
+            if fields["id"] == id:
+                return fields
+        return None
+
+    def _scan(self) -> Iterator[Tuple[Dict[str, Any], int]]:
+        self._index.clear()
+        for row in range(self.rows):
+            fields = self._get(row)
+            if fields is not None:
+                self._index[fields["id"]] = row
+                yield fields, row
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Iterate the fields of all the published entities."""
+        for fields, _ in self._scan():
+            yield fields
+
+    @property
+    def array(self) -> "np.ndarray":
+        """Get a zero-copy structured NumPy view of the rows, not guarded by the sequence lock."""
+        if np is None:
+            raise AutoDartException("numpy is required for array views, install autodarts[numpy]")
+        return np.ndarray((self.rows,), dtype=ROW_DTYPE, buffer=self.buf, offset=HEADER_SIZE)
+
+    def snapshot(self) -> "np.ndarray":
+        """Get a copy of the rows where each row is consistent."""
+        view = self.array
+        copy = view.copy()
+        # Rows being written or rewritten during the copy are read again one by one.
+        unstable = np.flatnonzero((copy["seq"] & 1) | (view["seq"] != copy["seq"]))
+        for row in unstable:
+            data = self._read_row(int(row))
+            if data is None:
+                raise AutoDartLiveTableException(f"Row {row} kept being written for {self.timeout}s")
+            copy[row] = np.frombuffer(data, dtype=ROW_DTYPE)[0]
+        return copy
+
+    def close(self) -> None:
+        """Unmap the table, the arrays got from it must have been released."""
+        self.buf.release()
+        self._mmap.close()
+
+    def __enter__(self) -> "LiveStateReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,295 @@
+"""
+Synthetic board load on the fake server, to stress the client.
+
+Thousands of simulated boards publish throw and takeout state frames at
+configurable rates through FakeAutodartsServer, while the client follows
+every board with a connected CloudBoard. The report gives the client-side
+frame rate, the depth of the frames sent and not yet dispatched, and the
+end-to-end latency from publication to callback.
+
+    python benchmark/board_load.py --boards 1000 --rate 2 --profile bursty
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import math
+import random
+import time
+
+from .session import AutoDartSession
+from .board import CloudBoard
+from .segments import SEGMENT_CODES, SEGMENTS, classify_code, target_point
+from .testing import FakeAutodartsServer
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Aimed fields of a typical club player, with their weights.
+THROW_TARGETS: Dict[str, float] = {
+    "T20": 40, "S20": 15, "T19": 10, "S19": 5, "D20": 5, "D16": 5, "D8": 2,
+    "Bull": 4, "25": 3, "S1": 3, "S5": 3, "T18": 2, "S18": 2, "Miss": 1,
+}
+
+
+class ThrowGenerator:
+    """Random throws around weighted FIELD_COORDS targets, classified into segments."""
+
+    def __init__(self, targets: Optional[Dict[str, float]] = None, sigma: float = 0.05, seed: Any = 0) -> None:
+        """
+        Initialize a ThrowGenerator instance.
+
+        Parameters:
+        - targets (Dict[str, float]|None): The aimed fields and their weights, THROW_TARGETS if None.
+        - sigma (float): The standard deviation around the aim, in normalized board units.
+        - seed (Any): The random seed.
+
+        Returns:
+        None
+        """
+        targets = targets or THROW_TARGETS
+        self.names = list(targets)
+        self.weights = list(itertools.accumulate(targets.values()))
+        self.points = [target_point(name) for name in self.names]
+        self.sigma = sigma
+        self.rng = random.Random(seed)
+
+    def throw(self) -> Dict[str, Any]:
+        """Get a throw, with segment and coords like in board states."""
+        aim_x, aim_y = self.points[self.rng.choices(range(len(self.names)), cum_weights=self.weights)[0]]
+        x, y = self.rng.gauss(aim_x, self.sigma), self.rng.gauss(aim_y, self.sigma)
+        name, number, multiplier = SEGMENTS[classify_code(x, y)]
+        return {"segment": {"name": name, "number": number, "multiplier": multiplier}, "coords": {"x": x, "y": y}}
+
+
+class LoadProfile:
+    """
+    Frame emission profile of each simulated board.
+
+    Attributes:
+    - rate (float): The mean throws per second of a board.
+    - burst (int): The throws sent back to back at each tick, the tick interval growing to keep the rate.
+    - jitter (float): The random variation of the tick interval, as a fraction of it.
+    - takeout (bool): Send the takeout state frames after every third throw.
+    """
+
+    def __init__(self, rate: float = 1.0, burst: int = 1, jitter: float = 0.0, takeout: bool = True) -> None:
+        if rate <= 0 or burst < 1 or not 0 <= jitter < 1:
+            raise ValueError("rate must be positive, burst at least 1 and jitter in [0, 1)")
+        self.rate = rate
+        self.burst = burst
+        self.jitter = jitter
+        self.takeout = takeout
+
+    @property
+    def interval(self) -> float:
+        """Get the mean seconds between two ticks of a board."""
+        return self.burst / self.rate
+
+    def next_interval(self, rng: random.Random) -> float:
+        """Get the seconds to the next tick."""
+        if not self.jitter:
+            return self.interval
+        return self.interval * rng.uniform(1 - self.jitter, 1 + self.jitter)
+
+    @classmethod
+    def named(cls, name: str, rate: float = 1.0) -> "LoadProfile":
+        """Get a preset profile: steady, bursty (3 darts at once) or jittery."""
+        presets = {
+            "steady": {},
+            "bursty": {"burst": 3, "jitter": 0.2},
+            "jittery": {"jitter": 0.9},
+        }
+        if name not in presets:
+            raise ValueError(f"Unknown profile {name}, expected one of {', '.join(presets)}")
+        return cls(rate=rate, **presets[name])
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return float("nan")
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+
+class LoadReport:
+    """
+    Result of a load run.
+
+    Attributes:
+    - boards (int): The simulated boards.
+    - duration (float): The seconds of emission.
+    - sent (int): The frames published by the server.
+    - received (int): The frames dispatched to the client callbacks.
+    - latencies (List[float]): Sorted publication to callback delays, in seconds.
+    - depths (List[int]): Sampled frames sent and not yet dispatched.
+    """
+
+    def __init__(self, boards: int, duration: float, sent: int, received: int,
+                 latencies: List[float], depths: List[int]) -> None:
+        self.boards = boards
+        self.duration = duration
+        self.sent = sent
+        self.received = received
+        self.latencies = sorted(latencies)
+        self.depths = depths
+
+    @property
+    def frames_per_second(self) -> float:
+        """Get the frames dispatched per second."""
+        return self.received / self.duration if self.duration else 0.0
+
+    def latency(self, q: float) -> float:
+        """Get a latency percentile, in seconds."""
+        return _percentile(self.latencies, q)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Get the report as a dict of numbers."""
+        return {
+            "boards": self.boards,
+            "duration": self.duration,
+            "sent": self.sent,
+            "received": self.received,
+            "lost": self.sent - self.received,
+            "frames_per_second": self.frames_per_second,
+            "latency_p50_ms": self.latency(0.5) * 1000,
+            "latency_p99_ms": self.latency(0.99) * 1000,
+            "latency_max_ms": self.latency(1.0) * 1000,
+            "depth_mean": sum(self.depths) / len(self.depths) if self.depths else 0.0,
+            "depth_max": max(self.depths, default=0),
+        }
+
+    def __str__(self) -> str:
+        report = self.as_dict()
+        return (
+            f"{report['boards']} boards, {report['duration']:.1f}s: "
+            f"{report['frames_per_second']:.0f} frames/s dispatched, {report['received']}/{report['sent']} frames, "
+            f"latency p50 {report['latency_p50_ms']:.1f}ms p99 {report['latency_p99_ms']:.1f}ms "
+            f"max {report['latency_max_ms']:.1f}ms, queue depth mean {report['depth_mean']:.1f} "
+            f"max {report['depth_max']}"
+        )
+
+
+class BoardLoadGenerator:
+    """
+    Drive simulated boards on a fake server and measure the client following them.
+
+    One scheduler task emits for every board, from a heap of due times, so
+    thousands of boards don't need thousands of timers. Each state frame
+    carries its publication time (``sentAt``, time.perf_counter()) for the
+    latency measure.
+    """
+
+    def __init__(self, server: FakeAutodartsServer, boards: int = 100, profile: Optional[LoadProfile] = None,
+                 throws: Optional[ThrowGenerator] = None, seed: Any = 0, sample_interval: float = 0.1) -> None:
+        """
+        Initialize a BoardLoadGenerator instance.
+
+        Parameters:
+        - server (FakeAutodartsServer): The started fake server.
+        - boards (int): The number of simulated boards.
+        - profile (LoadProfile|None): The emission profile, steady at 1 throw/s if None.
+        - throws (ThrowGenerator|None): The throw distribution, THROW_TARGETS if None.
+        - seed (Any): The seed of the tick jitter.
+        - sample_interval (float): The seconds between two queue depth samples.
+
+        Returns:
+        None
+        """
+        self.server = server
+        self.board_count = boards
+        self.profile = profile or LoadProfile()
+        self.throws = throws or ThrowGenerator(seed=seed)
+        self.rng = random.Random(seed)
+        self.sample_interval = sample_interval
+        self.board_ids = [server.add_board(id=f"load-{i}")["id"] for i in range(boards)]
+        self.sent = 0
+        self.received = 0
+        self.latencies: List[float] = []
+        self.depths: List[int] = []
+
+    async def _async_emit(self, duration: float) -> None:
+        now = time.perf_counter()
+        end = now + duration
+        # Spread the first ticks over one interval, so boards don't start in lockstep.
+        due = [(now + self.rng.uniform(0, self.profile.interval), index) for index in range(self.board_count)]
+        heapq.heapify(due)
+        darts = [0] * self.board_count
+        while due:
+            at, index = due[0]
+            if at >= end:
+                break
+            # Yield even when late, so the client reads its sockets under any load.
+            await asyncio.sleep(max(0.0, at - time.perf_counter()))
+            heapq.heapreplace(due, (at + self.profile.next_interval(self.rng), index))
+            board_id = self.board_ids[index]
+            for _ in range(self.profile.burst):
+                if darts[index] == 3:
+                    darts[index] = 0
+                    if self.profile.takeout:
+                        await self._async_publish(board_id, event="Takeout started", status="Takeout",
+                                                  numThrows=3)
+                        await self._async_publish(board_id, event="Takeout finished", status="Throw",
+                                                  numThrows=0, throws=[])
+                darts[index] += 1
+                throws = self.server.boards[board_id]["state"]["throws"][:darts[index] - 1] + [self.throws.throw()]
+                await self._async_publish(board_id, event="Throw detected", status="Throw",
+                                          numThrows=darts[index], throws=throws)
+
+    async def _async_publish(self, board_id: str, **changes) -> None:
+        changes["sentAt"] = time.perf_counter()
+        await self.server.publish_board(board_id, **changes)
+        self.sent += 1
+
+    async def _async_sample(self) -> None:
+        while True:
+            self.depths.append(self.sent - self.received)
+            await asyncio.sleep(self.sample_interval)
+
+    def _on_state(self, state: Dict[str, Any]) -> None:
+        self.received += 1
+        sent_at = state["state"].get("sentAt")
+        if sent_at is not None:
+            self.latencies.append(time.perf_counter() - sent_at)
+
+    async def async_run(self, session: AutoDartSession, duration: float = 10.0, drain: float = 5.0) -> LoadReport:
+        """
+        Connect a CloudBoard per simulated board, emit for a duration and report.
+
+        Parameters:
+        - session (AutoDartSession): A session on the fake server, with a connector allowing a connection per board.
+        - duration (float): The seconds of emission.
+        - drain (float): The maximum seconds to wait for the frames in flight afterwards.
+
+        Returns:
+        LoadReport: The measures.
+        """
+        limit = session.session.connector.limit if session.session.connector else 0
+        if limit and limit < self.board_count:
+            # Each websocket holds a connection, the boards above the limit would never connect.
+            raise ValueError(f"The session connector allows {limit} connections for {self.board_count} boards, "
+                             "create it with connector=aiohttp.TCPConnector(limit=0)")
+        ids = set(self.board_ids)
+        boards = [board async for board in CloudBoard.factory(session) if board.id in ids]
+        unregisters = [board.register_callback(self._on_state) for board in boards]
+        for board in boards:
+            board.connect()
+        # Wait for every websocket to be subscribed before emitting.
+        while self.server.subscriber_count("autodarts.boards") < 2 * len(boards):
+            await asyncio.sleep(0.05)
+
+        sampler = asyncio.create_task(self._async_sample())
+        start = time.perf_counter()
+        try:
+            await self._async_emit(duration)
+            deadline = time.perf_counter() + drain
+            while self.received < self.sent and time.perf_counter() < deadline:
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - start
+        finally:
+            sampler.cancel()
+            for unregister in unregisters:
+                unregister()
+            for board in boards:
+                board.disconnect()
+        return LoadReport(len(boards), elapsed, self.sent, self.received, self.latencies, self.depths)
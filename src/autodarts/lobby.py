@@ -1,11 +1,16 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Union
+import asyncio
 from .endpoint import AutoDartEndpointWs
-from .session import AutoDartSession
+from .session import AutoDartSession, AutoDartException
 from .host import Host
 from .player import Player
 from .match import Match
 from posixpath import join as urljoin
 
+import logging
+
+logger = logging.getLogger(__name__)
+
 class Lobby(AutoDartEndpointWs):
     """
     Represents a lobby in the AutoDARTS system.
@@ -25,24 +30,24 @@ class Lobby(AutoDartEndpointWs):
     ENDPOINT: str = "gs/v0/lobbies/"
     CHANNEL: str = "autodarts.lobbies"
     
-    def __init__(self, session: AutoDartSession, on_state_cb=None, on_event_cb=None,
-                 ws_url: str = AutoDartEndpointWs.WS_ENDPOINT, endpoint: str = ENDPOINT,
-                 channel: str = CHANNEL) -> None:
+    def __init__(self, state: Dict[str, Any], session: AutoDartSession,
+                 ws_url: Optional[str] = None, endpoint: str = ENDPOINT,
+                 channel: str = CHANNEL, api_url: Optional[str] = None) -> None:
         """
         Initialize a Lobby instance.
 
         Parameters:
+        - state (Dict[str, Any]): The state of the lobby.
         - session (AutoDartSession): The session used for communication.
-        - on_state_cb: Callback function for state changes.
-        - on_event_cb: Callback function for events.
-        - ws_url (str): The WebSocket URL.
+        - ws_url (str|None): The WebSocket URL, the one of the session if None.
         - endpoint (str): The API endpoint for the lobby.
         - channel (str): The WebSocket channel for the lobby.
+        - api_url (str|None): The base API URL, the one of the session if None.
 
         Returns:
         None
         """
-        super().__init__(session, endpoint, channel, on_state_cb=on_state_cb, on_event_cb=on_event_cb, ws_url=ws_url)
+        super().__init__(state, session, endpoint, channel, ws_url=ws_url, api_url=api_url)
     
     @property
     def created_at(self) -> Optional[str]:
@@ -92,28 +97,85 @@ class Lobby(AutoDartEndpointWs):
         Yields:
         - Player: The next player in the lobby.
         """
-        for player in self._state.get("players"):
-            yield Player(self.session, player)
-    
-    async def async_add_player(self, player: Player) -> None:
+        for player in self._state.get("players") or []:
+            yield Player(player, self.session)
+
+    @property
+    def ws_data(self) :
+        return self._state
+
+    async def async_load_state(self):
+        """The lobby data is its whole state, there is nothing more to load."""
+        pass
+
+    @staticmethod
+    def _player_data(player: Union[Player, Dict[str, Any]]) -> Dict[str, Any]:
+        """Get the request body adding a player, from a Player or a dict with name, boardId and userId."""
+        if isinstance(player, Player):
+            player = {"name": player.name, "boardId": player.board_id, "userId": player.user_id}
+        data: Dict[str, Any] = {
+            'boardId': player.get("boardId"),
+            'name': player.get("name"),
+        }
+
+        if player.get("userId"):
+            data['userId'] = player["userId"]
+        return data
+
+    @staticmethod
+    def _player_key(player: Dict[str, Any]) -> tuple:
+        return (player.get("boardId"), player.get("name"), player.get("userId") or None)
+
+    async def async_add_player(self, player: Union[Player, Dict[str, Any]]) -> None:
         """
         Add a player to the lobby.
 
         Parameters:
-        - player (Player): The player to be added to the lobby.
+        - player (Player|dict): The player to be added to the lobby, or a dict with name, boardId and userId.
 
         Returns:
         None
         """
-        data: Dict[str, Any] = {
-            'boardId': player.boardId,
-            'name': player.name,
-        }
+        response = await self.session.post(self.get_endpoint("players"), json=self._player_data(player))
+        if not response.ok:
+            raise AutoDartException(f"Adding player to lobby {self.id} failed with status {response.status}")
+
+    async def async_add_players(self, players: Iterable[Union[Player, Dict[str, Any]]]) -> List[Player]:
+        """
+        Add many players to the lobby concurrently, keeping their order.
+
+        The requests are sent at once, so the server may receive them out of
+        order. The lobby is then reloaded, and if the indexes don't follow the
+        given order, the players after the first misplaced one are removed and
+        added back one at a time.
 
-        if player.userId:
-            data['userId'] = player.userId
-        
-        await self.session.post(self.get_endpoint("players"), data=data)
+        Parameters:
+        - players (Iterable[Player|dict]): The players, in index order.
+
+        Returns:
+        List[Player]: The players of the lobby.
+        """
+        players = [self._player_data(player) for player in players]
+        first = len(self._state.get("players") or [])
+        # Authenticate once, not once per concurrent request.
+        await self.session.token()
+        await asyncio.gather(*(self.async_add_player(player) for player in players))
+        await self.async_load_data()
+
+        lobby_players = sorted(self._state.get("players") or [], key=lambda p: p.get("index", 0))
+        wanted = [self._player_key(player) for player in players]
+        added = [self._player_key(player) for player in lobby_players[first:]]
+        ordered = 0
+        while ordered < min(len(wanted), len(added)) and wanted[ordered] == added[ordered]:
+            ordered += 1
+        if ordered < len(wanted):
+            # Remove from the end, so the indexes of the removed players don't shift.
+            for player in reversed(lobby_players[first + ordered:]):
+                await self.session.delete(self.get_endpoint("players", "by-index", str(player.get("index"))))
+            for player in players[ordered:]:
+                await self.async_add_player(player)
+            await self.async_load_data()
+        return list(self.players)
     
     async def async_remove_player(self, player: Player) -> None:
         """
@@ -125,7 +187,7 @@ class Lobby(AutoDartEndpointWs):
         Returns:
         None
         """
-        await self.session.delete(self.get_endpoint("players", "by-index", player.index))
+        await self.session.delete(self.get_endpoint("players", "by-index", str(player.index)))
     
     async def async_delete(self) -> None:
         """Delete the lobby."""
@@ -138,8 +200,10 @@ class Lobby(AutoDartEndpointWs):
         Returns:
         Match: The Match object representing the started match.
         """
-        state = await self.session.put(self.get_endpoint("start")).json()
-        return Match(self.session, state=state)
+        response = await self.session.put(self.get_endpoint("start"))
+        if not response.ok:
+            raise AutoDartException(f"Starting lobby {self.id} failed with status {response.status}")
+        return Match.from_state(self.session, await response.json())
     
     @classmethod
     async def async_new(cls, session: AutoDartSession, variant: Any, settings: Any,
@@ -164,6 +228,46 @@ class Lobby(AutoDartEndpointWs):
             "isPrivate": isPrivate
         }
 
-        endpoint = urljoin(cls.API_URL, cls.ENDPOINT)
-        state = await session.post(endpoint, data=data).json()
-        return cls(session, state=state)
+        endpoint = urljoin(cls.base_url(session), cls.ENDPOINT)
+        response = await session.post(endpoint, json=data)
+        if not response.ok:
+            raise AutoDartException(f"Creating lobby failed with status {response.status}")
+        return cls.from_state(session, await response.json())
+
+    @classmethod
+    async def async_setup_match(cls, session: AutoDartSession, variant: Any, settings: Any,
+                                players: Iterable[Union[Player, Dict[str, Any]]], bullOffMode: str = "Off",
+                                isPrivate: bool = True, connect: bool = True) -> Match:
+        """
+        Create a lobby with its players, start it and get the connected match.
+
+        This takes three sequential round trips in the usual case: the lobby
+        creation, the concurrent player additions (plus a lobby reload), and
+        the start.
+
+        Parameters:
+        - session (AutoDartSession): The session used for communication.
+        - variant: The variant of the match.
+        - settings: The settings of the match.
+        - players (Iterable[Player|dict]): The players, in turn order.
+        - bullOffMode (str): The bull-off mode of the lobby.
+        - isPrivate (bool): Indicates if the lobby is private.
+        - connect (bool): Connect the match to its websocket before returning it.
+
+        Returns:
+        Match: The started match.
+        """
+        lobby = await cls.async_new(session, variant, settings, bullOffMode=bullOffMode, isPrivate=isPrivate)
+        try:
+            await lobby.async_add_players(players)
+            match = await lobby.async_start()
+        except Exception:
+            # Don't leave the lobby of a failed setup behind.
+            try:
+                await lobby.async_delete()
+            except Exception as err:
+                logger.warning(f"Can't delete lobby {lobby.id} of a failed setup: {err}")
+            raise
+        if connect:
+            match.connect()
+        return match
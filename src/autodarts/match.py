@@ -1,4 +1,5 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
+import copy
 from .endpoint import AutoDartEndpointWs
 from .session import AutoDartSession
 
@@ -104,7 +105,7 @@ class Match(AutoDartEndpointWs):
     CHANNEL: str = "autodarts.matches"
     
     def __init__(self, state,session: AutoDartSession,
-                 ws_url: str = AutoDartEndpointWs.WS_ENDPOINT, 
+                 ws_url: Optional[str] = None,
                  endpoint: str = ENDPOINT,
                  channel: str = CHANNEL) -> None:
         """
@@ -113,7 +114,7 @@ class Match(AutoDartEndpointWs):
         Parameters:
         - state (Dict[str, Any]): The state of the match.   
         - session (AutoDartSession): The session used for communication.
-        - ws_url (str): The WebSocket URL.
+        - ws_url (str|None): The WebSocket URL, the one of the session if None.
         - endpoint (str): The API endpoint for the match.
         - channel (str): The WebSocket channel for the match.
 
@@ -242,7 +243,12 @@ class Match(AutoDartEndpointWs):
 
     async def async_next_player(self) -> None:
         """Move to the next player in the match."""
-        await self.session.post(self.get_endpoint("players", "next"))
+        def changes(state):
+            players = state.get("players") or []
+            if not players or state.get("player") is None :
+                return {}
+            return {"player": (state["player"] + 1) % len(players)}
+        await self.async_optimistic("next_player", self.session.post(self.get_endpoint("players", "next")), changes)
 
     async def async_next_match(self) -> None:
         """Move to the next match in the game."""
@@ -250,7 +256,28 @@ class Match(AutoDartEndpointWs):
 
     async def async_undo(self) -> None:
         """Undo the match."""
-        await self.session.post(self.get_endpoint("undo"))
+        turns = self.ws_data.get("turns") or []
+        before = (len(turns), len(turns[-1].get("throws") or []) if turns else 0)
+
+        def changes(state):
+            if not state.get("turns") :
+                return {}
+            turns = copy.deepcopy(state["turns"])
+            if not turns[-1].get("throws") :
+                # The last turn is still empty: undo goes back into the previous one.
+                turns.pop()
+            if turns and turns[-1].get("throws") :
+                turns[-1]["throws"].pop()
+            return {"turns": turns}
+
+        def confirm(frame):
+            # A throw less in the last turn, or a turn less.
+            turns = frame.get("turns")
+            if turns is None :
+                return False
+            return (len(turns), len(turns[-1].get("throws") or []) if turns else 0) < before
+
+        await self.async_optimistic("undo", self.session.post(self.get_endpoint("undo")), changes, confirm)
 
     async def async_abort(self) -> None:
         """Abort the match."""
@@ -283,7 +310,21 @@ class Match(AutoDartEndpointWs):
             }
             if point :
                 data['coords'] = point
-            await self.session.post(self.get_endpoint("throws"), json=data)
+            turns = self.ws_data.get("turns") or []
+            expected = len(turns[-1].get("throws") or []) + 1 if turns else None
+
+            def changes(state):
+                if not expected :
+                    return {}
+                turns = copy.deepcopy(state["turns"])
+                turns[-1].setdefault("throws", []).append(dict(data))
+                return {"turns": turns}
+
+            def confirm(frame):
+                turns = frame.get("turns")
+                return bool(turns) and expected is not None and len(turns[-1].get("throws") or []) >= expected
+
+            await self.async_optimistic("throw", self.session.post(self.get_endpoint("throws"), json=data), changes, confirm)
         else :
             if not point :
                 point = FIELD_COORDS[segment['name']]
@@ -297,4 +338,80 @@ class Match(AutoDartEndpointWs):
             }
             await self.session.patch(self.get_endpoint("throws"), json=data)
 
+class ThrowCursor:
+    """
+    Track which throws of successive match states have already been seen.
+
+    Match state frames carry the full current turn, so each frame repeats
+    the throws already reported. The cursor only returns the new ones,
+    resuming from the last turn it saw, so a frame costs its new turns and
+    not the whole leg.
+
+    Attributes:
+    - rewound (bool): True if the last advance saw throws disappear (undo or edit).
+    - rewound_turns (List[Tuple[Any, dict|None]]): The (key, turn) of the turns
+      that lost throws in the last advance, turn None if it was removed.
+    """
+
+    def __init__(self) -> None:
+        self._seen: Dict[Any, int] = {}
+        self._last: Any = None
+        self.rewound = False
+        self.rewound_turns: List[Tuple[Any, Optional[Dict[str, Any]]]] = []
+
+    @staticmethod
+    def turn_key(turn: Dict[str, Any]) -> Any:
+        """Get the key identifying a turn."""
+        return turn.get("id") or (turn.get("round"), turn.get("playerId"))
+
+    def _resume(self, turns: List[Dict[str, Any]]) -> int:
+        """Get the position of the last turn seen, looking back from the end, 0 if it is gone."""
+        if self._last is None:
+            return 0
+        for position in range(len(turns) - 1, -1, -1):
+            if self.turn_key(turns[position]) == self._last:
+                return position
+        keys = {self.turn_key(turn) for turn in turns}
+        if any(key in self._seen for key in keys):
+            # Turns seen before are still there: the last one was undone.
+            self.rewound = True
+            self.rewound_turns.append((self._last, None))
+        self._seen = {key: count for key, count in self._seen.items() if key in keys}
+        return 0
+
+    def advance(self, state: Dict[str, Any]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Get the throws of a match state that were not seen yet.
+
+        Parameters:
+        - state (Dict[str, Any]): A match state.
+
+        Returns:
+        List[Tuple[Dict[str, Any], Dict[str, Any]]]: The (turn, throw) pairs, in throw order.
+        """
+        self.rewound = False
+        self.rewound_turns = []
+        turns = state.get("turns") or []
+        new = []
+        for position in range(self._resume(turns), len(turns)):
+            turn = turns[position]
+            key = self.turn_key(turn)
+            throws = turn.get("throws") or []
+            count = self._seen.get(key, 0)
+            if len(throws) < count:
+                self.rewound = True
+                self.rewound_turns.append((key, turn))
+                count = len(throws)
+            new.extend((turn, throw) for throw in throws[count:])
+            self._seen[key] = len(throws)
+        self._last = self.turn_key(turns[-1]) if turns else None
+        return new
+
+    def reset(self) -> None:
+        """Forget all the seen throws."""
+        self._seen = {}
+        self._last = None
+        self.rewound = False
+        self.rewound_turns = []
+
 from .player import Player
\ No newline at end of file
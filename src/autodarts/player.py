@@ -35,7 +35,7 @@ class Player(AutoDartBase):
     @property
     def user(self) -> "User":
         """Get the user object representing the player."""
-        return User(self.session, self.name, self.userId)
+        return User(self.session, self.name, self.user_id)
 
     @property
     def name(self) -> Optional[str]:
@@ -0,0 +1,256 @@
+"""
+Opt-in timing of websocket frame handling and of the event loop.
+
+A FrameProfiler set as the ``profiler`` of an entity, or of the
+AutoDartEndpointWs class for all of them, times each stage of its text
+frames: decode (JSON parsing), route (topic match and callback lookup),
+merge (history, state update, optimistic reconciliation) and every
+callback, raw frame callbacks included. The entity passes a timer of the
+frame down its own frame path and to its CallbackRegistry; without a
+profiler, that path only checks the attribute and never reads the clock.
+
+The wait for the next frame inside aiohttp can't be told apart from idle
+time, so the receive side is covered by the event loop lag instead: a
+frame ready on the socket waits at most the lag before being read. What
+is left of a late throw is network.
+"""
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+from collections import deque
+import asyncio
+import math
+import time
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+perf_counter = time.perf_counter
+
+
+class StageStats:
+    """
+    Durations of a stage.
+
+    Attributes:
+    - count (int): The number of timings.
+    - total (float): Their sum, in seconds.
+    - max (float): The longest, in seconds.
+    - samples (deque): The last timings, for percentiles.
+    """
+
+    __slots__ = ("count", "total", "max", "samples")
+
+    def __init__(self, samples: int = 1024) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=samples)
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.samples.append(duration)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Get a percentile (0-100) of the kept samples, in seconds."""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else None,
+            "p99_ms": (self.percentile(99) or 0.0) * 1000 if self.count else None,
+            "max_ms": self.max * 1000,
+        }
+
+
+class SlowRecord:
+    """
+    A stage or callback over the threshold.
+
+    Attributes:
+    - ts (float): The time.time() it ended.
+    - entity_id (str|None): The ID of the entity, None for the event loop lag.
+    - event (str|None): The event of the frame.
+    - stage (str): decode, route, merge, callback, frame_callback or loop_lag.
+    - callback (str|None): The qualified name of the callback.
+    - duration (float): The seconds it took.
+    """
+
+    __slots__ = ("ts", "entity_id", "event", "stage", "callback", "duration")
+
+    def __init__(self, entity_id: Optional[str], event: Optional[str], stage: str, callback: Optional[str],
+                 duration: float) -> None:
+        self.ts = time.time()
+        self.entity_id = entity_id
+        self.event = event
+        self.stage = stage
+        self.callback = callback
+        self.duration = duration
+
+    def __repr__(self) -> str:
+        what = f"{self.stage} {self.callback}" if self.callback else self.stage
+        return f"<SlowRecord {what} {self.duration * 1000:.1f}ms {self.entity_id} {self.event}>"
+
+
+def _callback_name(cb: Callable) -> str:
+    name = getattr(cb, "__qualname__", None) or repr(cb)
+    module = getattr(cb, "__module__", None)
+    return f"{module}.{name}" if module else name
+
+
+class FrameProfiler:
+    """
+    Time the stages of frame handling and sample the event loop lag.
+
+    Durations over the threshold are kept in slow, logged and passed to
+    on_slow. Percentiles are computed over the last samples of each stage.
+    """
+
+    STAGES = ("decode", "route", "merge", "callback", "frame_callback", "loop_lag")
+
+    def __init__(self, threshold: float = 0.005, lag_interval: float = 0.1, lag_threshold: float = 0.05,
+                 on_slow: Optional[Callable[[SlowRecord], None]] = None, samples: int = 1024,
+                 keep_slow: int = 256, log: bool = True) -> None:
+        """
+        Initialize a FrameProfiler instance.
+
+        Parameters:
+        - threshold (float): The seconds over which a stage or callback is reported.
+        - lag_interval (float): The seconds between two event loop lag samples, no sampling if 0.
+        - lag_threshold (float): The seconds of lag over which it is reported.
+        - on_slow (Callable[[SlowRecord], None]|None): Called with each report.
+        - samples (int): The durations kept per stage for percentiles.
+        - keep_slow (int): The last reports kept in slow.
+        - log (bool): Log the reports as warnings.
+
+        Returns:
+        None
+        """
+        self.threshold = threshold
+        self.lag_interval = lag_interval
+        self.lag_threshold = lag_threshold
+        self.on_slow = on_slow
+        self.log = log
+        self._samples = samples
+        self.stages: Dict[str, StageStats] = {stage: StageStats(samples) for stage in self.STAGES}
+        self.callbacks: Dict[str, StageStats] = {}
+        self.frames = 0
+        self.slow: Deque[SlowRecord] = deque(maxlen=keep_slow)
+        self._lag_task: Optional[asyncio.Task] = None
+
+    # Entities.
+
+    def attach(self, *entities: "AutoDartEndpointWs") -> "FrameProfiler":
+        """Profile the frames of entities, and start sampling the event loop lag if a loop runs."""
+        for entity in entities:
+            entity.profiler = self
+        self._start_lag()
+        return self
+
+    def detach(self, *entities: "AutoDartEndpointWs") -> None:
+        """Stop profiling the frames of entities."""
+        for entity in entities:
+            if entity.__dict__.get("profiler") is self:
+                del entity.profiler
+
+    def _report(self, entity_id: Optional[str], event: Optional[str], stage: str, callback: Optional[str],
+                duration: float) -> None:
+        record = SlowRecord(entity_id, event, stage, callback, duration)
+        self.slow.append(record)
+        if self.log:
+            logger.warning(f"Slow {stage}{' ' + callback if callback else ''} {duration * 1000:.1f}ms"
+                           f"{' on ' + entity_id if entity_id else ''}{' for ' + event if event else ''}")
+        if self.on_slow is not None:
+            try:
+                self.on_slow(record)
+            except Exception as err:
+                logger.warning(f"Profiler on_slow failed: {err}")
+
+    def _time(self, stage: str, duration: float, entity_id: Optional[str], event: Optional[str]) -> None:
+        self.stages[stage].add(duration)
+        if duration > self.threshold:
+            self._report(entity_id, event, stage, None, duration)
+
+    def _time_callback(self, stage: str, cb: Callable, duration: float, entity_id: Optional[str],
+                       event: Optional[str]) -> None:
+        self.stages[stage].add(duration)
+        name = _callback_name(cb)
+        stats = self.callbacks.get(name)
+        if stats is None:
+            stats = self.callbacks[name] = StageStats(self._samples)
+        stats.add(duration)
+        if duration > self.threshold:
+            self._report(entity_id, event, stage, name, duration)
+
+    def frame_timer(self, entity: "AutoDartEndpointWs", data: Any) -> Callable[[str, Optional[Callable], float], None]:
+        """
+        Get the timer of a frame of an entity.
+
+        The frame path of the entity calls it with (stage, None, seconds) after
+        each stage, and (stage, callback, seconds) after each callback.
+        """
+        self.frames += 1
+        entity_id = entity.id
+        event = data.get("event") if isinstance(data, dict) else None
+
+        def timer(stage: str, cb: Optional[Callable], duration: float) -> None:
+            if cb is None:
+                self._time(stage, duration, entity_id, event)
+            else:
+                self._time_callback(stage, cb, duration, entity_id, event)
+        return timer
+
+    # Event loop lag.
+
+    def _start_lag(self) -> None:
+        if not self.lag_interval or (self._lag_task and not self._lag_task.done()):
+            return
+        try:
+            self._lag_task = asyncio.get_running_loop().create_task(self._async_sample_lag())
+        except RuntimeError:
+            # No running loop, start() will be called from one.
+            pass
+
+    def start(self) -> None:
+        """Start sampling the event loop lag, from a running loop."""
+        self._start_lag()
+
+    def stop(self) -> None:
+        """Stop sampling the event loop lag."""
+        if self._lag_task:
+            self._lag_task.cancel()
+            self._lag_task = None
+
+    async def _async_sample_lag(self) -> None:
+        while True:
+            start = perf_counter()
+            await asyncio.sleep(self.lag_interval)
+            lag = max(0.0, perf_counter() - start - self.lag_interval)
+            self.stages["loop_lag"].add(lag)
+            if lag > self.lag_threshold:
+                self._report(None, None, "loop_lag", None, lag)
+
+    # Results.
+
+    def report(self) -> Dict[str, Any]:
+        """Get the statistics of the stages and callbacks, durations in milliseconds."""
+        return {
+            "frames": self.frames,
+            "stages": {stage: stats.as_dict() for stage, stats in self.stages.items() if stats.count},
+            "callbacks": {name: stats.as_dict() for name, stats in
+                          sorted(self.callbacks.items(), key=lambda item: -item[1].total)},
+            "slow": len(self.slow),
+        }
+
+    def reset(self) -> None:
+        """Forget the timings."""
+        self.stages = {stage: StageStats(self._samples) for stage in self.STAGES}
+        self.callbacks.clear()
+        self.slow.clear()
+        self.frames = 0
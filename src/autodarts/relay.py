@@ -0,0 +1,263 @@
+"""
+Local relay fanning one upstream subscription out to many local clients.
+
+The relay speaks the subscribe protocol of the AutoDARTS websocket, on TCP
+and/or a Unix socket. The first local subscription to an entity connects
+it upstream through the relay session, further ones share that connection,
+and the last unsubscription disconnects it. Each frame is encoded once and
+queued to every subscribed client. A client whose queue is full is
+evicted, closing its socket, so one slow consumer never delays the others
+nor grows memory.
+
+    relay = RelayServer(session, path="/run/autodarts.sock")
+    await relay.async_start()
+
+Clients point their websocket URL at it, ``relay.ws_url`` on TCP, or
+``http://localhost/ms/v0/subscribe`` through an aiohttp.UnixConnector on
+the Unix socket. The relay doesn't check any token.
+"""
+from typing import Any, Callable, Dict, Optional, Set, Tuple, Type
+import asyncio
+import json
+
+import aiohttp
+from aiohttp import web
+
+from .session import AutoDartSession
+from .endpoint import AutoDartEndpointWs
+from .board import CloudBoard
+from .match import Match
+from .lobby import Lobby
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RelayClient:
+    """
+    A local websocket client of the relay.
+
+    Attributes:
+    - topics (Set[Tuple[str, str]]): The (channel, topic) it is subscribed to.
+    - queue (asyncio.Queue): The encoded frames waiting to be sent.
+    - sent (int): The frames sent.
+    - evicted (bool): True if it was disconnected for being too slow.
+    """
+
+    def __init__(self, ws: web.WebSocketResponse, max_queue: int) -> None:
+        self.ws = ws
+        self.topics: Set[Tuple[str, str]] = set()
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.sent = 0
+        self.evicted = False
+
+    async def async_write(self) -> None:
+        """Send the queued frames, in order, until the client goes away or is evicted."""
+        while True:
+            frame = await self.queue.get()
+            if frame is None:
+                await self.ws.close(code=aiohttp.WSCloseCode.POLICY_VIOLATION, message=b"slow consumer")
+                return
+            await self.ws.send_str(frame)
+            self.sent += 1
+
+    def evict(self) -> None:
+        """Drop the queued frames and close the socket after the frame being sent."""
+        self.evicted = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class _Upstream:
+    """The upstream connection of an entity, shared by the local subscriptions to its topics."""
+
+    def __init__(self, entity: AutoDartEndpointWs, leave: Callable[[], None]) -> None:
+        self.entity = entity
+        self.leave = leave
+        self.topics = 0
+
+
+class RelayServer:
+    """
+    Relay the websocket frames of entities to local clients.
+
+    Channels are those of CloudBoard, Match and Lobby. Frames are forwarded
+    as received upstream, and with replay_state a new subscriber to a state
+    topic first gets the current state of an entity already connected.
+    """
+
+    SUBSCRIBE_PATH = "/ms/v0/subscribe"
+    CHANNELS: Dict[str, Type[AutoDartEndpointWs]] = {
+        CloudBoard.CHANNEL: CloudBoard,
+        Match.CHANNEL: Match,
+        Lobby.CHANNEL: Lobby,
+    }
+
+    def __init__(self, session: AutoDartSession, host: Optional[str] = "127.0.0.1", port: int = 0,
+                 path: Optional[str] = None, max_queue: int = 256, replay_state: bool = True) -> None:
+        """
+        Initialize a RelayServer instance.
+
+        Parameters:
+        - session (AutoDartSession): The session of the upstream connections.
+        - host (str|None): The TCP host to listen on, no TCP if None.
+        - port (int): The TCP port, a free one if 0.
+        - path (str|None): The Unix socket path to listen on, no Unix socket if None.
+        - max_queue (int): The frames queued per client before it is evicted.
+        - replay_state (bool): Send the current state of a connected entity to new state subscribers.
+
+        Returns:
+        None
+        """
+        self.session = session
+        self.host = host
+        self.port = port
+        self.path = path
+        self.max_queue = max_queue
+        self.replay_state = replay_state
+        self.clients: Set[RelayClient] = set()
+        self.upstreams: Dict[Tuple[str, str], _Upstream] = {}
+        self._subscribers: Dict[Tuple[str, str], Set[RelayClient]] = {}
+        self.counters = {"frames_in": 0, "frames_out": 0, "evicted": 0, "clients": 0}
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def ws_url(self) -> str:
+        """Get the websocket URL of the TCP listener."""
+        return f"http://{self.host}:{self.port}{self.SUBSCRIBE_PATH}"
+
+    async def async_start(self) -> "RelayServer":
+        """Start listening."""
+        app = web.Application()
+        app.add_routes([web.get(self.SUBSCRIBE_PATH, self._handle)])
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        if self.host is not None:
+            site = web.TCPSite(self._runner, self.host, self.port)
+            await site.start()
+            self.port = site._server.sockets[0].getsockname()[1]
+        if self.path is not None:
+            await web.UnixSite(self._runner, self.path).start()
+        return self
+
+    async def async_close(self) -> None:
+        """Disconnect the clients and the upstream connections, and stop listening."""
+        for key in list(self.upstreams):
+            self._release(key, force=True)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "RelayServer":
+        return await self.async_start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.async_close()
+
+    def _broadcast(self, key: Tuple[str, str], data: Dict[str, Any]) -> None:
+        clients = self._subscribers.get(key)
+        self.counters["frames_in"] += 1
+        if not clients:
+            return
+        frame = json.dumps({"channel": key[0], "topic": key[1], "data": data})
+        for client in list(clients):
+            try:
+                client.queue.put_nowait(frame)
+                self.counters["frames_out"] += 1
+            except asyncio.QueueFull:
+                self._evict(client)
+
+    def _evict(self, client: RelayClient) -> None:
+        if client.evicted:
+            return
+        self.counters["evicted"] += 1
+        logger.warning(f"Evicting a relay client {client.queue.qsize()} frames behind")
+        client.evict()
+        self._drop(client)
+
+    def _acquire(self, channel: str, id: str) -> Optional[_Upstream]:
+        key = (channel, id)
+        upstream = self.upstreams.get(key)
+        if upstream is None:
+            cls = self.CHANNELS.get(channel)
+            if cls is None:
+                return None
+            entity = cls.lookup(self.session, id) or cls.from_state(self.session, {"id": id})
+
+            async def on_state(data):
+                self._broadcast((channel, f"{id}.state"), data)
+
+            async def on_event(data):
+                self._broadcast((channel, f"{id}.events"), data)
+
+            upstream = self.upstreams[key] = _Upstream(entity, entity.connect(on_event, on_state))
+        upstream.topics += 1
+        return upstream
+
+    def _release(self, key: Tuple[str, str], force: bool = False) -> None:
+        upstream = self.upstreams.get(key)
+        if upstream is None:
+            return
+        upstream.topics -= 1
+        if upstream.topics <= 0 or force:
+            del self.upstreams[key]
+            upstream.leave()
+
+    def _subscribe(self, client: RelayClient, channel: str, topic: str) -> None:
+        id, _, kind = topic.rpartition(".")
+        if (channel, topic) in client.topics or kind not in ("state", "events") or not id:
+            return
+        upstream = self._acquire(channel, id)
+        if upstream is None:
+            return
+        client.topics.add((channel, topic))
+        self._subscribers.setdefault((channel, topic), set()).add(client)
+        entity = upstream.entity
+        if self.replay_state and kind == "state" and entity.ws is not None and entity.ws_data:
+            try:
+                client.queue.put_nowait(json.dumps({"channel": channel, "topic": topic, "data": entity.ws_data}))
+            except asyncio.QueueFull:
+                self._evict(client)
+
+    def _unsubscribe(self, client: RelayClient, channel: str, topic: str) -> None:
+        if (channel, topic) not in client.topics:
+            return
+        client.topics.discard((channel, topic))
+        clients = self._subscribers.get((channel, topic))
+        if clients is not None:
+            clients.discard(client)
+            if not clients:
+                del self._subscribers[(channel, topic)]
+        self._release((channel, topic.rpartition(".")[0]))
+
+    def _drop(self, client: RelayClient) -> None:
+        for channel, topic in list(client.topics):
+            self._unsubscribe(client, channel, topic)
+        self.clients.discard(client)
+
+    async def _handle(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        client = RelayClient(ws, self.max_queue)
+        self.clients.add(client)
+        self.counters["clients"] += 1
+        writer = asyncio.create_task(client.async_write())
+        try:
+            async for msg in ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                try:
+                    message = json.loads(msg.data)
+                    channel, topic = message["channel"], message["topic"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if message.get("type") == "subscribe":
+                    self._subscribe(client, channel, topic)
+                elif message.get("type") == "unsubscribe":
+                    self._unsubscribe(client, channel, topic)
+        finally:
+            writer.cancel()
+            self._drop(client)
+        return ws
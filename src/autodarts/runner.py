@@ -0,0 +1,109 @@
+from typing import Awaitable, Callable, TypeVar
+import asyncio
+
+from .session import AutoDartSession
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def uvloop_available() -> bool:
+    """Check if uvloop is installed."""
+    return uvloop is not None
+
+
+def new_event_loop(use_uvloop: bool = True) -> asyncio.AbstractEventLoop:
+    """
+    Create an event loop, a uvloop one when available.
+
+    Parameters:
+    - use_uvloop (bool): Use uvloop if it is installed, else the default asyncio loop.
+
+    Returns:
+    asyncio.AbstractEventLoop: The new loop, not set as the current one.
+    """
+    if use_uvloop and uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
+def cancel_all_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Cancel the pending tasks of a loop that isn't running, and wait for them.
+
+    Failures other than the cancellation are logged.
+
+    Parameters:
+    - loop (asyncio.AbstractEventLoop): The loop.
+
+    Returns:
+    None
+    """
+    tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
+    if not tasks:
+        return
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Task {task.get_name()} failed while shutting down: {task.exception()}")
+
+
+def run(main: Callable[[AutoDartSession], Awaitable[T]], *args, use_uvloop: bool = True,
+        debug: bool = False, **kwargs) -> T:
+    """
+    Run a coroutine function with a session, on a new event loop.
+
+    The loop is a uvloop one when available. The session is created on the
+    loop and passed to main, and everything is torn down in order when main
+    returns or raises: the session is closed, the remaining tasks (websocket
+    readers, heartbeats) are cancelled, async generators and the default
+    executor are shut down, then the loop is closed, which runs the
+    asyncio_atexit callbacks (snapshot stores).
+
+    Example:
+        async def main(session):
+            board = await CloudBoard.from_id(session, BOARD_ID)
+            ...
+
+        autodarts.run(main, email=..., password=..., client_id=..., realm_name=..., client_secret_key=...)
+
+    Parameters:
+    - main (Callable): The coroutine function, called with the session.
+    - args, kwargs: The parameters of AutoDartSession.
+    - use_uvloop (bool): Use uvloop if it is installed.
+    - debug (bool): Run the loop in debug mode.
+
+    Returns:
+    Any: The result of main.
+    """
+    async def runner() -> T:
+        session = AutoDartSession(*args, **kwargs)
+        try:
+            return await main(session)
+        finally:
+            await session.async_close()
+
+    loop = new_event_loop(use_uvloop)
+    loop.set_debug(debug)
+    try:
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(runner())
+    finally:
+        try:
+            cancel_all_tasks(loop)
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            if hasattr(loop, "shutdown_default_executor"):
+                loop.run_until_complete(loop.shutdown_default_executor())
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
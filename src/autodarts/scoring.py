@@ -0,0 +1,248 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from .match import Match, ThrowCursor
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def segment_points(segment: Dict[str, Any]) -> int:
+    """Get the points scored by a segment."""
+    return (segment.get("number") or 0) * (segment.get("multiplier") or 0)
+
+
+class PlayerScore:
+    """
+    Running x01 score of one player.
+
+    Attributes:
+    - remaining (int): The remaining score.
+    - darts (int): The number of darts thrown.
+    - points (int): The points scored, bust turns excluded.
+    - busts (int): The number of busted turns.
+    - opened (bool): True once the in-mode requirement is met.
+    """
+
+    __slots__ = ("remaining", "darts", "points", "busts", "opened",
+                 "turn_key", "turn_start", "turn_points", "turn_darts", "turn_busted", "turn_opened")
+
+    def __init__(self, base_score: int, opened: bool = True) -> None:
+        self.remaining = base_score
+        self.darts = 0
+        self.points = 0
+        self.busts = 0
+        self.opened = opened
+        self.turn_key = None
+        self.turn_start = base_score
+        self.turn_points = 0
+        self.turn_darts = 0
+        self.turn_busted = False
+        self.turn_opened = opened
+
+    @property
+    def average(self) -> float:
+        """Get the 3-darts average."""
+        return self.points / self.darts * 3 if self.darts else 0.0
+
+    @property
+    def darts_left(self) -> int:
+        """Get the darts left in the current turn."""
+        return 0 if self.turn_busted else max(0, 3 - self.turn_darts)
+
+    def start_turn(self, turn_key: Any) -> None:
+        """Start a new turn."""
+        self.turn_key = turn_key
+        self.turn_start = self.remaining
+        self.turn_points = 0
+        self.turn_darts = 0
+        self.turn_busted = False
+        self.turn_opened = self.opened
+
+    def undo_turn(self) -> None:
+        """Take back the throws of the current turn, keeping its key."""
+        self.darts -= self.turn_darts
+        # A bust already took its points back.
+        self.points -= self.turn_points
+        if self.turn_busted:
+            self.busts -= 1
+        self.remaining = self.turn_start
+        self.opened = self.turn_opened
+        self.turn_points = 0
+        self.turn_darts = 0
+        self.turn_busted = False
+
+
+class X01Scorer:
+    """
+    Local x01 scoring engine fed by match state frames.
+
+    Every throw updates the player's running score in O(1), so remaining
+    scores, averages, darts thrown and busts are available without REST
+    calls. Throws taken back (undo) revert their turn, whose remaining
+    throws are applied again. Each frame is also cross-checked against the
+    server ``gameScores``; the local score is corrected on mismatch.
+
+    Attributes:
+    - players (List[PlayerScore]): The running scores, by player index.
+    - mismatches (int): The number of corrections made from server state.
+    """
+
+    DOUBLE_MODES = {"Double": (2,), "Master": (2, 3)}
+
+    def __init__(self, base_score: int = 501, in_mode: str = "Straight", out_mode: str = "Straight") -> None:
+        """
+        Initialize a X01Scorer instance.
+
+        Parameters:
+        - base_score (int): The score each player starts the leg with.
+        - in_mode (str): The in mode (Straight, Double or Master).
+        - out_mode (str): The out mode (Straight, Double or Master).
+
+        Returns:
+        None
+        """
+        self.base_score = base_score
+        self.in_mode = in_mode
+        self.out_mode = out_mode
+        self.players: List[PlayerScore] = []
+        self.mismatches = 0
+        self._cursor = ThrowCursor()
+        self._leg = None
+        self._player_index: Dict[str, int] = {}
+
+    def attach(self, match: Match) -> Callable[[], None]:
+        """
+        Feed the scorer from the state frames of a match.
+
+        Parameters:
+        - match (Match): The match, connected to receive frames.
+
+        Returns:
+        Callable[[], None]: The function to detach the scorer.
+        """
+        if match.ws_data.get("turns") is not None:
+            self.on_state(match.ws_data)
+        return match.register_callback(self.on_state)
+
+    def reset(self, count: Optional[int] = None) -> None:
+        """Reset every player to the base score."""
+        count = len(self.players) if count is None else count
+        opened = self.in_mode not in self.DOUBLE_MODES
+        self.players = [PlayerScore(self.base_score, opened) for _ in range(count)]
+
+    def _configure(self, state: Dict[str, Any]) -> None:
+        settings = state.get("settings") or {}
+        self.base_score = settings.get("baseScore", self.base_score)
+        self.in_mode = settings.get("inMode", self.in_mode)
+        self.out_mode = settings.get("outMode", self.out_mode)
+        players = state.get("players") or []
+        self._player_index = {p.get("id"): i for i, p in enumerate(players) if p.get("id")}
+        leg = (state.get("set"), state.get("leg"))
+        if leg != self._leg or len(players) != len(self.players):
+            self._leg = leg
+            self.reset(len(players))
+            self._cursor.reset()
+
+    def apply_throw(self, index: int, segment: Dict[str, Any], turn_key: Any = None) -> PlayerScore:
+        """
+        Apply one throw to a player.
+
+        Parameters:
+        - index (int): The player index.
+        - segment (Dict[str, Any]): The segment hit (number and multiplier).
+        - turn_key (Any): The turn the throw belongs to, a new key starts a new turn.
+
+        Returns:
+        PlayerScore: The updated score of the player.
+        """
+        player = self.players[index]
+        if turn_key != player.turn_key or player.turn_darts >= 3:
+            player.start_turn(turn_key)
+        if player.turn_busted:
+            return player
+
+        multiplier = segment.get("multiplier") or 0
+        points = segment_points(segment)
+        player.darts += 1
+        player.turn_darts += 1
+        if not player.opened:
+            if multiplier not in self.DOUBLE_MODES[self.in_mode]:
+                return player
+            player.opened = True
+
+        remaining = player.remaining - points
+        doubles = self.DOUBLE_MODES.get(self.out_mode)
+        if remaining < 0 or (doubles and (remaining == 1 or (remaining == 0 and multiplier not in doubles))):
+            player.busts += 1
+            player.turn_busted = True
+            player.points -= player.turn_points
+            player.remaining = player.turn_start
+            player.turn_points = 0
+        else:
+            player.remaining = remaining
+            player.points += points
+            player.turn_points += points
+        return player
+
+    def _rebuild_turn(self, turn_key: Any, turn: Optional[Dict[str, Any]]) -> None:
+        """Apply again the throws left in a turn that lost some, None if the whole turn was removed."""
+        for index, player in enumerate(self.players):
+            if player.turn_key == turn_key:
+                break
+        else:
+            # Not the current turn of a player, the server scores correct it in check().
+            return
+        player.undo_turn()
+        if turn is None:
+            player.turn_key = None
+            return
+        for throw in turn.get("throws") or []:
+            self.apply_throw(index, throw.get("segment") or {}, turn_key)
+
+    def on_state(self, state: Dict[str, Any]) -> None:
+        """Apply the new throws of a match state, then cross-check with the server scores."""
+        self._configure(state)
+        new = self._cursor.advance(state)
+        for turn_key, turn in self._cursor.rewound_turns:
+            self._rebuild_turn(turn_key, turn)
+        for turn, throw in new:
+            index = self._player_index.get(turn.get("playerId"), state.get("player"))
+            if index is None or index >= len(self.players):
+                continue
+            self.apply_throw(index, throw.get("segment") or {}, ThrowCursor.turn_key(turn))
+        self.check(state)
+
+    def check(self, state: Dict[str, Any]) -> bool:
+        """
+        Cross-check the local scores with the server ``gameScores``.
+
+        The server may report a score at the start of the running turn,
+        which is accepted too. Anything else is corrected.
+
+        Returns:
+        bool: True if the local scores matched.
+        """
+        scores = state.get("gameScores")
+        if not scores or len(scores) != len(self.players):
+            return True
+        ok = True
+        for index, (player, score) in enumerate(zip(self.players, scores)):
+            if score in (player.remaining, player.turn_start):
+                continue
+            logger.debug(f"Score of player {index} is {player.remaining} locally, {score} on server")
+            ok = False
+            self.mismatches += 1
+            # The difference counts as points of the running turn, so undoing it stays consistent.
+            player.points += player.remaining - score
+            player.turn_points += player.remaining - score
+            player.remaining = score
+        return ok
+
+    def remaining(self, index: int) -> int:
+        """Get the remaining score of a player."""
+        return self.players[index].remaining
+
+    def average(self, index: int) -> float:
+        """Get the 3-darts average of a player."""
+        return self.players[index].average
@@ -0,0 +1,133 @@
+from typing import Any, Dict, List, Tuple
+import math
+
+from .match import FIELD_COORDS
+from .scoring import X01Scorer
+
+# Board numbers clockwise from the top, in the normalized coordinates of
+# FIELD_COORDS (x to the right, y up, outer double ring at radius 1).
+SEGMENT_ORDER: List[int] = [20, 1, 18, 4, 13, 6, 10, 15, 2, 17, 3, 19, 7, 16, 8, 11, 14, 9, 12, 5]
+
+# Ring radii of a regulation board, divided by the outer double radius (170 mm).
+BULL_RADIUS = 6.35 / 170
+OUTER_BULL_RADIUS = 15.9 / 170
+TRIPLE_INNER_RADIUS = 99 / 170
+TRIPLE_OUTER_RADIUS = 107 / 170
+DOUBLE_INNER_RADIUS = 162 / 170
+DOUBLE_OUTER_RADIUS = 1.0
+
+# Every segment name with its (number, multiplier), the code of a segment is its index.
+SEGMENTS: List[Tuple[str, int, int]] = (
+    [("Miss", 0, 0), ("25", 25, 1), ("Bull", 25, 2)]
+    + [(f"S{n}", n, 1) for n in range(1, 21)]
+    + [(f"D{n}", n, 2) for n in range(1, 21)]
+    + [(f"T{n}", n, 3) for n in range(1, 21)]
+)
+SEGMENT_CODES: Dict[str, int] = {name: code for code, (name, _, _) in enumerate(SEGMENTS)}
+
+
+def segment_code(number: int, multiplier: int) -> int:
+    """Get the code of a segment from its number and multiplier."""
+    if multiplier == 0 or number == 0:
+        return 0
+    if number == 25:
+        return 2 if multiplier == 2 else 1
+    return 3 + (multiplier - 1) * 20 + number - 1
+
+
+def aim_point(number: int, multiplier: int) -> Tuple[float, float]:
+    """
+    Get the center of a segment in normalized board coordinates.
+
+    Singles aim at the outer single area, between the triple and double rings.
+    A miss aims outside the board, above the 20.
+
+    Returns:
+    Tuple[float, float]: The (x, y) point.
+    """
+    if multiplier == 0 or number == 0:
+        return 0.0, (DOUBLE_OUTER_RADIUS + 1.2) / 2
+    if number == 25:
+        return (0.0, 0.0) if multiplier == 2 else (0.0, (BULL_RADIUS + OUTER_BULL_RADIUS) / 2)
+    radius = {
+        1: (TRIPLE_OUTER_RADIUS + DOUBLE_INNER_RADIUS) / 2,
+        2: (DOUBLE_INNER_RADIUS + DOUBLE_OUTER_RADIUS) / 2,
+        3: (TRIPLE_INNER_RADIUS + TRIPLE_OUTER_RADIUS) / 2,
+    }[multiplier]
+    angle = math.radians(SEGMENT_ORDER.index(number) * 18)
+    return radius * math.sin(angle), radius * math.cos(angle)
+
+
+def classify_code(x: float, y: float) -> int:
+    """Get the code of the segment hit at normalized board coordinates."""
+    radius = math.hypot(x, y)
+    if radius > DOUBLE_OUTER_RADIUS:
+        return 0
+    if radius <= BULL_RADIUS:
+        return 2
+    if radius <= OUTER_BULL_RADIUS:
+        return 1
+    angle = math.degrees(math.atan2(x, y)) % 360
+    number = SEGMENT_ORDER[int((angle + 9) // 18) % 20]
+    if TRIPLE_INNER_RADIUS < radius <= TRIPLE_OUTER_RADIUS:
+        multiplier = 3
+    elif radius > DOUBLE_INNER_RADIUS:
+        multiplier = 2
+    else:
+        multiplier = 1
+    return segment_code(number, multiplier)
+
+
+def classify(x: float, y: float) -> Dict[str, Any]:
+    """
+    Get the segment hit at normalized board coordinates.
+
+    Returns:
+    Dict[str, Any]: The segment, with name, number and multiplier like in match states.
+    """
+    name, number, multiplier = SEGMENTS[classify_code(x, y)]
+    return {"name": name, "number": number, "multiplier": multiplier}
+
+
+def target_point(name: str) -> Tuple[float, float]:
+    """Get the point of a field from FIELD_COORDS, or the segment center where FIELD_COORDS is off."""
+    point = FIELD_COORDS.get(name)
+    if point is not None:
+        x, y = point["x"], point["y"]
+        if SEGMENTS[classify_code(x, y)][0] == name:
+            return x, y
+    _, number, multiplier = SEGMENTS[SEGMENT_CODES[name]]
+    return aim_point(number, multiplier)
+
+
+def checkout_aim(remaining: int, out_mode: str = "Straight") -> Tuple[int, int]:
+    """
+    Get the (number, multiplier) a simple player aims at with a remaining score.
+
+    Parameters:
+    - remaining (int): The remaining score.
+    - out_mode (str): The out mode (Straight, Double or Master).
+
+    Returns:
+    Tuple[int, int]: The aimed segment.
+    """
+    if remaining > 60:
+        return 20, 3
+    if remaining == 50:
+        return 25, 2
+    if out_mode in X01Scorer.DOUBLE_MODES:
+        if remaining <= 40 and remaining % 2 == 0:
+            return remaining // 2, 2
+        if remaining <= 40:
+            return 1, 1
+        # Leave 40, the double 20.
+        return remaining - 40, 1
+    if remaining <= 20:
+        return remaining, 1
+    if remaining == 25:
+        return 25, 1
+    if remaining % 3 == 0:
+        return remaining // 3, 3
+    if remaining <= 40 and remaining % 2 == 0:
+        return remaining // 2, 2
+    return remaining - 40, 1
@@ -0,0 +1,139 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_UNSET = object()
+
+
+def depends_on(*keys: str) -> Callable[[Callable], Callable]:
+    """Declare the state keys a selector function reads, so select() doesn't need them."""
+    def decorate(fn: Callable) -> Callable:
+        fn.deps = keys
+        return fn
+    return decorate
+
+
+class Selector:
+    """
+    A value derived from the state of an entity, memoized on its dependencies.
+
+    The function is only called again when one of the declared state keys
+    changed value since the last computation, and lazily on access unless
+    the selector has subscribers. Subscribers are called only when the
+    derived value itself changes.
+
+    Attributes:
+    - name (str): The name of the selector, the one of the function by default.
+    - deps (Tuple[str, ...]): The top-level keys of the entity ws_data the function reads.
+    - computations (int): The number of calls to the function.
+    """
+
+    def __init__(self, entity: "AutoDartEndpointWs", fn: Callable[[Dict[str, Any]], Any], deps: Sequence[str],
+                 name: Optional[str] = None) -> None:
+        """
+        Initialize a Selector instance, see AutoDartEndpointWs.select.
+
+        Parameters:
+        - entity (AutoDartEndpointWs): The entity of the state.
+        - fn (Callable[[dict], Any]): The function computing the value from the entity ws_data.
+        - deps (Sequence[str]): The ws_data keys the function reads.
+        - name (str|None): The name of the selector.
+
+        Returns:
+        None
+        """
+        self.entity = entity
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.name = name or getattr(fn, "__name__", repr(fn))
+        self.computations = 0
+        self._versions: Optional[Tuple[int, ...]] = None
+        self._value: Any = _UNSET
+        self._subscribers: List[Callable[[Any, Any], None]] = []
+
+    def _current_versions(self) -> Tuple[int, ...]:
+        versions = self.entity._key_versions
+        return tuple(versions.get(key, 0) for key in self.deps)
+
+    @property
+    def stale(self) -> bool:
+        """Check if a dependency changed since the last computation."""
+        return self._versions != self._current_versions()
+
+    @property
+    def value(self) -> Any:
+        """Get the derived value, computed again only if a dependency changed."""
+        versions = self._current_versions()
+        if versions != self._versions:
+            self._value = self.fn(self.entity.ws_data)
+            self._versions = versions
+            self.computations += 1
+        return self._value
+
+    def subscribe(self, cb: Callable[[Any, Any], None]) -> Callable[[], None]:
+        """
+        Call cb(value, previous) each time the derived value changes.
+
+        Returns:
+        Callable[[], None]: The function to unsubscribe.
+        """
+        if self._value is _UNSET:
+            self.value
+        self._subscribers.append(cb)
+
+        def unsubscribe() -> None:
+            if cb in self._subscribers:
+                self._subscribers.remove(cb)
+        return unsubscribe
+
+    def _refresh(self) -> None:
+        """Compute the value again if it is watched and stale, notifying the subscribers of a change."""
+        if not self._subscribers or not self.stale:
+            return
+        previous = self._value
+        value = self.value
+        if value != previous:
+            for cb in list(self._subscribers):
+                try:
+                    cb(value, previous)
+                except Exception as err:
+                    logger.warning(f"Selector {self.name} subscriber failed: {err}")
+
+    def close(self) -> None:
+        """Detach the selector from its entity."""
+        self._subscribers.clear()
+        self.entity._remove_selector(self)
+
+    def __repr__(self) -> str:
+        return f"<Selector {self.name} deps={','.join(self.deps)}>"
+
+
+# Match selectors.
+
+@depends_on("gameScores", "player")
+def current_remaining(state: Dict[str, Any]) -> Optional[int]:
+    """Get the remaining score of the current player of an x01 match."""
+    scores, player = state.get("gameScores"), state.get("player")
+    if not scores or player is None or player >= len(scores):
+        return None
+    return scores[player]
+
+
+@depends_on("turns")
+def darts_left(state: Dict[str, Any]) -> int:
+    """Get the darts left in the current turn of a match."""
+    turns = state.get("turns")
+    if not turns:
+        return 3
+    return max(0, 3 - len(turns[-1].get("throws") or []))
+
+
+@depends_on("stats", "player")
+def leg_average(state: Dict[str, Any]) -> Optional[float]:
+    """Get the leg average of the current player of a match, from its stats."""
+    stats, player = state.get("stats"), state.get("player")
+    if not stats or player is None or player >= len(stats):
+        return None
+    return ((stats[player] or {}).get("legStats") or {}).get("average")
@@ -1,9 +1,11 @@
+from typing import Optional
 import aiohttp
 import asyncio
-import atexit
+import asyncio_atexit
 from keycloak import KeycloakOpenID
 from keycloak.exceptions import KeycloakAuthenticationError, KeycloakGetError
 import time
+import weakref
 
 import logging
 
@@ -22,7 +24,8 @@ class AutoDartSession:
     AUTODART_AUTH_URL: str = "https://login.autodarts.io/"
     
     def __init__(self, email: str, password: str, client_id: str, realm_name: str, client_secret_key: str,
-                 server_url: str = AUTODART_AUTH_URL, *args, **kwargs) -> None:
+                 server_url: str = AUTODART_AUTH_URL, *args, api_url: Optional[str] = None,
+                 ws_url: Optional[str] = None, **kwargs) -> None:
         """
         Initialize an AutoDartSession instance.
 
@@ -33,6 +36,8 @@ class AutoDartSession:
         - realm_name (str): The realm name for Keycloak.
         - client_secret_key (str): The client secret key for Keycloak.
         - server_url (str): The URL of the Keycloak server.
+        - api_url (str|None): The base API URL of the entities, the AutoDARTS one if None.
+        - ws_url (str|None): The WebSocket URL of the entities, the AutoDARTS one if None.
         - args, kwargs: Additional parameters for ClientSession.
 
         Returns:
@@ -40,6 +45,8 @@ class AutoDartSession:
         """
         self.email: str = email
         self.password: str = password
+        self.api_url: Optional[str] = api_url
+        self.ws_url: Optional[str] = ws_url
         self.keycloak_openid: KeycloakOpenID = KeycloakOpenID(
             server_url=server_url,
             client_id=client_id,
@@ -48,16 +55,73 @@ class AutoDartSession:
             #verify=False,
         )
 
-        self.session: aiohttp.ClientSession = aiohttp.ClientSession(*args, **kwargs)
+        # The HTTP session is bound to the loop running at first use, it is closed when that loop closes.
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client_args = args
+        self._client_kwargs = kwargs
+        self._client: Optional[aiohttp.ClientSession] = None
+        self._closed = False
         self._token: dict = None
         self.next_refresh = 0
-        atexit.register(self.session.close)
+        # Identity map of the live entities, by (class, id).
+        self.entities: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            self._bind()
+
+    def _bind(self) -> aiohttp.ClientSession:
+        """Create the HTTP session on the running loop."""
+        try:
+            self.loop = asyncio.get_running_loop()
+        except RuntimeError as err:
+            raise AutoDartException("AutoDartSession must be used from a running event loop") from err
+        self._client = aiohttp.ClientSession(*self._client_args, **self._client_kwargs)
+        asyncio_atexit.register(self.async_close)
+        return self._client
+
+    @property
+    def session(self) -> Optional[aiohttp.ClientSession]:
+        """Get the HTTP session, created at first use, None once closed."""
+        if self._client is None and not self._closed:
+            return self._bind()
+        return self._client
+
+    async def async_close(self) -> None:
+        """Close the session, it is safe to call more than once."""
+        self._closed = True
+        if self._client:
+            session, self._client = self._client, None
+            await session.close()
 
     def close(self):
-        """Explicitly close the session."""
-        if self.session:
-            asyncio.create_task(self.session.close())
-            self.session = None
+        """
+        Explicitly close the session.
+
+        Inside a running loop the close is scheduled, and the returned task can
+        be awaited. Outside, it is run to completion on the session loop if that
+        loop is still open.
+
+        Returns:
+        asyncio.Task|None: The close task, when scheduled.
+        """
+        if not self._client:
+            self._closed = True
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None:
+            return loop.create_task(self.async_close())
+        if not self.loop.is_closed():
+            self.loop.run_until_complete(self.async_close())
+        else:
+            self._closed = True
+            self._client = None
+        return None
 
     async def refresh_token(self) :
         if time.time() < self.next_refresh  : 
@@ -0,0 +1,628 @@
+"""
+Board and match subscriptions spread over worker processes.
+
+Each worker process runs its own event loop, session and websockets, so
+the decoding and dispatch of the frames of a large fleet use several
+cores. Entities are assigned to workers by a consistent hash of their ID,
+so adding a worker only moves about 1/n of them. The coordinator, in the
+parent process, forwards commands and calls to the owning worker and
+merges the frames of all workers into one callback stream.
+
+    coordinator = ShardCoordinator(session_kwargs, workers=4)
+    await coordinator.async_start()
+    coordinator.register_callback(on_throw, "Throw detected")
+    for board_id in board_ids:
+        coordinator.subscribe("board", board_id)
+    await coordinator.async_call("board", board_ids[0], "async_reset")
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import bisect
+import hashlib
+import itertools
+import multiprocessing
+import pickle
+import threading
+
+import aiohttp
+
+from .session import AutoDartSession, AutoDartException
+from .callbacks import CallbackRegistry
+from .endpoint import AutoDartBase
+from .board import CloudBoard
+from .match import Match
+from .runner import new_event_loop, cancel_all_tasks
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+ENTITY_KINDS = {
+    "board": CloudBoard,
+    "match": Match,
+}
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring of nodes.
+
+    Each node is placed at several points (replicas) of the ring, and a key
+    belongs to the node of the first point after its hash, so adding or
+    removing a node only moves the keys of its points.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 64) -> None:
+        """
+        Initialize a HashRing instance.
+
+        Parameters:
+        - nodes (Iterable[str]): The initial nodes.
+        - replicas (int): The points of each node on the ring, more spread keys more evenly.
+
+        Returns:
+        None
+        """
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        self.nodes: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        """Add a node."""
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for i in range(self.replicas):
+            point = _hash(f"{node}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str) -> None:
+        """Remove a node."""
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def node_for(self, key: str) -> str:
+        """Get the node of a key."""
+        if not self._points:
+            raise AutoDartException("The hash ring has no node")
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
+
+
+class ShardFrame:
+    """
+    A frame of an entity received by a worker.
+
+    Attributes:
+    - kind (str): The entity kind, board or match.
+    - id (str): The entity ID.
+    - worker (str): The worker owning the entity.
+    - topic (str): state or events.
+    - data (dict): The frame.
+    """
+
+    __slots__ = ("kind", "id", "worker", "topic", "data")
+
+    def __init__(self, kind: str, id: str, worker: str, topic: str, data: Dict[str, Any]) -> None:
+        self.kind = kind
+        self.id = id
+        self.worker = worker
+        self.topic = topic
+        self.data = data
+
+    def __repr__(self) -> str:
+        return f"<ShardFrame {self.kind} {self.id} {self.topic} {self.data.get('event')} from {self.worker}>"
+
+
+def _picklable(result: Any) -> Any:
+    """Get what the parent can receive of a call result."""
+    if isinstance(result, aiohttp.ClientResponse):
+        return {"status": result.status, "ok": result.ok}
+    if isinstance(result, AutoDartBase):
+        return result._state
+    try:
+        pickle.dumps(result)
+    except Exception:
+        return repr(result)
+    return result
+
+
+class _Worker:
+    """The loop of a worker process: commands from the parent in, frames and results out."""
+
+    def __init__(self, name: str, session: AutoDartSession, commands, frames) -> None:
+        self.name = name
+        self.session = session
+        self.commands = commands
+        self.frames = frames
+        self.entities: Dict[Tuple[str, str], Any] = {}
+        self._unsubscribes: Dict[Tuple[str, str], Callable[[], None]] = {}
+        self._listing: Optional[asyncio.Task] = None
+
+    async def _async_list_boards(self) -> Dict[str, CloudBoard]:
+        return {board.id: board async for board in CloudBoard.factory(self.session)}
+
+    async def _async_entity(self, kind: str, id: str):
+        entity = self.entities.get((kind, id))
+        if entity is None and kind == "board":
+            # The boards subscribed together share one listing, instead of one each in from_id.
+            if self._listing is None or self._listing.done():
+                self._listing = asyncio.create_task(self._async_list_boards())
+            entity = (await asyncio.shield(self._listing)).get(id)
+        elif entity is None:
+            entity = await ENTITY_KINDS[kind].from_id(self.session, id)
+        if entity is None:
+            raise AutoDartException(f"No {kind} {id}")
+        return entity
+
+    async def _async_subscribe(self, kind: str, id: str) -> None:
+        if (kind, id) in self.entities:
+            self.frames.put(("subscribed", self.name, kind, id, dict(self.entities[(kind, id)].ws_data)))
+            return
+        try:
+            entity = await self._async_entity(kind, id)
+        except Exception as err:
+            self.frames.put(("error", self.name, kind, id, str(err)))
+            return
+
+        async def on_state(data):
+            self.frames.put(("frame", self.name, kind, id, "state", data))
+
+        async def on_event(data):
+            self.frames.put(("frame", self.name, kind, id, "events", data))
+
+        def on_subscribed(data):
+            # Sent once the websocket is subscribed, before its first frame, so that the parent
+            # switches from the previous worker without a gap.
+            self.frames.put(("subscribed", self.name, kind, id, dict(entity.ws_data)))
+
+        self.entities[(kind, id)] = entity
+        unregister = entity.register_callback(on_subscribed, "subscribed", topic="events")
+        leave = entity.connect(on_event, on_state)
+
+        def unsubscribe():
+            unregister()
+            leave()
+
+        self._unsubscribes[(kind, id)] = unsubscribe
+
+    def _unsubscribe(self, kind: str, id: str) -> None:
+        if self.entities.pop((kind, id), None) is not None:
+            self._unsubscribes.pop((kind, id))()
+
+    async def _async_call(self, request_id: int, kind: str, id: str, method: str, args, kwargs) -> None:
+        try:
+            entity = await self._async_entity(kind, id)
+            result = getattr(entity, method)(*args, **kwargs)
+            if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                result = await result
+            self.frames.put(("result", request_id, True, _picklable(result)))
+        except Exception as err:
+            self.frames.put(("result", request_id, False, f"{type(err).__name__}: {err}"))
+
+    async def async_run(self) -> None:
+        loop = asyncio.get_running_loop()
+        tasks = set()
+        self.frames.put(("ready", self.name))
+        while True:
+            command = await loop.run_in_executor(None, self.commands.get)
+            name = command[0]
+            if name == "stop":
+                break
+            elif name == "subscribe":
+                task = asyncio.create_task(self._async_subscribe(*command[1:]))
+            elif name == "unsubscribe":
+                self._unsubscribe(*command[1:])
+                continue
+            elif name == "call":
+                task = asyncio.create_task(self._async_call(*command[1:]))
+            else:
+                logger.warning(f"Unknown shard command {name}")
+                continue
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        for kind, id in list(self.entities):
+            self._unsubscribe(kind, id)
+
+
+def _worker_main(name: str, session_kwargs: Dict[str, Any], commands, frames, use_uvloop: bool) -> None:
+    """Run a worker process."""
+    async def main() -> None:
+        # One websocket per entity, the default connector would stop at 100.
+        session = AutoDartSession(**session_kwargs, connector=aiohttp.TCPConnector(limit=0))
+        try:
+            await _Worker(name, session, commands, frames).async_run()
+        finally:
+            await session.async_close()
+
+    loop = new_event_loop(use_uvloop)
+    try:
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(main())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        try:
+            cancel_all_tasks(loop)
+        finally:
+            asyncio.set_event_loop(None)
+            loop.close()
+            frames.put(("stopped", name))
+
+
+class ShardCoordinator:
+    """
+    Spread board and match subscriptions over worker processes.
+
+    Entities are assigned by a HashRing of their IDs. Frames of all workers
+    come back as ShardFrames to the registered callbacks, in order per
+    worker, and the states property mirrors the state of every subscribed
+    entity. When a worker is added, the moved entities are subscribed on
+    their new worker first, and dropped from the old one when the new one
+    has their state, frames of a worker not owning an entity being ignored.
+    A worker process that exits is removed from the ring, and its entities
+    are subscribed on the others.
+    """
+
+    def __init__(self, session_kwargs: Dict[str, Any], workers: int = 2, replicas: int = 64,
+                 use_uvloop: bool = True, start_method: str = "spawn") -> None:
+        """
+        Initialize a ShardCoordinator instance.
+
+        Parameters:
+        - session_kwargs (Dict[str, Any]): The AutoDartSession parameters of the workers, picklable.
+        - workers (int): The initial number of worker processes.
+        - replicas (int): The points of each worker on the hash ring.
+        - use_uvloop (bool): Run the workers on uvloop when it is installed.
+        - start_method (str): The multiprocessing start method, spawn doesn't copy the parent loop.
+
+        Returns:
+        None
+        """
+        self.session_kwargs = session_kwargs
+        self.initial_workers = workers
+        self.use_uvloop = use_uvloop
+        self.context = multiprocessing.get_context(start_method)
+        self.ring = HashRing(replicas=replicas)
+        self.callbacks = CallbackRegistry(("state", "events"))
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self.subscriptions: Dict[str, str] = {}
+        self.owners: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self._processes: Dict[str, Any] = {}
+        self._commands: Dict[str, Any] = {}
+        self._frames = self.context.Queue()
+        self._names = (f"shard-{i}" for i in itertools.count())
+        self._requests: Dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count(1)
+        self._ready: Dict[str, asyncio.Future] = {}
+        self._moving: Dict[str, str] = {}
+        self._subscribed: Dict[str, asyncio.Future] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._reader: Optional[threading.Thread] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._watcher: Optional[asyncio.Task] = None
+        self.watch_interval = 1.0
+
+    @property
+    def workers(self) -> List[str]:
+        """Get the names of the workers."""
+        return list(self.ring.nodes)
+
+    def worker_counts(self) -> Dict[str, int]:
+        """Get the number of entities owned by each worker."""
+        counts = {worker: 0 for worker in self.ring.nodes}
+        for worker in self.owners.values():
+            counts[worker] = counts.get(worker, 0) + 1
+        return counts
+
+    def shard_of(self, id: str) -> str:
+        """Get the worker an entity ID is assigned to."""
+        return self.ring.node_for(id)
+
+    async def async_start(self) -> "ShardCoordinator":
+        """Start the worker processes, and wait for them to be ready."""
+        loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._reader = threading.Thread(target=self._read_frames, args=(loop,), name="shard-reader", daemon=True)
+        self._reader.start()
+        self._dispatcher = asyncio.create_task(self._async_dispatch())
+        for name in await asyncio.gather(*(self._async_spawn() for _ in range(self.initial_workers))):
+            self.ring.add(name)
+        self._watcher = asyncio.create_task(self._async_watch())
+        return self
+
+    async def __aenter__(self) -> "ShardCoordinator":
+        return await self.async_start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.async_close()
+
+    async def _async_spawn(self) -> str:
+        name = next(self._names)
+        commands = self.context.Queue()
+        process = self.context.Process(target=_worker_main, name=name, daemon=True,
+                                       args=(name, self.session_kwargs, commands, self._frames, self.use_uvloop))
+        self._ready[name] = asyncio.get_running_loop().create_future()
+        process.start()
+        self._processes[name] = process
+        self._commands[name] = commands
+        ready = self._ready[name]
+        while not ready.done():
+            await asyncio.wait((ready,), timeout=0.1)
+            if not ready.done() and not process.is_alive():
+                self._ready.pop(name, None)
+                self._processes.pop(name)
+                self._commands.pop(name)
+                raise AutoDartException(f"Worker {name} exited with code {process.exitcode} before being ready")
+        return name
+
+    async def _async_watch(self) -> None:
+        """Check the worker processes every watch_interval seconds, for the ones that exited."""
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            for name, process in list(self._processes.items()):
+                if not process.is_alive() and name in self.ring.nodes:
+                    self._on_worker_exit(name, process.exitcode)
+
+    def _on_worker_exit(self, name: str, exitcode: Optional[int]) -> None:
+        """Forget a worker that exited, and subscribe to its entities on the others."""
+        logger.warning(f"Worker {name} exited with code {exitcode}")
+        self._processes.pop(name, None)
+        self._commands.pop(name, None)
+        self.ring.remove(name)
+        for id, worker in list(self.owners.items()):
+            if worker == name:
+                del self.owners[id]
+        if not self.ring.nodes:
+            logger.error("No worker left, the subscriptions wait for async_add_worker")
+            return
+        moved = self._rebalance()
+        logger.info(f"{len(moved)} entities of {name} moved")
+
+    def _read_frames(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Move the messages of the workers to the loop, in the reader thread."""
+        while True:
+            message = self._frames.get()
+            if message is None:
+                return
+            loop.call_soon_threadsafe(self._queue.put_nowait, message)
+
+    async def _async_dispatch(self) -> None:
+        while True:
+            message = await self._queue.get()
+            try:
+                await self._async_on_message(message)
+            except Exception as err:
+                logger.warning(f"Shard message {message[0]} failed: {err}")
+
+    async def _async_on_message(self, message: tuple) -> None:
+        kind = message[0]
+        if kind == "frame":
+            _, worker, entity_kind, id, topic, data = message
+            if self.owners.get(id) != worker:
+                return
+            if topic == "state":
+                self.states.setdefault(id, {}).update(data)
+            await self.callbacks.dispatch(topic, data.get("event") or None,
+                                          ShardFrame(entity_kind, id, worker, topic, data))
+        elif kind == "subscribed":
+            _, worker, entity_kind, id, state = message
+            if id not in self.subscriptions:
+                # Unsubscribed meanwhile.
+                self._send(worker, "unsubscribe", entity_kind, id)
+                return
+            previous = self.owners.get(id)
+            target = self._moving.get(id, previous)
+            if target != worker:
+                # The ack of a worker the entity moved away from since.
+                if previous != worker:
+                    self._send(worker, "unsubscribe", entity_kind, id)
+                return
+            self._moving.pop(id, None)
+            self.owners[id] = worker
+            self.states[id] = state
+            self.errors.pop(id, None)
+            if previous is not None and previous != worker and previous in self._commands:
+                self._send(previous, "unsubscribe", entity_kind, id)
+            future = self._subscribed.pop(id, None)
+            if future is not None and not future.done():
+                future.set_result(state)
+        elif kind == "error":
+            _, worker, entity_kind, id, error = message
+            logger.warning(f"{worker} could not subscribe to {entity_kind} {id}: {error}")
+            self.errors[id] = error
+            self._moving.pop(id, None)
+            future = self._subscribed.pop(id, None)
+            if future is not None and not future.done():
+                future.set_exception(AutoDartException(error))
+        elif kind == "result":
+            _, request_id, ok, value = message
+            future = self._requests.pop(request_id, None)
+            if future is not None and not future.done():
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(AutoDartException(value))
+        elif kind == "ready":
+            future = self._ready.pop(message[1], None)
+            if future is not None and not future.done():
+                future.set_result(None)
+        elif kind == "stopped":
+            logger.debug(f"{message[1]} stopped")
+
+    def _send(self, worker: str, *command) -> None:
+        commands = self._commands.get(worker)
+        if commands is not None:
+            # A worker that exited has no queue left, its late messages need no answer.
+            commands.put(command)
+
+    def register_callback(self, cb: Callable[[ShardFrame], Any], event: Optional[str] = None,
+                          topic: str = "state", weak: bool = False) -> Callable[[], None]:
+        """
+        Register a callback for the frames of every subscribed entity, called with a ShardFrame.
+
+        Returns:
+        Callable[[], None]: The function to unregister the callback.
+        """
+        if topic not in self.callbacks.topics:
+            raise AutoDartException(f"Topic not supported, allowed topics are {','.join(self.callbacks.topics)}")
+        return self.callbacks.register(cb, event, topic, weak=weak)
+
+    def subscribe(self, kind: str, id: str) -> asyncio.Future:
+        """
+        Subscribe to an entity on its worker.
+
+        Parameters:
+        - kind (str): board or match.
+        - id (str): The entity ID.
+
+        Returns:
+        asyncio.Future: Resolved with the entity state once subscribed.
+        """
+        if kind not in ENTITY_KINDS:
+            raise AutoDartException(f"Unknown entity kind {kind}, expected one of {', '.join(ENTITY_KINDS)}")
+        future = self._subscribed.get(id)
+        if future is None:
+            future = self._subscribed[id] = asyncio.get_running_loop().create_future()
+        if self.subscriptions.get(id) == kind and id in self.owners:
+            future.set_result(self.states.get(id))
+            self._subscribed.pop(id, None)
+            return future
+        self.subscriptions[id] = kind
+        worker = self.shard_of(id)
+        self._moving[id] = worker
+        self._send(worker, "subscribe", kind, id)
+        return future
+
+    def unsubscribe(self, id: str) -> None:
+        """Unsubscribe from an entity."""
+        kind = self.subscriptions.pop(id, None)
+        worker = self.owners.pop(id, None)
+        self._moving.pop(id, None)
+        future = self._subscribed.pop(id, None)
+        if future is not None:
+            future.cancel()
+        self.states.pop(id, None)
+        if kind is not None and worker is not None:
+            self._send(worker, "unsubscribe", kind, id)
+
+    async def async_call(self, kind: str, id: str, method: str, *args, timeout: float = 30, **kwargs) -> Any:
+        """
+        Call a method of an entity in its worker.
+
+        Parameters:
+        - kind (str): board or match.
+        - id (str): The entity ID.
+        - method (str): The method name, such as async_reset.
+        - args, kwargs: Its picklable parameters.
+        - timeout (float): The seconds to wait for the result.
+
+        Returns:
+        Any: The result, responses as {"status", "ok"} and entities as their state.
+
+        Raises:
+        - AutoDartException: If the call failed in the worker.
+        """
+        request_id = next(self._request_ids)
+        future = self._requests[request_id] = asyncio.get_running_loop().create_future()
+        worker = self.owners.get(id) or self.shard_of(id)
+        self._send(worker, "call", request_id, kind, id, method, args, kwargs)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._requests.pop(request_id, None)
+
+    def _rebalance(self) -> List[str]:
+        """Move the subscriptions whose worker changed on the ring, returning their IDs."""
+        moved = []
+        for id, kind in self.subscriptions.items():
+            worker = self.shard_of(id)
+            if self.owners.get(id) != worker and self._moving.get(id) != worker:
+                self._moving[id] = worker
+                self._send(worker, "subscribe", kind, id)
+                moved.append(id)
+        return moved
+
+    async def async_add_worker(self) -> str:
+        """
+        Start a worker and move to it the entities the ring now assigns to it.
+
+        Returns:
+        str: The name of the new worker.
+        """
+        name = await self._async_spawn()
+        self.ring.add(name)
+        moved = self._rebalance()
+        logger.info(f"{name} added, {len(moved)} entities moved")
+        return name
+
+    async def async_remove_worker(self, name: str, timeout: float = 10) -> None:
+        """
+        Stop a worker, once its entities are subscribed on the others.
+
+        The worker keeps passing the frames of an entity until its new worker
+        has subscribed, so no frame is missed while they move.
+
+        Parameters:
+        - name (str): The worker name.
+        - timeout (float): The seconds to wait for the entities to move before stopping it anyway.
+        """
+        if name not in self.ring.nodes:
+            raise AutoDartException(f"Unknown worker {name}")
+        if len(self.ring.nodes) == 1:
+            raise AutoDartException("Can't remove the last worker")
+        self.ring.remove(name)
+        self._rebalance()
+        # Resolved by the subscribed acks of the new workers, or failed by their errors.
+        futures = {}
+        for id, worker in self.owners.items():
+            if worker == name and id not in self._subscribed:
+                futures[id] = self._subscribed[id] = asyncio.get_running_loop().create_future()
+        if futures:
+            await asyncio.wait(futures.values(), timeout=timeout)
+        for id, future in futures.items():
+            if future.done():
+                if not future.cancelled():
+                    future.exception()
+            elif self._subscribed.get(id) is future:
+                del self._subscribed[id]
+        for id, worker in list(self.owners.items()):
+            if worker == name:
+                logger.warning(f"{id} did not move off {name} in time")
+                del self.owners[id]
+        await self._async_stop_worker(name)
+
+    async def _async_stop_worker(self, name: str, timeout: float = 10) -> None:
+        self._commands.pop(name).put(("stop",))
+        process = self._processes.pop(name)
+        await asyncio.get_running_loop().run_in_executor(None, process.join, timeout)
+        if process.is_alive():
+            process.terminate()
+
+    async def async_close(self) -> None:
+        """Stop the workers and the frame dispatch."""
+        if self._watcher:
+            self._watcher.cancel()
+            self._watcher = None
+        self.ring = HashRing(replicas=self.ring.replicas)
+        await asyncio.gather(*(self._async_stop_worker(name) for name in list(self._commands)))
+        self._frames.put(None)
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for future in list(self._requests.values()) + list(self._subscribed.values()):
+            future.cancel()
@@ -0,0 +1,340 @@
+"""
+Monte Carlo throw simulation, vectorized with NumPy.
+
+Throws are aimed at the FIELD_COORDS point of a segment and land with a
+Gaussian dispersion of standard deviation sigma, in the normalized board
+coordinates (outer double ring at radius 1). A sigma of about 0.05 is a
+strong player, 0.15 a casual one. Whole batches of throws are classified
+at once with lookup tables, so a single core simulates millions of visits
+per second.
+
+    sim = ThrowSimulator(seed=1)
+    sim.ppr_levels([0.03, 0.06, 0.1])        # expected x01 PPR per dispersion
+    sim.sigma_for_ppr(player.cpuPPR)         # the dispersion of a bot level
+    sim.best_checkouts(100, sigma=0.06)      # success odds of each route
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .session import AutoDartException
+from .segments import (SEGMENTS, SEGMENT_CODES, SEGMENT_ORDER, BULL_RADIUS, OUTER_BULL_RADIUS, TRIPLE_INNER_RADIUS,
+                       TRIPLE_OUTER_RADIUS, DOUBLE_INNER_RADIUS, DOUBLE_OUTER_RADIUS, checkout_aim, segment_code,
+                       target_point)
+from .scoring import X01Scorer
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+Target = Union[str, int]
+
+# Numbers scoring marks in cricket.
+CRICKET_NUMBERS = (15, 16, 17, 18, 19, 20, 25)
+
+
+def _tables() -> Dict[str, "np.ndarray"]:
+    numbers = np.array([number for _, number, _ in SEGMENTS], dtype=np.int16)
+    multipliers = np.array([multiplier for _, _, multiplier in SEGMENTS], dtype=np.int16)
+    # Codes by ring (bull, outer bull, inner single, triple, outer single, double, miss) and sector.
+    rings = np.zeros((7, 20), dtype=np.uint8)
+    for sector, number in enumerate(SEGMENT_ORDER):
+        rings[:, sector] = [2, 1, segment_code(number, 1), segment_code(number, 3), segment_code(number, 1),
+                            segment_code(number, 2), 0]
+    aims = np.array([target_point(name) for name, _, _ in SEGMENTS], dtype=np.float32)
+    return {
+        "points": numbers * multipliers,
+        "multipliers": multipliers,
+        "marks": np.where(np.isin(numbers, CRICKET_NUMBERS), multipliers, 0).astype(np.int16),
+        "rings": rings,
+        # float64 like the radii of segments.classify_code, so both agree on the ring edges.
+        "edges": np.array([BULL_RADIUS, OUTER_BULL_RADIUS, TRIPLE_INNER_RADIUS, TRIPLE_OUTER_RADIUS,
+                           DOUBLE_INNER_RADIUS, DOUBLE_OUTER_RADIUS], dtype=np.float64),
+        "aim_x": aims[:, 0].copy(),
+        "aim_y": aims[:, 1].copy(),
+    }
+
+
+_TABLES: Optional[Dict[str, "np.ndarray"]] = None
+
+
+def _get_tables() -> Dict[str, "np.ndarray"]:
+    global _TABLES
+    if np is None:
+        raise AutoDartException("numpy is required for the simulator, install autodarts[numpy]")
+    if _TABLES is None:
+        _TABLES = _tables()
+    return _TABLES
+
+
+def classify_codes(xs: "np.ndarray", ys: "np.ndarray") -> "np.ndarray":
+    """
+    Get the segment codes hit at arrays of normalized board coordinates, like segments.classify_code.
+
+    Returns:
+    numpy.ndarray: The uint8 codes, indexes of SEGMENTS.
+    """
+    tables = _get_tables()
+    ring = np.searchsorted(tables["edges"], np.hypot(xs, ys))
+    sector = np.floor((np.degrees(np.arctan2(xs, ys)) + 9) / 18).astype(np.intp) % 20
+    return tables["rings"][ring, sector]
+
+
+def _code(target: Target) -> int:
+    if isinstance(target, str):
+        if target not in SEGMENT_CODES:
+            raise AutoDartException(f"Unknown segment {target}")
+        return SEGMENT_CODES[target]
+    return target
+
+
+def checkout_routes(remaining: int, out_mode: str = "Double", max_darts: int = 3) -> List[Tuple[str, ...]]:
+    """
+    List the routes finishing a remaining score with the fewest darts.
+
+    Setup darts are in non-increasing order of points, so each combination
+    appears once, and the last dart is a valid finish for the out mode.
+
+    Parameters:
+    - remaining (int): The remaining score.
+    - out_mode (str): The out mode (Straight, Double or Master).
+    - max_darts (int): The most darts of a route.
+
+    Returns:
+    List[Tuple[str, ...]]: The routes, as segment names.
+    """
+    doubles = X01Scorer.DOUBLE_MODES.get(out_mode)
+    scoring = sorted(((points, name) for name, number, multiplier in SEGMENTS if number
+                      for points in [number * multiplier]), reverse=True)
+    finishes = [(number * multiplier, name) for name, number, multiplier in SEGMENTS
+                if number and (doubles is None or multiplier in doubles)]
+
+    def setups(total: int, darts: int, ceiling: int) -> Iterable[Tuple[str, ...]]:
+        if darts == 0:
+            if total == 0:
+                yield ()
+            return
+        for points, name in scoring:
+            if points <= min(total, ceiling):
+                for rest in setups(total - points, darts - 1, points):
+                    yield (name,) + rest
+
+    for darts in range(1, max_darts + 1):
+        routes = [setup + (name,) for points, name in finishes if points <= remaining
+                  for setup in setups(remaining - points, darts - 1, remaining)]
+        if routes:
+            return routes
+    return []
+
+
+class ThrowSimulator:
+    """
+    Simulate throws, visits and legs with a Gaussian dispersion around the aimed point.
+
+    Attributes:
+    - rng (numpy.random.Generator): The random generator.
+    - batch (int): The most throws generated at once, bounding memory.
+    """
+
+    def __init__(self, seed: Optional[int] = None, batch: int = 1 << 20) -> None:
+        """
+        Initialize a ThrowSimulator instance.
+
+        Parameters:
+        - seed (int|None): The seed of the random generator.
+        - batch (int): The most throws generated at once.
+
+        Returns:
+        None
+        """
+        self.tables = _get_tables()
+        self.rng = np.random.default_rng(seed)
+        self.batch = batch
+
+    def _throw(self, aims: Union[int, "np.ndarray"], sigma: float, n: int) -> "np.ndarray":
+        noise = self.rng.standard_normal((2, n), dtype=np.float32)
+        noise *= sigma
+        noise[0] += self.tables["aim_x"][aims]
+        noise[1] += self.tables["aim_y"][aims]
+        return classify_codes(noise[0], noise[1])
+
+    def _batches(self, n: int) -> Iterable[int]:
+        while n > 0:
+            size = min(n, self.batch)
+            yield size
+            n -= size
+
+    def throw(self, target: Target, sigma: float, n: int) -> "np.ndarray":
+        """
+        Throw darts at a segment.
+
+        Parameters:
+        - target (str|int): The aimed segment, by name or code.
+        - sigma (float): The dispersion, in normalized board units.
+        - n (int): The number of darts.
+
+        Returns:
+        numpy.ndarray: The codes of the segments hit.
+        """
+        return self._throw(_code(target), sigma, n)
+
+    def hit_odds(self, target: Target, sigma: float, darts: int = 100000) -> Dict[str, float]:
+        """Get the probability of hitting each segment when aiming at a target, the likeliest first."""
+        counts = np.zeros(len(SEGMENTS), dtype=np.int64)
+        for size in self._batches(darts):
+            counts += np.bincount(self.throw(target, sigma, size), minlength=len(SEGMENTS))
+        order = np.argsort(-counts, kind="stable")
+        return {SEGMENTS[code][0]: float(counts[code] / darts) for code in order if counts[code]}
+
+    def _mean_per_visit(self, table: "np.ndarray", target: Target, sigma: float, visits: int) -> float:
+        total = 0
+        for size in self._batches(visits * 3):
+            total += int(table[self.throw(target, sigma, size)].sum())
+        return total / visits
+
+    def ppr(self, sigma: float, target: Target = "T20", visits: int = 1000000) -> float:
+        """Get the expected points of a three-dart visit aimed at a target, busts and checkouts aside."""
+        return self._mean_per_visit(self.tables["points"], target, sigma, visits)
+
+    def mpr(self, sigma: float, target: Target = "T20", visits: int = 1000000) -> float:
+        """Get the expected cricket marks of a three-dart visit aimed at a target, closed numbers aside."""
+        return self._mean_per_visit(self.tables["marks"], target, sigma, visits)
+
+    def ppr_levels(self, sigmas: Iterable[float], target: Target = "T20", visits: int = 1000000) -> Dict[float, float]:
+        """Get the expected PPR of each dispersion level."""
+        return {sigma: self.ppr(sigma, target, visits) for sigma in sigmas}
+
+    def mpr_levels(self, sigmas: Iterable[float], target: Target = "T20", visits: int = 1000000) -> Dict[float, float]:
+        """Get the expected cricket MPR of each dispersion level."""
+        return {sigma: self.mpr(sigma, target, visits) for sigma in sigmas}
+
+    def sigma_for_ppr(self, ppr: float, target: Target = "T20", samples: int = 300000,
+                      tolerance: float = 1e-4) -> float:
+        """
+        Find the dispersion whose expected PPR is the given one, like the cpuPPR of a bot player.
+
+        The same random offsets are scaled for every candidate sigma, so the
+        PPR is a smooth function of sigma and the bisection converges.
+
+        Returns:
+        float: The sigma, in normalized board units.
+        """
+        code = _code(target)
+        offsets = self.rng.standard_normal((2, samples), dtype=np.float32)
+        aim_x, aim_y = self.tables["aim_x"][code], self.tables["aim_y"][code]
+        points = self.tables["points"]
+
+        def expected(sigma: float) -> float:
+            return 3 * float(points[classify_codes(aim_x + sigma * offsets[0], aim_y + sigma * offsets[1])].mean())
+
+        low, high = 0.0, 1.0
+        if ppr >= expected(low):
+            return low
+        while high - low > tolerance:
+            middle = (low + high) / 2
+            if expected(middle) > ppr:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+
+    def _aim_table(self, out_mode: str, top: int) -> "np.ndarray":
+        return np.array([segment_code(*checkout_aim(remaining, out_mode)) for remaining in range(top + 1)],
+                        dtype=np.intp)
+
+    def _apply(self, remaining: "np.ndarray", codes: "np.ndarray",
+               doubles: Optional[Tuple[int, ...]]) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Get the new remaining scores, the busts and the checkouts of throws, like X01Scorer.apply_throw."""
+        left = remaining - self.tables["points"][codes]
+        bust = left < 0
+        if doubles:
+            bust |= (left == 1) | ((left == 0) & ~np.isin(self.tables["multipliers"][codes], doubles))
+        return left, bust, (left == 0) & ~bust
+
+    def checkout_odds(self, route: Sequence[Target], sigma: float, out_mode: str = "Double",
+                      visits: int = 100000) -> float:
+        """
+        Get the probability of finishing within a visit following a checkout route.
+
+        The remaining score is the sum of the route. Darts aim at the route as
+        long as it was hit, then at what a simple player would aim at with the
+        score left.
+
+        Parameters:
+        - route (Sequence[str|int]): The segments of the route.
+        - sigma (float): The dispersion, in normalized board units.
+        - out_mode (str): The out mode (Straight, Double or Master).
+        - visits (int): The number of simulated visits.
+
+        Returns:
+        float: The success odds.
+        """
+        codes = [_code(target) for target in route]
+        if not 0 < len(codes) <= 3:
+            raise AutoDartException("A checkout route has 1 to 3 darts")
+        start = int(self.tables["points"][codes].sum())
+        doubles = X01Scorer.DOUBLE_MODES.get(out_mode)
+        aims = self._aim_table(out_mode, start)
+        finished = 0
+        for size in self._batches(visits):
+            remaining = np.full(size, start, dtype=np.int16)
+            on_route = np.ones(size, dtype=bool)
+            active = np.ones(size, dtype=bool)
+            for dart in range(3):
+                aim = aims[remaining]
+                if dart < len(codes):
+                    aim = np.where(on_route, codes[dart], aim)
+                hit = self._throw(aim, sigma, size)
+                left, bust, checkout = self._apply(remaining, hit, doubles)
+                finished += int((checkout & active).sum())
+                active &= ~(bust | checkout)
+                remaining = np.where(active, left, remaining)
+                if dart < len(codes):
+                    on_route &= hit == codes[dart]
+        return finished / visits
+
+    def best_checkouts(self, remaining: int, sigma: float, out_mode: str = "Double", visits: int = 20000,
+                       limit: Optional[int] = None) -> List[Tuple[Tuple[str, ...], float]]:
+        """
+        Get the success odds of each checkout route of a remaining score, the best first.
+
+        Returns:
+        List[Tuple[Tuple[str, ...], float]]: The routes with their odds.
+        """
+        odds = [(route, self.checkout_odds(route, sigma, out_mode, visits))
+                for route in checkout_routes(remaining, out_mode)]
+        odds.sort(key=lambda item: -item[1])
+        return odds[:limit] if limit else odds
+
+    def simulate_legs(self, sigma: float, legs: int = 10000, base_score: int = 501, out_mode: str = "Double",
+                      max_darts: int = 300) -> "np.ndarray":
+        """
+        Play x01 legs, aiming like a simple player, and count their darts.
+
+        The three-dart average of a leg is base_score * 3 / darts. Legs not
+        finished after max_darts count max_darts.
+
+        Returns:
+        numpy.ndarray: The darts of each leg.
+        """
+        doubles = X01Scorer.DOUBLE_MODES.get(out_mode)
+        aims = self._aim_table(out_mode, base_score)
+        darts = np.full(legs, max_darts, dtype=np.int32)
+        remaining = np.full(legs, base_score, dtype=np.int16)
+        turn_start = remaining.copy()
+        turn_dart = np.zeros(legs, dtype=np.int8)
+        index = np.arange(legs)
+        for dart in range(1, max_darts + 1):
+            if not len(index):
+                break
+            rem = remaining[index]
+            hit = self._throw(aims[rem], sigma, len(index))
+            left, bust, checkout = self._apply(rem, hit, doubles)
+            darts[index[checkout]] = dart
+            turn = turn_dart[index] + 1
+            remaining[index] = np.where(bust, turn_start[index], left)
+            turn = np.where(bust | (turn == 3), 0, turn)
+            turn_dart[index] = turn
+            index = index[~checkout]
+            new_turn = turn_dart[index] == 0
+            turn_start[index[new_turn]] = remaining[index[new_turn]]
+        return darts
@@ -0,0 +1,200 @@
+from typing import Any, Dict, Iterable, List, Type
+import asyncio
+import json
+import os
+import struct
+import weakref
+import zlib
+
+import asyncio_atexit
+
+from .session import AutoDartSession, AutoDartException
+from .endpoint import AutoDartEndpoint, AutoDartEndpointWs
+from .board import CloudBoard
+from .match import Match
+from .lobby import Lobby
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b"ADSNAP"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<6sBI")
+
+SNAPSHOT_CLASSES: Dict[str, Type[AutoDartEndpoint]] = {
+    "CloudBoard": CloudBoard,
+    "Match": Match,
+    "Lobby": Lobby,
+}
+
+
+class AutoDartSnapshotException(AutoDartException):
+    """Exception raised for unreadable snapshot files."""
+    pass
+
+
+def dump_snapshot(entities: Iterable[AutoDartEndpoint]) -> bytes:
+    """
+    Serialize the state of entities.
+
+    The format is a small header (magic, version, entity count) followed by
+    zlib-compressed JSON records.
+
+    Parameters:
+    - entities (Iterable[AutoDartEndpoint]): The entities to serialize.
+
+    Returns:
+    bytes: The snapshot.
+    """
+    records = [
+        {
+            "type": entity.__class__.__name__,
+            "state": entity._state,
+            "connected": isinstance(entity, AutoDartEndpointWs) and entity.is_connected,
+        }
+        for entity in entities
+    ]
+    payload = json.dumps(records, separators=(",", ":"), default=str).encode()
+    return _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(records)) + zlib.compress(payload)
+
+
+def load_snapshot(data: bytes) -> List[Dict[str, Any]]:
+    """
+    Deserialize a snapshot.
+
+    Returns:
+    List[Dict[str, Any]]: The records (type, state, connected).
+
+    Raises:
+    - AutoDartSnapshotException: If the data is not a valid snapshot.
+    """
+    try:
+        magic, version, count = _HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise AutoDartSnapshotException(f"Unsupported snapshot {magic!r} version {version}")
+        records = json.loads(zlib.decompress(data[_HEADER.size:]))
+    except (struct.error, zlib.error, ValueError) as err:
+        raise AutoDartSnapshotException(f"Invalid snapshot: {err}") from err
+    if len(records) != count:
+        raise AutoDartSnapshotException("Truncated snapshot")
+    return records
+
+
+class SnapshotStore:
+    """
+    Periodically write the state of tracked entities to a file, and restore them at start.
+
+    A restarted process calls ``async_restore`` to get usable entities at
+    once, then ``async_reconcile`` to refresh them from REST and reconnect
+    the websockets in the background.
+    """
+
+    def __init__(self, path: str, session: AutoDartSession, interval: float = 30) -> None:
+        """
+        Initialize a SnapshotStore instance.
+
+        Parameters:
+        - path (str): The snapshot file path.
+        - session (AutoDartSession): The session given to restored entities.
+        - interval (float): The seconds between two periodic saves.
+
+        Returns:
+        None
+        """
+        self.path = path
+        self.session = session
+        self.interval = interval
+        self.entities: "weakref.WeakValueDictionary[tuple, AutoDartEndpoint]" = weakref.WeakValueDictionary()
+        self.task = None
+        self._connected = set()
+
+    def track(self, *entities: AutoDartEndpoint) -> None:
+        """Add entities to the snapshot."""
+        for entity in entities:
+            self.entities[(entity.__class__.__name__, entity.id)] = entity
+
+    def untrack(self, entity: AutoDartEndpoint) -> None:
+        """Remove an entity from the snapshot."""
+        self.entities.pop((entity.__class__.__name__, entity.id), None)
+
+    def _write(self, data: bytes) -> None:
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as fd:
+            fd.write(data)
+            fd.flush()
+            os.fsync(fd.fileno())
+        os.replace(tmp, self.path)
+
+    async def async_save(self) -> None:
+        """Write the snapshot, the file is replaced atomically."""
+        # Serialize on the loop so the states don't change while dumped, write off the loop.
+        data = dump_snapshot(list(self.entities.values()))
+        await asyncio.to_thread(self._write, data)
+
+    async def async_restore(self) -> List[AutoDartEndpoint]:
+        """
+        Build the entities saved in the snapshot.
+
+        Returns:
+        List[AutoDartEndpoint]: The restored entities, empty if there is no snapshot.
+        """
+        try:
+            data = await asyncio.to_thread(self._read)
+        except FileNotFoundError:
+            return []
+        entities = []
+        for record in load_snapshot(data):
+            cls = SNAPSHOT_CLASSES.get(record["type"])
+            if cls is None:
+                logger.warning(f"Can't restore unknown entity type {record['type']}")
+                continue
+            entity = cls.from_state(self.session, record["state"])
+            if record.get("connected"):
+                self._connected.add((record["type"], entity.id))
+            self.track(entity)
+            entities.append(entity)
+        return entities
+
+    def _read(self) -> bytes:
+        with open(self.path, "rb") as fd:
+            return fd.read()
+
+    async def async_reconcile(self, entities: Iterable[AutoDartEndpoint], connect: bool = True) -> None:
+        """
+        Refresh restored entities from the server.
+
+        Parameters:
+        - entities (Iterable[AutoDartEndpoint]): The restored entities.
+        - connect (bool): Reconnect the websocket of entities that were connected when saved.
+
+        Returns:
+        None
+        """
+        entities = list(entities)
+        results = await asyncio.gather(*(entity.async_load() for entity in entities), return_exceptions=True)
+        for entity, result in zip(entities, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Can't reconcile {entity.__class__.__name__} {entity.id}: {result}")
+            elif connect and (entity.__class__.__name__, entity.id) in self._connected and not entity.is_connected:
+                entity.connect()
+
+    def start(self) -> None:
+        """Save periodically, and once more when the event loop closes."""
+        self.task = asyncio.create_task(self._async_save_task())
+        asyncio_atexit.register(self.async_close)
+
+    async def _async_save_task(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.async_save()
+            except Exception as e:
+                logger.warning(f"Can't save snapshot {self.path}: {e}")
+
+    async def async_close(self) -> None:
+        """Stop the periodic save and write a last snapshot."""
+        if self.task:
+            self.task.cancel()
+            self.task = None
+            await self.async_save()
@@ -0,0 +1,248 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import asyncio
+import time
+
+from .session import AutoDartSession, AutoDartException
+from .user import User
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Column name -> dotted key path in the stats payload, per variant.
+STAT_COLUMNS: Dict[str, Dict[str, str]] = {
+    "x01": {
+        "average": "average",
+        "first9_average": "first9Average",
+        "checkout_percent": "checkoutPercent",
+        "matches": "matches",
+        "legs_won": "legsWon",
+    },
+    "cricket": {
+        "mpr": "mpr",
+        "matches": "matches",
+        "legs_won": "legsWon",
+    },
+    "countup": {
+        "average": "average",
+        "matches": "matches",
+    },
+}
+
+
+def _lookup(payload: Any, path: str) -> float:
+    """Resolve a dotted key path in a stats payload, NaN when missing."""
+    for key in path.split("."):
+        if not isinstance(payload, dict) or key not in payload:
+            return float("nan")
+        payload = payload[key]
+    try:
+        return float(payload)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+class StatsTable:
+    """
+    Columnar view of the stats of many users for one variant.
+
+    Attributes:
+    - variant (str): The variant of the stats.
+    - user_ids (numpy.ndarray): The user IDs, one per row.
+    - names (numpy.ndarray): The user names, one per row.
+    - columns (Dict[str, numpy.ndarray]): float64 columns, NaN where the stat is missing.
+    """
+
+    def __init__(self, variant: str, user_ids: Sequence[str], names: Sequence[str],
+                 columns: Dict[str, "np.ndarray"]) -> None:
+        """
+        Initialize a StatsTable instance.
+
+        Parameters:
+        - variant (str): The variant of the stats.
+        - user_ids (Sequence[str]): The user IDs, one per row.
+        - names (Sequence[str]): The user names, one per row.
+        - columns (Dict[str, numpy.ndarray]): The stat columns.
+
+        Returns:
+        None
+        """
+        self.variant = variant
+        self.user_ids = np.asarray(user_ids, dtype=object)
+        self.names = np.asarray(names, dtype=object)
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __getitem__(self, column: str) -> "np.ndarray":
+        return self.columns[column]
+
+    def mean(self, column: str) -> float:
+        """Get the mean of a column, ignoring missing values."""
+        values = self.columns[column]
+        if not np.any(~np.isnan(values)):
+            return float("nan")
+        return float(np.nanmean(values))
+
+    def rank(self, column: str, descending: bool = True) -> "np.ndarray":
+        """
+        Get the row order for a column.
+
+        Parameters:
+        - column (str): The column to rank on.
+        - descending (bool): Best (highest) values first.
+
+        Returns:
+        numpy.ndarray: Row indices, missing values always last.
+        """
+        values = self.columns[column]
+        keys = -values if descending else values
+        return np.argsort(np.where(np.isnan(values), np.inf, keys), kind="stable")
+
+    def top(self, column: str, n: int = 10, descending: bool = True) -> List[Tuple[str, str, float]]:
+        """Get the (user_id, name, value) of the n best users for a column."""
+        order = self.rank(column, descending)[:n]
+        values = self.columns[column]
+        return [(self.user_ids[i], self.names[i], float(values[i])) for i in order]
+
+
+class BulkStatsFetcher:
+    """
+    Fetch the stats of many users concurrently.
+
+    Requests are bounded by a semaphore and payloads are cached per
+    (user_id, variant, limit) for ``ttl`` seconds, up to ``max_cached``
+    entries, the oldest being dropped first.
+    """
+
+    def __init__(self, session: AutoDartSession, concurrency: int = 10, ttl: float = 300,
+                 max_cached: int = 4096) -> None:
+        """
+        Initialize a BulkStatsFetcher instance.
+
+        Parameters:
+        - session (AutoDartSession): The session used for communication.
+        - concurrency (int): The maximum number of requests in flight.
+        - ttl (float): How long fetched stats are cached, in seconds.
+        - max_cached (int): The maximum number of cached payloads.
+
+        Returns:
+        None
+        """
+        if np is None:
+            raise AutoDartException("numpy is required for bulk stats, install autodarts[numpy]")
+        self.session = session
+        self.ttl = ttl
+        self.max_cached = max_cached
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._cache: Dict[Tuple[str, str, int], Tuple[float, Any]] = {}
+        self._inflight: Dict[Tuple[str, str, int], asyncio.Future] = {}
+
+    def clear_cache(self) -> None:
+        """Drop all cached stats."""
+        self._cache.clear()
+
+    def _store(self, key: Tuple[str, str, int], payload: Any) -> None:
+        """Cache a payload, dropping the expired entries then the oldest ones over max_cached."""
+        now = time.monotonic()
+        self._cache.pop(key, None)
+        self._cache[key] = (now, payload)
+        if len(self._cache) > self.max_cached:
+            for old in [k for k, (ts, _) in self._cache.items() if now - ts >= self.ttl]:
+                del self._cache[old]
+            while len(self._cache) > self.max_cached:
+                del self._cache[next(iter(self._cache))]
+
+    async def async_get_stat(self, user: User, variant: str, limit: int = 10) -> Any:
+        """
+        Get the stats of a user, from the cache when fresh.
+
+        Concurrent requests for the same key share a single HTTP call. If the
+        caller making it is cancelled, one of the others makes it again.
+        """
+        key = (user.id, variant, limit)
+        while True:
+            cached = self._cache.get(key)
+            if cached and time.monotonic() - cached[0] < self.ttl:
+                return cached[1]
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # Only the call of a cancelled caller is retried, a cancelled waiter stops.
+                if not inflight.cancelled():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            async with self._semaphore:
+                payload = await user.get_stat(variant, limit=limit)
+            self._store(key, payload)
+            future.set_result(payload)
+            return payload
+        except Exception as err:
+            future.set_exception(err)
+            # Waiters re-raise it, mark it retrieved for the lone caller case.
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+            if not future.done():
+                future.cancel()
+
+    async def async_fetch(self, users: Iterable[User], variants: Iterable[str] = ("x01",),
+                          limit: int = 10, columns: Optional[Dict[str, Dict[str, str]]] = None
+                          ) -> Dict[str, StatsTable]:
+        """
+        Fetch the stats of many users for many variants.
+
+        Parameters:
+        - users (Iterable[User]): The users to fetch.
+        - variants (Iterable[str]): The variants to fetch.
+        - limit (int): The number of last matches the stats are computed on.
+        - columns (Dict[str, Dict[str, str]]|None): Column spec per variant, defaults to STAT_COLUMNS.
+
+        Returns:
+        Dict[str, StatsTable]: One table per variant. A failed fetch leaves a row of NaN.
+        """
+        users = [user for user in users if user.id is not None]
+        variants = list(variants)
+        columns = columns or STAT_COLUMNS
+        for variant in variants:
+            if variant not in User.supported_stats:
+                raise ValueError(f"Unsupported variant {variant}")
+
+        pairs = [(user, variant) for variant in variants for user in users]
+        results = await asyncio.gather(
+            *(self.async_get_stat(user, variant, limit) for user, variant in pairs),
+            return_exceptions=True,
+        )
+
+        tables = {}
+        for v, variant in enumerate(variants):
+            spec = columns.get(variant, {})
+            payloads = results[v * len(users):(v + 1) * len(users)]
+            data = {name: np.full(len(users), np.nan) for name in spec}
+            for row, payload in enumerate(payloads):
+                if isinstance(payload, BaseException):
+                    logger.warning(f"Can't fetch {variant} stats of user {users[row].id}: {payload}")
+                    continue
+                for name, path in spec.items():
+                    data[name][row] = _lookup(payload, path)
+            tables[variant] = StatsTable(variant, [u.id for u in users], [u.name for u in users], data)
+        return tables
+
+
+async def async_bulk_stats(session: AutoDartSession, users: Iterable[User], variants: Iterable[str] = ("x01",),
+                           limit: int = 10, concurrency: int = 10) -> Dict[str, StatsTable]:
+    """Fetch the stats of many users at once, see BulkStatsFetcher.async_fetch."""
+    return await BulkStatsFetcher(session, concurrency=concurrency).async_fetch(users, variants, limit)
@@ -0,0 +1,207 @@
+from typing import Any, Awaitable, Callable, Optional
+from concurrent.futures import Executor, ThreadPoolExecutor
+import asyncio
+import copy
+import functools
+import inspect
+import queue
+import threading
+
+from .session import AutoDartSession
+from .runner import new_event_loop
+from .endpoint import AutoDartEndpointWs
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class SyncProxy:
+    """
+    Blocking view of an async object, run on the loop of a SyncClient.
+
+    Coroutine methods become blocking calls, async generators become lists,
+    and other methods run on the loop thread, as do the functions they
+    return (unregister functions). Anything else is read on the loop thread.
+    """
+
+    def __init__(self, client: "SyncClient", target: Any) -> None:
+        object.__setattr__(self, "_client", client)
+        object.__setattr__(self, "_target", target)
+
+    def __getattr__(self, name: str) -> Any:
+        attr = self._client.call(getattr, self._target, name)
+        if inspect.iscoroutinefunction(attr):
+            @functools.wraps(attr)
+            def call(*args, **kwargs):
+                return self._client.run(attr(*args, **kwargs))
+            return call
+        if inspect.isasyncgenfunction(attr):
+            @functools.wraps(attr)
+            def collect(*args, **kwargs):
+                return self._client.collect(attr(*args, **kwargs))
+            return collect
+        if inspect.isfunction(attr) or inspect.ismethod(attr):
+            @functools.wraps(attr)
+            def run(*args, **kwargs):
+                result = self._client.call(attr, *args, **kwargs)
+                if inspect.isfunction(result) or inspect.ismethod(result):
+                    return functools.partial(self._client.call, result)
+                return result
+            return run
+        return attr
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self._client.call(setattr, self._target, name, value)
+
+
+class FrameQueue(queue.Queue):
+    """Queue of the frames delivered to threaded code, with the function to stop the delivery."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._unregister: Optional[Callable[[], None]] = None
+        self._client: Optional["SyncClient"] = None
+
+    def unregister(self) -> None:
+        """Stop delivering frames to this queue."""
+        if self._unregister:
+            self._client.call(self._unregister)
+            self._unregister = None
+
+
+class SyncClient:
+    """
+    Synchronous facade over the async API, for threaded code.
+
+    The client owns one event loop running in a background thread, with one
+    AutoDartSession living on it, so HTTP connections and websockets are
+    shared by every caller thread.
+
+    Example:
+        client = SyncClient(email=..., password=..., client_id=..., realm_name=..., client_secret_key=...)
+        board = client.proxy(client.run(CloudBoard.from_id(client.session, BOARD_ID)))
+        board.async_start()
+    """
+
+    def __init__(self, *args, timeout: Optional[float] = 30, use_uvloop: bool = False, **kwargs) -> None:
+        """
+        Initialize a SyncClient instance and start its loop thread.
+
+        Parameters:
+        - args, kwargs: The parameters of AutoDartSession.
+        - timeout (float|None): The default seconds to wait for a call.
+        - use_uvloop (bool): Run the loop on uvloop if it is installed.
+
+        Returns:
+        None
+        """
+        self.timeout = timeout
+        # Runs the callbacks of register_callback, one at a time in frame order.
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.loop = new_event_loop(use_uvloop)
+        self.thread = threading.Thread(target=self._run_loop, name="autodarts-loop", daemon=True)
+        self.thread.start()
+        self.session: AutoDartSession = self.call(AutoDartSession, *args, **kwargs)
+
+    def _run_loop(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop thread and wait for its result.
+
+        Parameters:
+        - coro (Awaitable): The coroutine.
+        - timeout (float|None): The seconds to wait, the client timeout if None.
+
+        Returns:
+        Any: The coroutine result.
+        """
+        if threading.current_thread() is self.thread:
+            raise RuntimeError("SyncClient.run can't be called from its own loop thread")
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(self.timeout if timeout is None else timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a plain function on the loop thread and wait for its result."""
+        async def wrapper():
+            return func(*args, **kwargs)
+        return self.run(wrapper())
+
+    def collect(self, agen) -> list:
+        """Consume an async generator on the loop thread into a list."""
+        async def wrapper():
+            return [item async for item in agen]
+        return self.run(wrapper())
+
+    def proxy(self, target: Any) -> SyncProxy:
+        """Get a blocking view of an async object."""
+        return SyncProxy(self, target)
+
+    def register_callback(self, entity: AutoDartEndpointWs, cb: Optional[Callable[[Any], None]] = None,
+                          event: Optional[str] = None, topic: str = "state",
+                          executor: Optional[Executor] = None) -> FrameQueue:
+        """
+        Deliver the frames of an entity to threaded code.
+
+        Callbacks run on the loop thread and must not block, so deep copies of
+        the frames are handed over: to ``cb`` through ``executor``, and to the
+        returned queue when no callback is given.
+
+        Parameters:
+        - entity (AutoDartEndpointWs): The entity.
+        - cb (Callable|None): The callback, called with a copy of the frame.
+        - event (str|None): Only this event, all if None.
+        - topic (str): The topic, state or events.
+        - executor (Executor|None): Where to run cb, if None one worker thread of the client, in frame order.
+
+        Returns:
+        FrameQueue: The queue receiving the frames when no callback is given, and its unregister function.
+        """
+        frames = FrameQueue()
+        if cb is not None and executor is None:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="autodarts-callbacks")
+            executor = self._executor
+
+        def deliver(data):
+            data = copy.deepcopy(data)
+            if cb is None:
+                frames.put(data)
+            else:
+                executor.submit(cb, data)
+
+        frames._client = self
+        frames._unregister = self.call(entity.register_callback, deliver, event, topic)
+        return frames
+
+    def connect(self, entity: AutoDartEndpointWs) -> None:
+        """Connect an entity to its websocket, on the loop thread."""
+        self.call(entity.connect)
+
+    def disconnect(self, entity: AutoDartEndpointWs) -> None:
+        """Disconnect an entity from its websocket, on the loop thread."""
+        self.call(entity.disconnect)
+
+    def close(self) -> None:
+        """Close the session and stop the loop thread."""
+        if not self.loop.is_running():
+            return
+        self.run(self.session.async_close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def __enter__(self) -> "SyncClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,733 @@
+"""
+In-process fake AutoDARTS server, for offline development and load tests.
+
+It serves, on one local port, the Keycloak token endpoint, the board,
+match, lobby and user REST endpoints used by this library, and the
+subscribe websocket. Matches started from a lobby play themselves: throws
+are drawn around the aimed segment with a seeded random generator, so a
+match plays the same way on every run, or follow a scripted list of
+segments.
+
+Example:
+    async with FakeAutodartsServer() as server:
+        board = server.add_board(name="Board 1")
+        session = AutoDartSession(**server.session_kwargs())
+        cloud_board = await CloudBoard.from_id(session, board["id"])
+"""
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime, timezone
+import asyncio
+import itertools
+import json
+import random
+
+import aiohttp
+from aiohttp import web
+
+from .scoring import X01Scorer
+from .segments import SEGMENTS, SEGMENT_CODES, aim_point, checkout_aim, classify_code
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _segment(name: str) -> Dict[str, Any]:
+    name, number, multiplier = SEGMENTS[SEGMENT_CODES[name]]
+    return {"name": name, "number": number, "multiplier": multiplier}
+
+
+def _scorer(match: Dict[str, Any]) -> X01Scorer:
+    settings = match.get("settings") or {}
+    scorer = X01Scorer(int(settings.get("baseScore", 501)), settings.get("inMode", "Straight"),
+                       settings.get("outMode", "Straight"))
+    scorer.reset(len(match["players"]))
+    return scorer
+
+
+class _MatchPlay:
+    """Server side of a running match: the scorer, the random generator and the script."""
+
+    def __init__(self, match: Dict[str, Any], seed: str, script: Iterable[str] = ()) -> None:
+        self.rng = random.Random(seed)
+        self.script = list(script)
+        self.scorer = _scorer(match)
+        self.turn_done = True
+        self.task: Optional[asyncio.Task] = None
+
+
+class FakeAutodartsServer:
+    """
+    Fake AutoDARTS services on a local aiohttp server.
+
+    Attributes:
+    - boards (Dict[str, dict]): The boards, by ID, as served by the REST API.
+    - lobbies (Dict[str, dict]): The open lobbies, by ID.
+    - matches (Dict[str, dict]): The matches, by ID.
+    - users (Dict[str, dict]): The users, by ID.
+    - stats (Dict[str, Dict[str, dict]]): Per user ID, the stats by variant.
+    - counters (Dict[str, int]): Requests served, frames sent, tokens issued, matches finished.
+    - answer_pings (bool): Answer the websocket pings, False to simulate a connection gone silent.
+    """
+
+    REALM = "autodarts"
+    CLIENT_ID = "autodarts-fake"
+    SUBSCRIBE_PATH = "/ms/v0/subscribe"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, accounts: Optional[Dict[str, str]] = None,
+                 token_ttl: int = 300, seed: Any = 0, autoplay: bool = True, throw_interval: float = 0.0,
+                 sigma: float = 0.06) -> None:
+        """
+        Initialize a FakeAutodartsServer instance.
+
+        Parameters:
+        - host (str): The interface to listen on.
+        - port (int): The port, a free one if 0.
+        - accounts (Dict[str, str]|None): The accepted email and passwords, any if None.
+        - token_ttl (int): The lifetime of access tokens, in seconds.
+        - seed (Any): The seed of the generated throws.
+        - autoplay (bool): Play the matches started from lobbies.
+        - throw_interval (float): The seconds between two played throws.
+        - sigma (float): The standard deviation of played throws around the aim, in normalized board units.
+
+        Returns:
+        None
+        """
+        self.host = host
+        self.port = port
+        self.accounts = accounts
+        self.token_ttl = token_ttl
+        self.seed = seed
+        self.autoplay = autoplay
+        self.throw_interval = throw_interval
+        self.sigma = sigma
+
+        self.boards: Dict[str, Dict[str, Any]] = {}
+        self.lobbies: Dict[str, Dict[str, Any]] = {}
+        self.matches: Dict[str, Dict[str, Any]] = {}
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self.counters: Dict[str, int] = {"requests": 0, "frames": 0, "tokens": 0, "matches_finished": 0}
+        self.answer_pings = True
+
+        self._ids = itertools.count(1)
+        self._tokens: Dict[str, float] = {}
+        self._subscriptions: Dict[Tuple[str, str], Set[web.WebSocketResponse]] = {}
+        self._plays: Dict[str, _MatchPlay] = {}
+        self._scripts: Dict[str, List[List[str]]] = {}
+        self._board_matches: Dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+    # Lifecycle
+
+    async def start(self) -> "FakeAutodartsServer":
+        """Start listening."""
+        app = web.Application(middlewares=[self._middleware])
+        app.add_routes([
+            web.post("/auth/realms/{realm}/protocol/openid-connect/token", self._token),
+            web.get(self.SUBSCRIBE_PATH, self._subscribe),
+            web.get("/bs/v0/boards/", self._list_boards),
+            web.get("/bs/v0/boards/{id}", self._get_board),
+            web.get("/bs/v0/boards/{id}/state", self._get_board_state),
+            web.put("/bs/v0/boards/{id}/{action:start|stop|reset}", self._board_action),
+            web.get("/gs/v0/matches/", self._list_matches),
+            web.get("/gs/v0/matches/{id}", self._get_match),
+            web.get("/gs/v0/matches/{id}/state", self._get_match),
+            web.delete("/gs/v0/matches/{id}", self._delete_match),
+            web.post("/gs/v0/matches/{id}/players/next", self._next_player),
+            web.post("/gs/v0/matches/{id}/games/next", self._ok),
+            web.post("/gs/v0/matches/{id}/undo", self._undo),
+            web.post("/gs/v0/matches/{id}/finish", self._finish_match),
+            web.post("/gs/v0/matches/{id}/throws", self._post_throw),
+            web.patch("/gs/v0/matches/{id}/throws", self._ok),
+            web.post("/gs/v0/lobbies/", self._new_lobby),
+            web.get("/gs/v0/lobbies/{id}", self._get_lobby),
+            web.delete("/gs/v0/lobbies/{id}", self._delete_lobby),
+            web.post("/gs/v0/lobbies/{id}/players", self._add_player),
+            web.delete("/gs/v0/lobbies/{id}/players/by-index/{index}", self._remove_player),
+            web.route("*", "/gs/v0/lobbies/{id}/start", self._start_lobby),
+            web.get("/as/v0/users/{id}", self._get_user),
+            web.get("/as/v0/users/{id}/stats/{variant}", self._get_stats),
+        ])
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def close(self) -> None:
+        """Stop the played matches, close the websockets and stop listening."""
+        for play in self._plays.values():
+            if play.task:
+                play.task.cancel()
+        for sockets in self._subscriptions.values():
+            for ws in list(sockets):
+                await ws.close()
+        self._subscriptions.clear()
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeAutodartsServer":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @property
+    def url(self) -> str:
+        """Get the root URL of the server."""
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def ws_url(self) -> str:
+        """Get the subscribe websocket URL."""
+        return f"ws://{self.host}:{self.port}{self.SUBSCRIBE_PATH}"
+
+    def session_kwargs(self, email: str = "player@example.com", password: str = "secret") -> Dict[str, Any]:
+        """Get the AutoDartSession parameters pointing at this server."""
+        return {
+            "email": email,
+            "password": password,
+            "client_id": self.CLIENT_ID,
+            "realm_name": self.REALM,
+            "client_secret_key": "fake",
+            "server_url": self.url + "/auth/",
+            "api_url": self.url,
+            "ws_url": self.ws_url,
+        }
+
+    # Fixtures
+
+    def _new_id(self, kind: str) -> str:
+        return f"{kind}-{next(self._ids)}"
+
+    def add_board(self, id: Optional[str] = None, name: Optional[str] = None, connected: bool = True) -> Dict[str, Any]:
+        """
+        Add a board.
+
+        Returns:
+        Dict[str, Any]: The board, as served by the REST API.
+        """
+        id = id or self._new_id("board")
+        board = {
+            "id": id,
+            "name": name or id,
+            "connected": connected,
+            "matchId": None,
+            "version": "fake",
+            "os": "fake",
+            "owners": [],
+            "state": {"connected": connected, "running": False, "status": "Stopped", "event": "Stopped",
+                      "numThrows": 0, "throws": []},
+        }
+        self.boards[id] = board
+        return board
+
+    def add_user(self, name: str, id: Optional[str] = None, stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Add a user, with seeded stats unless given.
+
+        Parameters:
+        - name (str): The user name.
+        - id (str|None): The user ID, generated if None.
+        - stats (Dict[str, Any]|None): The stats payloads by variant (x01, cricket, countup).
+
+        Returns:
+        Dict[str, Any]: The user.
+        """
+        id = id or self._new_id("user")
+        user = {"id": id, "name": name}
+        self.users[id] = user
+        if stats is None:
+            rng = random.Random(f"{self.seed}:{id}")
+            average = rng.uniform(30, 90)
+            stats = {
+                "x01": {"average": round(average, 2), "first9Average": round(average * 1.08, 2),
+                        "checkoutPercent": round(rng.uniform(15, 45), 2), "matches": rng.randint(0, 500),
+                        "legsWon": rng.randint(0, 1500)},
+                "cricket": {"mpr": round(rng.uniform(1, 4), 2), "matches": rng.randint(0, 100),
+                            "legsWon": rng.randint(0, 300)},
+                "countup": {"average": round(average * 1.1, 2), "matches": rng.randint(0, 100)},
+            }
+        self.stats[id] = stats
+        return user
+
+    def script(self, board_id: str, throws: Iterable[str]) -> None:
+        """
+        Script the throws of the next match started on a board.
+
+        Parameters:
+        - board_id (str): The board ID.
+        - throws (Iterable[str]): Segment names (T20, D16, Bull, 25, S5, Miss), played in order before
+          seeded throws take over.
+        """
+        self._scripts.setdefault(board_id, []).append(list(throws))
+
+    # Websocket
+
+    async def publish(self, channel: str, topic: str, data: Dict[str, Any]) -> int:
+        """
+        Send a frame to the subscribers of a topic.
+
+        Returns:
+        int: The number of subscribers reached.
+        """
+        sockets = self._subscriptions.get((channel, topic))
+        if not sockets:
+            return 0
+        frame = json.dumps({"channel": channel, "topic": topic, "data": data})
+        sent = 0
+        for ws in list(sockets):
+            if ws.closed:
+                sockets.discard(ws)
+                continue
+            try:
+                await ws.send_str(frame)
+                sent += 1
+            except (ConnectionError, RuntimeError):
+                sockets.discard(ws)
+        self.counters["frames"] += sent
+        return sent
+
+    def subscriber_count(self, channel: Optional[str] = None) -> int:
+        """Get the number of topic subscriptions, of a channel or of all."""
+        return sum(len(sockets) for (ch, _), sockets in self._subscriptions.items() if channel in (None, ch))
+
+    async def _subscribe(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(autoping=False)
+        await ws.prepare(request)
+        topics = set()
+        try:
+            async for msg in ws:
+                if msg.type == aiohttp.WSMsgType.PING:
+                    if self.answer_pings:
+                        await ws.pong(msg.data)
+                    continue
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                try:
+                    message = json.loads(msg.data)
+                    key = (message["channel"], message["topic"])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if message.get("type") == "subscribe":
+                    self._subscriptions.setdefault(key, set()).add(ws)
+                    topics.add(key)
+                elif message.get("type") == "unsubscribe":
+                    self._subscriptions.get(key, set()).discard(ws)
+                    topics.discard(key)
+        finally:
+            for key in topics:
+                self._subscriptions.get(key, set()).discard(ws)
+        return ws
+
+    # Authentication
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        self.counters["requests"] += 1
+        if not request.path.startswith("/auth/"):
+            token = request.headers.get("Authorization", "").partition("Bearer ")[2]
+            expiry = self._tokens.get(token)
+            if expiry is None or expiry < asyncio.get_running_loop().time():
+                return web.json_response({"error": "unauthorized"}, status=401)
+        return await handler(request)
+
+    async def _token(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if request.match_info["realm"] != self.REALM:
+            return web.json_response({"error": "Realm does not exist"}, status=404)
+        grant = form.get("grant_type")
+        if grant == "password":
+            if self.accounts is not None and self.accounts.get(form.get("username")) != form.get("password"):
+                return web.json_response({"error": "invalid_grant"}, status=401)
+        elif grant == "refresh_token":
+            if form.get("refresh_token") not in self._tokens:
+                return web.json_response({"error": "invalid_grant"}, status=400)
+        else:
+            return web.json_response({"error": "unsupported_grant_type"}, status=400)
+        token = self._new_id("token")
+        self._tokens[token] = asyncio.get_running_loop().time() + self.token_ttl
+        self.counters["tokens"] += 1
+        return web.json_response({
+            "access_token": token,
+            "expires_in": self.token_ttl,
+            "refresh_token": token,
+            "refresh_expires_in": self.token_ttl,
+            "token_type": "Bearer",
+        })
+
+    # REST helpers
+
+    @staticmethod
+    def _not_found(kind: str) -> web.Response:
+        return web.json_response({"error": f"{kind} not found"}, status=404)
+
+    async def _ok(self, request: web.Request) -> web.Response:
+        return web.json_response({})
+
+    async def _json(self, request: web.Request) -> Dict[str, Any]:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = dict(await request.post())
+        return data if isinstance(data, dict) else {}
+
+    # Boards
+
+    async def _list_boards(self, request: web.Request) -> web.Response:
+        return web.json_response(list(self.boards.values()))
+
+    async def _get_board(self, request: web.Request) -> web.Response:
+        board = self.boards.get(request.match_info["id"])
+        return web.json_response(board) if board else self._not_found("Board")
+
+    async def _get_board_state(self, request: web.Request) -> web.Response:
+        board = self.boards.get(request.match_info["id"])
+        return web.json_response(board["state"]) if board else self._not_found("Board")
+
+    async def publish_board(self, board_id: str, **changes) -> None:
+        """Update the state of a board and send it to its subscribers."""
+        board = self.boards[board_id]
+        board["state"].update(changes)
+        if "connected" in changes:
+            board["connected"] = changes["connected"]
+        await self.publish("autodarts.boards", f"{board_id}.state", dict(board["state"]))
+
+    async def _board_action(self, request: web.Request) -> web.Response:
+        board_id = request.match_info["id"]
+        if board_id not in self.boards:
+            return self._not_found("Board")
+        action = request.match_info["action"]
+        if action == "start":
+            await self.publish_board(board_id, event="Starting", status="Starting")
+            await self.publish_board(board_id, event="Started", status="Throw", running=True)
+        elif action == "stop":
+            await self.publish_board(board_id, event="Stopping", status="Stopping")
+            await self.publish_board(board_id, event="Stopped", status="Stopped", running=False)
+        else:
+            await self.publish_board(board_id, event="Manual_reset", status="Throw", numThrows=0, throws=[])
+        return web.json_response({})
+
+    # Lobbies
+
+    async def publish_lobby(self, lobby: Dict[str, Any]) -> None:
+        """Send the state of a lobby to its subscribers."""
+        await self.publish("autodarts.lobbies", f"{lobby['id']}.state", lobby)
+
+    async def _new_lobby(self, request: web.Request) -> web.Response:
+        data = await self._json(request)
+        lobby = {
+            "id": self._new_id("lobby"),
+            "createdAt": _now(),
+            "variant": data.get("variant", "X01"),
+            "settings": data.get("settings") or {},
+            "bullOffMode": data.get("bullOffMode", "Off"),
+            "isPrivate": data.get("isPrivate", True),
+            "hostId": "host-fake",
+            "host": {"id": "host-fake", "name": "fake"},
+            "maxPlayers": 8,
+            "players": [],
+        }
+        self.lobbies[lobby["id"]] = lobby
+        return web.json_response(lobby, status=201)
+
+    async def _get_lobby(self, request: web.Request) -> web.Response:
+        lobby = self.lobbies.get(request.match_info["id"])
+        return web.json_response(lobby) if lobby else self._not_found("Lobby")
+
+    async def _delete_lobby(self, request: web.Request) -> web.Response:
+        if self.lobbies.pop(request.match_info["id"], None) is None:
+            return self._not_found("Lobby")
+        return web.json_response({})
+
+    async def _add_player(self, request: web.Request) -> web.Response:
+        lobby = self.lobbies.get(request.match_info["id"])
+        if lobby is None:
+            return self._not_found("Lobby")
+        data = await self._json(request)
+        if len(lobby["players"]) >= lobby["maxPlayers"]:
+            return web.json_response({"error": "Lobby is full"}, status=400)
+        if data.get("boardId") not in self.boards:
+            return web.json_response({"error": "Unknown board"}, status=400)
+        lobby["players"].append({
+            "id": self._new_id("player"),
+            "index": len(lobby["players"]),
+            "name": data.get("name"),
+            "userId": data.get("userId"),
+            "boardId": data["boardId"],
+            "boardName": self.boards[data["boardId"]]["name"],
+            "hostId": lobby["hostId"],
+        })
+        await self.publish_lobby(lobby)
+        return web.json_response(lobby, status=201)
+
+    async def _remove_player(self, request: web.Request) -> web.Response:
+        lobby = self.lobbies.get(request.match_info["id"])
+        if lobby is None:
+            return self._not_found("Lobby")
+        try:
+            del lobby["players"][int(request.match_info["index"])]
+        except (ValueError, IndexError):
+            return self._not_found("Player")
+        for index, player in enumerate(lobby["players"]):
+            player["index"] = index
+        await self.publish_lobby(lobby)
+        return web.json_response({})
+
+    async def _start_lobby(self, request: web.Request) -> web.Response:
+        lobby = self.lobbies.get(request.match_info["id"])
+        if lobby is None:
+            return self._not_found("Lobby")
+        if not lobby["players"]:
+            return web.json_response({"error": "No player"}, status=400)
+        match = self.start_match(lobby["variant"], lobby["settings"], lobby["players"])
+        del self.lobbies[lobby["id"]]
+        return web.json_response(match, status=201)
+
+    # Matches
+
+    def start_match(self, variant: str, settings: Dict[str, Any], players: List[Dict[str, Any]],
+                    script: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Start a match directly, without lobby.
+
+        Matches are always scored as x01 (baseScore, inMode and outMode of
+        the settings), whatever the variant. With autoplay, a task plays it.
+
+        Parameters:
+        - variant (str): The variant.
+        - settings (Dict[str, Any]): The settings.
+        - players (List[dict]): The players, with name, boardId and optional userId.
+        - script (Iterable[str]|None): The first throws, else the next ones scripted on the first board.
+
+        Returns:
+        Dict[str, Any]: The match state.
+        """
+        match_id = self._new_id("match")
+        settings = dict(settings or {})
+        base_score = int(settings.get("baseScore", 501))
+        players = [dict(player, id=player.get("id") or self._new_id("player"), index=index)
+                   for index, player in enumerate(players)]
+        match = {
+            "id": match_id,
+            "createdAt": _now(),
+            "variant": variant,
+            "settings": settings,
+            "host": {"id": "host-fake", "name": "fake"},
+            "players": players,
+            "turns": [],
+            "player": 0,
+            "round": 1,
+            "set": 1,
+            "leg": 1,
+            "gameScores": [base_score] * len(players),
+            "turnScore": 0,
+            "turnBusted": False,
+            "gameFinished": False,
+            "finished": False,
+            "winner": -1,
+        }
+        self.matches[match_id] = match
+
+        first_board = players[0].get("boardId")
+        if script is None and self._scripts.get(first_board):
+            script = self._scripts[first_board].pop(0)
+        # Seeded per board and per match played on it, so concurrent starts don't change the throws.
+        count = self._board_matches.get(first_board, 0)
+        self._board_matches[first_board] = count + 1
+        play = _MatchPlay(match, f"{self.seed}:{first_board}:{count}", script or ())
+        self._plays[match_id] = play
+        for board_id in {player.get("boardId") for player in players}:
+            if board_id in self.boards:
+                self.boards[board_id]["matchId"] = match_id
+        if self.autoplay:
+            play.task = asyncio.create_task(self._autoplay(match_id))
+        return match
+
+    async def publish_match(self, match: Dict[str, Any]) -> None:
+        """Send the state of a match to its subscribers."""
+        await self.publish("autodarts.matches", f"{match['id']}.state", match)
+
+    def _next_throw(self, match: Dict[str, Any], play: _MatchPlay) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        if play.script:
+            segment = _segment(play.script.pop(0))
+            x, y = aim_point(segment["number"], segment["multiplier"])
+        else:
+            player = play.scorer.players[match["player"]]
+            aim = aim_point(*checkout_aim(player.remaining, play.scorer.out_mode))
+            x, y = play.rng.gauss(aim[0], self.sigma), play.rng.gauss(aim[1], self.sigma)
+            name, number, multiplier = SEGMENTS[classify_code(x, y)]
+            segment = {"name": name, "number": number, "multiplier": multiplier}
+        return segment, {"x": x, "y": y}
+
+    async def _autoplay(self, match_id: str) -> None:
+        match = self.matches.get(match_id)
+        play = self._plays.get(match_id)
+        while match is not None and not match["finished"] and self.matches.get(match_id) is match:
+            await asyncio.sleep(self.throw_interval)
+            if match["finished"]:
+                break
+            segment, coords = self._next_throw(match, play)
+            await self.throw(match_id, segment, coords)
+
+    async def throw(self, match_id: str, segment: Dict[str, Any], coords: Optional[Dict[str, float]] = None) -> None:
+        """
+        Add a throw of the current player to a match, and publish the match and board states.
+
+        A turn ends after 3 darts or a bust, then the next player is up. The
+        match finishes when a player checks out.
+        """
+        match = self.matches[match_id]
+        play = self._plays[match_id]
+        index = match["player"]
+        if play.turn_done or not match["turns"]:
+            match["turns"].append({
+                "id": f"{match_id}-turn-{len(match['turns']) + 1}",
+                "playerId": match["players"][index]["id"],
+                "round": match["round"],
+                "throws": [],
+                "points": 0,
+                "busted": False,
+            })
+            play.turn_done = False
+        turn = match["turns"][-1]
+        throw = {"segment": dict(segment)}
+        if coords:
+            throw["coords"] = dict(coords)
+        turn["throws"].append(throw)
+        player = play.scorer.apply_throw(index, segment, turn["id"])
+        turn["points"] = player.turn_points
+        turn["busted"] = player.turn_busted
+        match["gameScores"][index] = player.remaining
+        match["turnScore"] = player.turn_points
+        match["turnBusted"] = player.turn_busted
+
+        if player.remaining == 0:
+            match["finished"] = match["gameFinished"] = True
+            match["winner"] = index
+            self.counters["matches_finished"] += 1
+        elif player.turn_busted or len(turn["throws"]) >= 3:
+            play.turn_done = True
+            match["player"] = (index + 1) % len(match["players"])
+            if match["player"] == 0:
+                match["round"] += 1
+
+        board_id = match["players"][index].get("boardId")
+        if board_id in self.boards:
+            await self.publish_board(board_id, event="Throw detected", status="Throw",
+                                     numThrows=len(turn["throws"]), throws=list(turn["throws"]))
+        await self.publish_match(match)
+        if match["finished"]:
+            await self._release_boards(match)
+
+    async def _release_boards(self, match: Dict[str, Any]) -> None:
+        for board_id in {player.get("boardId") for player in match["players"]}:
+            board = self.boards.get(board_id)
+            if board is not None and board["matchId"] == match["id"]:
+                board["matchId"] = None
+                await self.publish_board(board_id, event="Takeout finished", numThrows=0, throws=[])
+
+    def _replay(self, match: Dict[str, Any], play: _MatchPlay) -> None:
+        """Recompute the scores of a match from its turns, after an undo."""
+        play.scorer = _scorer(match)
+        for turn in match["turns"]:
+            index = next((p["index"] for p in match["players"] if p["id"] == turn["playerId"]), 0)
+            for throw in turn["throws"]:
+                player = play.scorer.apply_throw(index, throw["segment"], turn["id"])
+            if turn["throws"]:
+                turn["points"], turn["busted"] = player.turn_points, player.turn_busted
+                match["gameScores"][index] = player.remaining
+
+    async def _get_match(self, request: web.Request) -> web.Response:
+        match = self.matches.get(request.match_info["id"])
+        return web.json_response(match) if match else self._not_found("Match")
+
+    async def _list_matches(self, request: web.Request) -> web.Response:
+        return web.json_response([match for match in self.matches.values() if not match["finished"]])
+
+    async def _delete_match(self, request: web.Request) -> web.Response:
+        match = self.matches.pop(request.match_info["id"], None)
+        if match is None:
+            return self._not_found("Match")
+        play = self._plays.pop(match["id"], None)
+        if play and play.task:
+            play.task.cancel()
+        await self.publish("autodarts.matches", f"{match['id']}.events", {"event": "delete"})
+        await self._release_boards(match)
+        return web.json_response({})
+
+    async def _finish_match(self, request: web.Request) -> web.Response:
+        match = self.matches.get(request.match_info["id"])
+        if match is None:
+            return self._not_found("Match")
+        if not match["finished"]:
+            match["finished"] = match["gameFinished"] = True
+            self.counters["matches_finished"] += 1
+            await self.publish_match(match)
+            await self._release_boards(match)
+        return web.json_response({})
+
+    async def _next_player(self, request: web.Request) -> web.Response:
+        match = self.matches.get(request.match_info["id"])
+        if match is None:
+            return self._not_found("Match")
+        play = self._plays[match["id"]]
+        play.turn_done = True
+        match["player"] = (match["player"] + 1) % len(match["players"])
+        if match["player"] == 0:
+            match["round"] += 1
+        await self.publish_match(match)
+        return web.json_response({})
+
+    async def _undo(self, request: web.Request) -> web.Response:
+        match = self.matches.get(request.match_info["id"])
+        if match is None:
+            return self._not_found("Match")
+        if match["turns"] and not match["finished"]:
+            turn = match["turns"][-1]
+            if turn["throws"]:
+                turn["throws"].pop()
+            if not turn["throws"]:
+                match["turns"].pop()
+            play = self._plays[match["id"]]
+            base_score = int(match["settings"].get("baseScore", 501))
+            match["gameScores"] = [base_score] * len(match["players"])
+            self._replay(match, play)
+            # The player of the undone throw is up again, in its turn.
+            play.turn_done = not turn["throws"]
+            match["player"] = next(p["index"] for p in match["players"] if p["id"] == turn["playerId"])
+            match["round"] = turn["round"]
+            await self.publish_match(match)
+        return web.json_response({})
+
+    async def _post_throw(self, request: web.Request) -> web.Response:
+        match = self.matches.get(request.match_info["id"])
+        if match is None:
+            return self._not_found("Match")
+        if match["finished"]:
+            return web.json_response({"error": "Match is finished"}, status=400)
+        data = await self._json(request)
+        segment = data.get("segment") or {}
+        if "name" in segment and segment["name"] in SEGMENT_CODES:
+            segment = _segment(segment["name"])
+        await self.throw(match["id"], segment, data.get("coords"))
+        return web.json_response({}, status=201)
+
+    # Users
+
+    async def _get_user(self, request: web.Request) -> web.Response:
+        user = self.users.get(request.match_info["id"])
+        return web.json_response(user) if user else self._not_found("User")
+
+    async def _get_stats(self, request: web.Request) -> web.Response:
+        stats = self.stats.get(request.match_info["id"])
+        if stats is None:
+            return self._not_found("User")
+        return web.json_response(stats.get(request.match_info["variant"]) or {})
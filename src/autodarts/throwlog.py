@@ -0,0 +1,422 @@
+"""
+Compact binary log of throws, readable as NumPy columns without parsing.
+
+File layout (little-endian):
+- header: magic ``ADTLOG``, version, record size, base time (ms since the
+  epoch), records offset, segment dictionary size;
+- segment dictionary: the segment names, NUL-separated, the code of a
+  segment being its position;
+- records, fixed width (RECORD_STRUCT), up to the end of the file.
+
+A record holds the milliseconds since the previous record, the match and
+player indexes in the ID table, float32 coords (NaN when unknown), the
+segment code, the dart index in the turn and the round. The match and
+player IDs are kept in a sidecar text file (``<path>.ids``), one per line,
+the index of an ID being its line number.
+
+The log is append-only: an undone throw is retracted by a later record
+with segment code RETRACT_CODE and the match, player, round and dart of
+the throw, which the reader masks out with it.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import math
+import os
+import struct
+import time
+
+from .session import AutoDartException
+from .match import Match, ThrowCursor
+from .segments import SEGMENTS, SEGMENT_CODES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+THROWLOG_MAGIC = b"ADTLOG"
+THROWLOG_VERSION = 1
+_HEADER = struct.Struct("<6sBBQII")
+RECORD_STRUCT = struct.Struct("<IIIffBBH")
+# Segment code of the records only carrying time, for gaps longer than the uint32 delta.
+GAP_CODE = 255
+MAX_DELTA = 0xFFFFFFFF
+# Segment code of the records retracting the last throw with the same match, player, round and dart.
+RETRACT_CODE = 254
+
+RECORD_DTYPE = None
+if np is not None:
+    RECORD_DTYPE = np.dtype([
+        ("dt", "<u4"), ("match", "<u4"), ("player", "<u4"), ("x", "<f4"), ("y", "<f4"),
+        ("segment", "u1"), ("dart", "u1"), ("round", "<u2"),
+    ])
+
+
+class AutoDartThrowLogException(AutoDartException):
+    """Exception raised for unreadable throw logs."""
+    pass
+
+
+def _read_header(f) -> Tuple[int, int, List[str]]:
+    """Read the header of a throw log, returning the base time, records offset and segment names."""
+    data = f.read(_HEADER.size)
+    try:
+        magic, version, record_size, base_ms, offset, dict_size = _HEADER.unpack(data)
+    except struct.error as err:
+        raise AutoDartThrowLogException(f"Invalid throw log: {err}") from err
+    if magic != THROWLOG_MAGIC or version != THROWLOG_VERSION or record_size != RECORD_STRUCT.size:
+        raise AutoDartThrowLogException(f"Unsupported throw log {magic!r} version {version}")
+    names = f.read(dict_size).decode().split("\0")
+    return base_ms, offset, names
+
+
+def _read_ids(path: str) -> List[str]:
+    try:
+        with open(path + ".ids", encoding="utf-8") as f:
+            return f.read().splitlines()
+    except FileNotFoundError:
+        return []
+
+
+class ThrowLogWriter:
+    """
+    Append throws to a throw log.
+
+    Records are packed into a buffer and written when it is full, on flush
+    and on close. An existing log is appended to.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 4096) -> None:
+        """
+        Initialize a ThrowLogWriter instance, creating the log if needed.
+
+        Parameters:
+        - path (str): The log path.
+        - buffer_size (int): The number of records buffered before writing.
+
+        Returns:
+        None
+        """
+        self.path = path
+        self.buffer_size = buffer_size
+        self.written = 0
+        self._buffer = bytearray()
+        self._buffered = 0
+        self._cursors: Dict[str, ThrowCursor] = {}
+        # The (player ID, round, throws logged) per turn key, per match, to retract undone throws.
+        self._turns: Dict[str, Dict[Any, List[Any]]] = {}
+
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                base_ms, offset, _ = _read_header(f)
+                f.seek(offset)
+                data = f.read()
+            size = len(data) - len(data) % RECORD_STRUCT.size
+            self._last_ms = base_ms + sum(record[0] for record in RECORD_STRUCT.iter_unpack(data[:size]))
+            self._file = open(path, "r+b")
+            # Drop a partial record left by a crash.
+            self._file.truncate(offset + size)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            # The header is written with the time of the first throw as base time.
+            self._last_ms = None
+            self._file = open(path, "wb")
+
+        self._ids: Dict[str, int] = {id: index for index, id in enumerate(_read_ids(path))}
+        self._ids_file = open(path + ".ids", "a", encoding="utf-8")
+
+    def _write_header(self, base_ms: int) -> None:
+        names = "\0".join(name for name, _, _ in SEGMENTS).encode()
+        offset = _HEADER.size + len(names)
+        offset += -offset % 8
+        self._file.write(_HEADER.pack(THROWLOG_MAGIC, THROWLOG_VERSION, RECORD_STRUCT.size,
+                                      base_ms, offset, len(names)))
+        self._file.write(names.ljust(offset - _HEADER.size, b"\0"))
+        self._file.flush()
+        self._last_ms = base_ms
+
+    def _id(self, id: Optional[str]) -> int:
+        id = id or ""
+        index = self._ids.get(id)
+        if index is None:
+            index = self._ids[id] = len(self._ids)
+            # Written at once, so records never point past the ID table.
+            self._ids_file.write(id + "\n")
+            self._ids_file.flush()
+        return index
+
+    def append(self, match_id: Optional[str], player_id: Optional[str], segment: Union[str, Dict[str, Any]],
+               x: Optional[float] = None, y: Optional[float] = None, ts: Optional[float] = None,
+               dart: int = 0, round: int = 0) -> None:
+        """
+        Append a throw.
+
+        Parameters:
+        - match_id (str|None): The match ID.
+        - player_id (str|None): The player ID.
+        - segment (str|dict): The segment name, or a segment dict with its name.
+        - x, y (float|None): The normalized board coordinates, NaN if None.
+        - ts (float|None): The time of the throw (time.time()), now if None.
+        - dart (int): The index of the dart in its turn.
+        - round (int): The round of the turn.
+        """
+        name = segment.get("name") if isinstance(segment, dict) else segment
+        self._append(match_id, player_id, SEGMENT_CODES.get(name, 0), x, y, ts, dart, round)
+
+    def retract(self, match_id: Optional[str], player_id: Optional[str], ts: Optional[float] = None,
+                dart: int = 0, round: int = 0) -> None:
+        """
+        Retract the last throw appended with the same match, player, round and dart (an undone one).
+
+        Parameters:
+        - match_id (str|None): The match ID.
+        - player_id (str|None): The player ID.
+        - ts (float|None): The time of the retraction (time.time()), now if None.
+        - dart (int): The index of the dart in its turn.
+        - round (int): The round of the turn.
+        """
+        self._append(match_id, player_id, RETRACT_CODE, None, None, ts, dart, round)
+
+    def _append(self, match_id: Optional[str], player_id: Optional[str], code: int, x: Optional[float],
+                y: Optional[float], ts: Optional[float], dart: int, round: int) -> None:
+        ts_ms = math.floor((time.time() if ts is None else ts) * 1000 + 0.5)
+        if self._last_ms is None:
+            self._write_header(ts_ms)
+        # Keep the records in time order even if the clock goes back.
+        delta = max(0, ts_ms - self._last_ms)
+        self._last_ms += delta
+        while delta > MAX_DELTA:
+            self._pack(MAX_DELTA, 0, 0, math.nan, math.nan, GAP_CODE, 0, 0)
+            delta -= MAX_DELTA
+        self._pack(delta, self._id(match_id), self._id(player_id),
+                   math.nan if x is None else x, math.nan if y is None else y,
+                   code, dart, max(0, min(int(round or 0), 0xFFFF)))
+
+    def _pack(self, *record) -> None:
+        self._buffer += RECORD_STRUCT.pack(*record)
+        self._buffered += 1
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered records."""
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self.written += self._buffered
+            self._buffer = bytearray()
+            self._buffered = 0
+
+    def close(self) -> None:
+        """Write the buffered records and close the files."""
+        if not self._file.closed:
+            if self._last_ms is None:
+                self._write_header(int(time.time() * 1000))
+            self.flush()
+            self._file.close()
+            self._ids_file.close()
+
+    def __enter__(self) -> "ThrowLogWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def match_state(self, state: Dict[str, Any], ts: Optional[float] = None) -> int:
+        """
+        Append the new throws of a match state frame, retracting the undone ones first.
+
+        Returns:
+        int: The number of throws appended.
+        """
+        match_id = state.get("id")
+        cursor = self._cursors.setdefault(match_id, ThrowCursor())
+        turns = self._turns.setdefault(match_id, {})
+        new_throws = cursor.advance(state)
+        for key, turn in cursor.rewound_turns:
+            logged = turns.get(key)
+            if logged is None:
+                continue
+            player_id, round, count = logged
+            kept = len(turn.get("throws") or []) if turn is not None else 0
+            for dart in range(count - 1, kept - 1, -1):
+                self.retract(match_id, player_id, ts=ts, dart=dart, round=round)
+            logged[2] = min(count, kept)
+        # The new throws of a turn are the last ones of its list.
+        index = {}
+        for turn, _ in new_throws:
+            index[id(turn)] = index.get(id(turn), len(turn["throws"])) - 1
+        for turn, throw in new_throws:
+            dart = index[id(turn)]
+            index[id(turn)] += 1
+            coords = throw.get("coords") or {}
+            self.append(match_id, turn.get("playerId"), throw.get("segment") or {}, coords.get("x"), coords.get("y"),
+                        ts=ts, dart=dart, round=turn.get("round") or 0)
+            turns[ThrowCursor.turn_key(turn)] = [turn.get("playerId"), turn.get("round") or 0, dart + 1]
+        if state.get("finished"):
+            self._cursors.pop(match_id, None)
+            self._turns.pop(match_id, None)
+        return len(new_throws)
+
+    def attach(self, match: Match):
+        """
+        Log the throws of a match from its state frames.
+
+        Parameters:
+        - match (Match): The match, connected to receive frames.
+
+        Returns:
+        Callable[[], None]: The function to detach the writer.
+        """
+        return match.register_callback(self.match_state)
+
+
+class ThrowLogReader:
+    """
+    Memory-mapped read access to a throw log, as NumPy columns.
+
+    Column properties are views on the mapped file, nothing is parsed or
+    copied, except when gap or retraction records must be filtered out. Timestamps are
+    rebuilt from the deltas once, on first access.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Initialize a ThrowLogReader instance.
+
+        Parameters:
+        - path (str): The log path.
+
+        Raises:
+        - AutoDartException: If numpy is not installed.
+        - AutoDartThrowLogException: If the file is not a valid throw log.
+
+        Returns:
+        None
+        """
+        if np is None:
+            raise AutoDartException("numpy is required to read throw logs, install autodarts[numpy]")
+        self.path = path
+        with open(path, "rb") as f:
+            self.base_ms, offset, self.segment_names = _read_header(f)
+        count = (os.path.getsize(path) - offset) // RECORD_STRUCT.size
+        if count:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=offset, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+        self.ids = _read_ids(path)
+        self._index = {id: index for index, id in enumerate(self.ids)}
+        self._valid = None
+        segment = self.records["segment"]
+        retractions = np.flatnonzero(segment == RETRACT_CODE)
+        gaps = segment == GAP_CODE
+        if gaps.any() or len(retractions):
+            self._valid = ~gaps
+            self._valid[retractions] = False
+            for position in retractions:
+                self._retract(position)
+        self._timestamps = None
+
+        names = self.segment_names
+        lookup = {name: (number, multiplier) for name, number, multiplier in SEGMENTS}
+        self._numbers = np.array([lookup.get(name, (0, 0))[0] for name in names] + [0] * (256 - len(names)),
+                                 dtype=np.int16)
+        self._multipliers = np.array([lookup.get(name, (0, 0))[1] for name in names] + [0] * (256 - len(names)),
+                                     dtype=np.int16)
+
+    def _retract(self, position: int) -> None:
+        """Mask the last valid throw before a retraction record with its match, player, round and dart."""
+        record = self.records[position]
+        head = self.records[:position]
+        same = ((head["match"] == record["match"]) & (head["player"] == record["player"])
+                & (head["round"] == record["round"]) & (head["dart"] == record["dart"]) & self._valid[:position])
+        found = np.flatnonzero(same)
+        if len(found):
+            self._valid[found[-1]] = False
+
+    def __len__(self) -> int:
+        return len(self.records) if self._valid is None else int(self._valid.sum())
+
+    def _column(self, name: str) -> "np.ndarray":
+        column = self.records[name]
+        return column if self._valid is None else column[self._valid]
+
+    @property
+    def x(self) -> "np.ndarray":
+        """Get the float32 x coords, NaN when unknown."""
+        return self._column("x")
+
+    @property
+    def y(self) -> "np.ndarray":
+        """Get the float32 y coords, NaN when unknown."""
+        return self._column("y")
+
+    @property
+    def segment(self) -> "np.ndarray":
+        """Get the uint8 segment codes, positions in segment_names."""
+        return self._column("segment")
+
+    @property
+    def player(self) -> "np.ndarray":
+        """Get the uint32 player indexes in ids."""
+        return self._column("player")
+
+    @property
+    def match(self) -> "np.ndarray":
+        """Get the uint32 match indexes in ids."""
+        return self._column("match")
+
+    @property
+    def dart(self) -> "np.ndarray":
+        """Get the uint8 dart indexes in their turn."""
+        return self._column("dart")
+
+    @property
+    def round(self) -> "np.ndarray":
+        """Get the uint16 rounds."""
+        return self._column("round")
+
+    @property
+    def timestamps(self) -> "np.ndarray":
+        """Get the float64 throw times, in seconds since the epoch."""
+        if self._timestamps is None:
+            ms = self.base_ms + np.cumsum(self.records["dt"], dtype=np.int64)
+            self._timestamps = (ms if self._valid is None else ms[self._valid]) / 1000.0
+        return self._timestamps
+
+    @property
+    def points(self) -> "np.ndarray":
+        """Get the points scored by each throw."""
+        segment = self.segment
+        return self._numbers[segment] * self._multipliers[segment]
+
+    def id_index(self, id: str) -> int:
+        """Get the index of a match or player ID, -1 if it is not in the log."""
+        return self._index.get(id, -1)
+
+    def player_mask(self, player_id: str) -> "np.ndarray":
+        """Get the boolean mask of the throws of a player."""
+        return self.player == self.id_index(player_id)
+
+    def segment_counts(self, mask: Optional["np.ndarray"] = None) -> Dict[str, int]:
+        """Get how many throws hit each segment, of the masked throws or all."""
+        segment = self.segment if mask is None else self.segment[mask]
+        counts = np.bincount(segment, minlength=len(self.segment_names))
+        return {name: int(count) for name, count in zip(self.segment_names, counts) if count}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        """Iterate the throws as dicts, slow, for debugging and export."""
+        for record, ts in zip(self.records if self._valid is None else self.records[self._valid], self.timestamps):
+            yield {
+                "ts": float(ts),
+                "match_id": self.ids[record["match"]] if record["match"] < len(self.ids) else None,
+                "player_id": self.ids[record["player"]] if record["player"] < len(self.ids) else None,
+                "segment": self.segment_names[record["segment"]],
+                "x": float(record["x"]),
+                "y": float(record["y"]),
+                "dart": int(record["dart"]),
+                "round": int(record["round"]),
+            }
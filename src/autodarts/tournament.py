@@ -0,0 +1,413 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from collections import deque
+import asyncio
+import time
+
+from .session import AutoDartSession
+from .board import CloudBoard
+from .lobby import Lobby
+from .match import Match
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Placeholder of the missing opponent of a player advancing without playing.
+BYE = {"name": "BYE"}
+
+
+class Fixture:
+    """
+    A match to play in a tournament.
+
+    Attributes:
+    - id (str): The fixture ID, such as R1-M3.
+    - round (int): The round number, from 1.
+    - players (List[dict|None]): The players, None while they come from an unfinished fixture.
+    - sources (List[Fixture|None]): Per player slot, the fixture whose winner takes it.
+    - status (str): pending, running, finished or failed.
+    - board_id (str|None): The board the match is played on.
+    - match (Match|None): The match, once set up.
+    - winner (dict|None): The winning player, once finished.
+    - attempts (int): The number of setups tried.
+    - started_at (float|None), finished_at (float|None): time.monotonic() values.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    FINISHED = "finished"
+    FAILED = "failed"
+
+    def __init__(self, id: str, players: List[Optional[Dict[str, Any]]], round: int = 1,
+                 sources: Optional[List[Optional["Fixture"]]] = None) -> None:
+        self.id = id
+        self.round = round
+        self.players = list(players)
+        self.sources = list(sources) if sources else [None] * len(self.players)
+        self.status = self.PENDING
+        self.board_id: Optional[str] = None
+        self.match: Optional[Match] = None
+        self.winner: Optional[Dict[str, Any]] = None
+        self.attempts = 0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """Check if the fixture can be played, all its players being known."""
+        return self.status == self.PENDING and all(player is not None for player in self.players)
+
+    @property
+    def done(self) -> bool:
+        """Check if the fixture is finished or failed."""
+        return self.status in (self.FINISHED, self.FAILED)
+
+    def __repr__(self) -> str:
+        return f"<Fixture {self.id} {self.status}>"
+
+
+def round_robin(players: Iterable[Dict[str, Any]], cycles: int = 1) -> List[Fixture]:
+    """
+    Plan a round-robin, every player meeting every other one per cycle.
+
+    Rounds are built with the circle method, so nobody plays twice in a round.
+
+    Parameters:
+    - players (Iterable[dict]): The players, with name and optional userId.
+    - cycles (int): The number of times each pair meets, home and away alternating.
+
+    Returns:
+    List[Fixture]: The fixtures, by round.
+    """
+    players = list(players)
+    if len(players) % 2:
+        players.append(BYE)
+    count = len(players)
+    fixtures = []
+    rotation = list(range(count))
+    for cycle in range(cycles):
+        for r in range(count - 1):
+            number = cycle * (count - 1) + r + 1
+            for i in range(count // 2):
+                home, away = players[rotation[i]], players[rotation[count - 1 - i]]
+                if home is BYE or away is BYE:
+                    continue
+                if (cycle + r) % 2:
+                    home, away = away, home
+                fixtures.append(Fixture(f"R{number}-M{len(fixtures) + 1}", [home, away], number))
+            rotation = [rotation[0], rotation[-1]] + rotation[1:-1]
+    return fixtures
+
+
+def _seed_order(size: int) -> List[int]:
+    """Get the bracket slots of the seeds, so the best seeds meet last."""
+    order = [1]
+    while len(order) < size:
+        order = [seed for s in order for seed in (s, 2 * len(order) + 1 - s)]
+    return order
+
+
+def single_elimination(players: Iterable[Dict[str, Any]]) -> List[Fixture]:
+    """
+    Plan a single-elimination bracket.
+
+    Players are seeded in the given order. The bracket is padded to a power
+    of two with byes, given to the best seeds.
+
+    Parameters:
+    - players (Iterable[dict]): The players, best seed first.
+
+    Returns:
+    List[Fixture]: The fixtures, by round, the final last.
+    """
+    players = list(players)
+    size = 1
+    while size < max(len(players), 2):
+        size *= 2
+    seeded = [players[seed - 1] if seed <= len(players) else BYE for seed in _seed_order(size)]
+
+    fixtures = []
+    previous = [Fixture(f"R1-M{i + 1}", seeded[2 * i:2 * i + 2], 1) for i in range(size // 2)]
+    fixtures.extend(previous)
+    number = 1
+    while len(previous) > 1:
+        number += 1
+        previous = [
+            Fixture(f"R{number}-M{i + 1}", [None, None], number, previous[2 * i:2 * i + 2])
+            for i in range(len(previous) // 2)
+        ]
+        fixtures.extend(previous)
+    return fixtures
+
+
+class TournamentScheduler:
+    """
+    Play tournament fixtures on a pool of boards, as many at once as there are free boards.
+
+    A board is free when it is connected, according to its live state, and
+    not playing a match. Each fixture gets a lobby set up with both players on
+    its board, then its match is followed on its websocket; when it finishes,
+    its winner moves on to the fixtures waiting for it and the board takes the
+    next ready fixture at once. Everything runs as tasks of one event loop, woken
+    by websocket frames, and a match silent for poll_interval seconds is reloaded.
+    """
+
+    def __init__(self, session: AutoDartSession, boards: Iterable[CloudBoard], fixtures: Iterable[Fixture],
+                 variant: Any, settings: Any, bullOffMode: str = "Off", max_setups: int = 8, retries: int = 2,
+                 on_fixture: Optional[Callable[[Fixture], Any]] = None) -> None:
+        """
+        Initialize a TournamentScheduler instance.
+
+        Parameters:
+        - session (AutoDartSession): The session used for communication.
+        - boards (Iterable[CloudBoard]): The board pool.
+        - fixtures (Iterable[Fixture]): The plan, from round_robin or single_elimination.
+        - variant: The variant of the matches.
+        - settings: The settings of the matches.
+        - bullOffMode (str): The bull-off mode of the matches.
+        - max_setups (int): The maximum number of lobby setups in flight, to spread API bursts.
+        - retries (int): The number of setups retried before a fixture fails.
+        - on_fixture (Callable|None): Called with each finished or failed fixture, awaited if it is a coroutine function.
+
+        Returns:
+        None
+        """
+        self.session = session
+        self.boards: Dict[str, CloudBoard] = {board.id: board for board in boards}
+        self.fixtures = list(fixtures)
+        self.variant = variant
+        self.settings = settings
+        self.bullOffMode = bullOffMode
+        self.retries = retries
+        self.on_fixture = on_fixture
+        self.reconnect_delay = 5
+        self.poll_interval = 30
+        self._setups = asyncio.Semaphore(max_setups)
+        self._ready: deque = deque()
+        self._dependents: Dict[int, List[Fixture]] = {}
+        self._busy: Dict[str, Fixture] = {}
+        self._playing = set()
+        self._busy_time: Dict[str, float] = {board_id: 0.0 for board_id in self.boards}
+        self._own_matches = set()
+        self._tasks = set()
+        self._wakeup = asyncio.Event()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        for fixture in self.fixtures:
+            for source in fixture.sources:
+                if source is not None:
+                    self._dependents.setdefault(id(source), []).append(fixture)
+        for fixture in self.fixtures:
+            self._check_ready(fixture)
+
+    @property
+    def running(self) -> List[Fixture]:
+        """Get the fixtures being played."""
+        return list(self._busy.values())
+
+    def is_board_free(self, board: CloudBoard) -> bool:
+        """Check if a board can take a fixture, from its live state."""
+        if board.id in self._busy:
+            return False
+        if not board.state.get("connected", board.connected):
+            return False
+        # The match ID is only known from the REST data, so the ones played here are ignored.
+        return not board.match_id or board.match_id in self._own_matches
+
+    @staticmethod
+    def _player_key(player: Dict[str, Any]) -> Any:
+        return player.get("userId") or player.get("name")
+
+    def _next_fixture(self) -> Optional[Fixture]:
+        """Take the first ready fixture whose players are not playing elsewhere."""
+        for index, fixture in enumerate(self._ready):
+            if not any(self._player_key(player) in self._playing for player in fixture.players):
+                del self._ready[index]
+                return fixture
+        return None
+
+    def _check_ready(self, fixture: Fixture) -> None:
+        """Queue a ready fixture, or settle it at once when it's a bye."""
+        if not fixture.ready:
+            return
+        real = [player for player in fixture.players if player is not BYE]
+        if len(real) < len(fixture.players):
+            fixture.status = Fixture.FINISHED
+            fixture.winner = real[0] if real else BYE
+            self._advance(fixture)
+        else:
+            self._ready.append(fixture)
+
+    def _advance(self, fixture: Fixture) -> None:
+        """Move the winner of a settled fixture into the fixtures waiting for it."""
+        for dependent in self._dependents.get(id(fixture), []):
+            for slot, source in enumerate(dependent.sources):
+                if source is fixture:
+                    # The opponent of a failed fixture, or of one without a known winner, advances alone.
+                    dependent.players[slot] = fixture.winner if fixture.winner is not None else BYE
+            self._check_ready(dependent)
+
+    def _assign(self) -> None:
+        """Start the ready fixtures on the free boards."""
+        if not self._ready:
+            return
+        for board in self.boards.values():
+            if not self._ready:
+                break
+            if self.is_board_free(board):
+                fixture = self._next_fixture()
+                if fixture is None:
+                    break
+                self._busy[board.id] = fixture
+                self._playing.update(self._player_key(player) for player in fixture.players)
+                task = asyncio.create_task(self._async_play(fixture, board))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _async_play(self, fixture: Fixture, board: CloudBoard) -> None:
+        fixture.status = Fixture.RUNNING
+        fixture.board_id = board.id
+        fixture.attempts += 1
+        fixture.started_at = time.monotonic()
+        try:
+            try:
+                async with self._setups:
+                    players = [dict(player, boardId=board.id) for player in fixture.players]
+                    match = await Lobby.async_setup_match(self.session, self.variant, self.settings, players,
+                                                          bullOffMode=self.bullOffMode, connect=False)
+            except Exception as e:
+                # Nothing was started, the fixture can be set up again.
+                logger.warning(f"Setup of fixture {fixture.id} on board {board.id} failed: {e}")
+                fixture.status = Fixture.FAILED if fixture.attempts > self.retries else Fixture.PENDING
+            else:
+                fixture.match = match
+                self._own_matches.add(match.id)
+                try:
+                    await self._async_wait_finished(match)
+                except Exception as e:
+                    # The match is running, setting it up again would start a second one for the same players.
+                    logger.warning(f"Lost match {match.id} of fixture {fixture.id} on board {board.id}: {e}")
+                    fixture.status = Fixture.FAILED
+                else:
+                    fixture.status = Fixture.FINISHED
+                    winner = match.winner
+                    if isinstance(winner, int) and 0 <= winner < len(fixture.players):
+                        fixture.winner = fixture.players[winner]
+        finally:
+            fixture.finished_at = time.monotonic()
+            self._busy_time[board.id] += fixture.finished_at - fixture.started_at
+            del self._busy[board.id]
+            self._playing.difference_update(self._player_key(player) for player in fixture.players)
+
+        if fixture.status == Fixture.PENDING:
+            self._ready.append(fixture)
+        else:
+            self._advance(fixture)
+            await self._notify(fixture)
+        self._wakeup.set()
+
+    async def _async_wait_finished(self, match: Match) -> None:
+        """
+        Follow a match on its websocket until it finishes, reconnecting if the connection ends.
+
+        The match is reloaded when it is silent for poll_interval seconds, as
+        it may have finished before the subscription. Failed reloads are
+        retried, up to retries times in a row.
+        """
+        changed = asyncio.Event()
+        unregister_state = match.register_callback(lambda state: changed.set())
+        unregister_ended = match.register_callback(lambda data: changed.set(), "task_ended", topic="events")
+        leave = match.connect()
+        failures = 0
+        try:
+            while not match.finished:
+                try:
+                    await asyncio.wait_for(changed.wait(), self.poll_interval)
+                    silent = False
+                except asyncio.TimeoutError:
+                    silent = True
+                changed.clear()
+                if match.finished or (match.is_connected and not silent):
+                    continue
+                if not match.is_connected:
+                    await asyncio.sleep(self.reconnect_delay)
+                try:
+                    # Frames were missed while disconnected or before subscribing.
+                    await match.async_load_data()
+                except Exception as e:
+                    failures += 1
+                    if failures > self.retries:
+                        raise
+                    logger.warning(f"Can't reload match {match.id}, retrying: {e}")
+                    changed.set()
+                    continue
+                failures = 0
+                if not match.finished and not match.is_connected:
+                    leave()
+                    leave = match.connect()
+        finally:
+            unregister_state()
+            unregister_ended()
+            leave()
+
+    async def _notify(self, fixture: Fixture) -> None:
+        if self.on_fixture is None:
+            return
+        try:
+            if asyncio.iscoroutinefunction(self.on_fixture):
+                await self.on_fixture(fixture)
+            else:
+                self.on_fixture(fixture)
+        except Exception as e:
+            logger.warning(f"Fixture callback failed for {fixture.id}: {e}")
+
+    async def async_run(self) -> List[Fixture]:
+        """
+        Play every fixture.
+
+        The boards are connected for the run, their state frames waking the
+        scheduler when one becomes free.
+
+        Returns:
+        List[Fixture]: The fixtures, finished or failed.
+        """
+        self.started_at = time.monotonic()
+        unregisters = []
+        for board in self.boards.values():
+            unregisters.append(board.register_callback(lambda state: self._wakeup.set()))
+            board.connect()
+        try:
+            while not all(fixture.done for fixture in self.fixtures):
+                self._assign()
+                if not self._busy and self._ready and not any(self.is_board_free(b) for b in self.boards.values()):
+                    logger.info("No free board, waiting for a board state change")
+                await self._wakeup.wait()
+                self._wakeup.clear()
+        finally:
+            for task in list(self._tasks):
+                task.cancel()
+            for unregister in unregisters:
+                unregister()
+            for board in self.boards.values():
+                board.disconnect()
+            self.finished_at = time.monotonic()
+        return self.fixtures
+
+    def utilization(self) -> Dict[str, float]:
+        """
+        Get the share of the run time each board spent playing.
+
+        Returns:
+        Dict[str, float]: Per board ID, the busy fraction, and the pool average under "total".
+        """
+        if self.started_at is None:
+            return {}
+        now = time.monotonic()
+        elapsed = (self.finished_at or now) - self.started_at
+        busy = dict(self._busy_time)
+        for board_id, fixture in self._busy.items():
+            busy[board_id] += now - fixture.started_at
+        result = {board_id: (seconds / elapsed if elapsed else 0.0) for board_id, seconds in busy.items()}
+        result["total"] = sum(result.values()) / len(busy) if busy else 0.0
+        return result
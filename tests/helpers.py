@@ -0,0 +1,21 @@
+import asyncio
+import time
+
+from autodarts import AutoDartSession, CloudBoard
+from autodarts.testing import FakeAutodartsServer
+
+
+async def wait_until(predicate, timeout: float = 5.0) -> None:
+    """Wait for predicate() to be true, failing the test after timeout seconds."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+async def new_board(server: FakeAutodartsServer, session: AutoDartSession = None):
+    """Get a new board of the server, and a session, before any connect()."""
+    session = session or AutoDartSession(**server.session_kwargs())
+    board = await CloudBoard.from_id(session, server.add_board()["id"])
+    return session, board
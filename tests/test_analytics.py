@@ -0,0 +1,73 @@
+import asyncio
+import pickle
+
+from autodarts.analytics import HEATMAP_BINS, AnalyticsExecutor, MatchBatch, analyse_batch
+from autodarts.segments import target_point
+
+
+def throw(name):
+    x, y = target_point(name)
+    return {"segment": {"name": name}, "coords": {"x": x, "y": y}}
+
+
+STATE = {
+    "id": "m1",
+    "finished": True,
+    "players": [{"id": "p1"}, {"id": "p2"}],
+    "turns": [
+        {"playerId": "p1", "points": 180, "throws": [throw("T20"), throw("T20"), throw("T20")]},
+        {"playerId": "p2", "points": 26, "throws": [throw("S20"), throw("S1"), throw("S5")]},
+        {"playerId": "p1", "points": 0, "busted": True, "throws": [throw("T19"), {"segment": {"name": "S1"}}]},
+        {"playerId": "unknown", "points": 60, "throws": [throw("T20")]},
+    ],
+}
+
+
+class FakeMatch:
+    id = "m1"
+
+    def __init__(self):
+        self.callbacks = []
+
+    def register_callback(self, callback):
+        self.callbacks.append(callback)
+        return lambda: self.callbacks.remove(callback)
+
+
+def test_match_batch_encoding_survives_pickling():
+    batch = pickle.loads(pickle.dumps(MatchBatch.from_state(STATE)))
+    assert batch.match_id == "m1" and batch.players == ["p1", "p2"]
+    assert list(batch.throw_player) == [0, 0, 0, 1, 1, 1, 0, 0, 255]
+    assert list(batch.turn_player) == [0, 1, 0, 255]
+    assert len(batch.throw_x) == 9 * 4 and len(batch.turn_points) == 4 * 2
+    assert analyse_batch(batch) == analyse_batch(MatchBatch.from_state(STATE))
+
+
+def test_analyse_batch():
+    result = analyse_batch(MatchBatch.from_state(STATE))
+    assert result["match_id"] == "m1"
+    p1, p2 = result["players"]["p1"], result["players"]["p2"]
+    # The throw without coords is not classified.
+    assert (p1["darts"], p1["points"], p1["segments"]) == (4, 237, {"T20": 3, "T19": 1})
+    assert (p1["turns"], p1["turn_points"], p1["max_turn"], p1["180"], p1["average"]) == (2, 180, 180, 1, 90.0)
+    assert (p2["darts"], p2["points"], p2["average"]) == (3, 26, 26.0)
+    assert p2["segments"] == {"S20": 1, "S1": 1, "S5": 1}
+    assert sum(p1["heatmap"]) == 4 and len(p1["heatmap"]) == HEATMAP_BINS ** 2
+
+
+def test_close_cancels_the_waiting_analyses():
+    async def main():
+        executor = AnalyticsExecutor(max_workers=1, max_pending=1)
+        results = []
+        match = FakeMatch()
+        executor.attach(match, results.append)
+        # Hold the only slot, so the analysis waits for it.
+        await executor._semaphore.acquire()
+        match.callbacks[0](STATE)
+        assert not match.callbacks and len(executor._tasks) == 1
+        task = next(iter(executor._tasks))
+        executor.close()
+        await asyncio.sleep(0)
+        assert task.cancelled() and not executor._tasks and not results
+
+    asyncio.run(main())
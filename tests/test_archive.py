@@ -0,0 +1,82 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from autodarts import AutoDartException, EventArchive
+from autodarts.testing import FakeAutodartsServer
+
+from helpers import new_board, wait_until
+
+
+def test_archive_records_the_event_of_each_state_frame(tmp_path):
+    async def main():
+        async with FakeAutodartsServer(autoplay=False) as server:
+            session, board = await new_board(server)
+            archive = EventArchive(str(tmp_path / "archive.db"), flush_interval=0.01)
+            archive.start()
+            detach = archive.attach(board)
+            board.connect()
+            await wait_until(lambda: server.subscriber_count("autodarts.boards") == 2)
+            for event in ("Started", "Throw detected", "Takeout started"):
+                await server.publish_board(board.id, event=event)
+            await wait_until(lambda: board.ws_data.get("event") == "Takeout started")
+
+            # A state payload older than ws_data, as replayed or buffered ones are.
+            older = dict(board._state, state=dict(board.ws_data, event="Throw detected"))
+            assert board.frame_data(older)["event"] == "Throw detected"
+
+            detach()
+            await archive.async_close()
+            await session.async_close()
+
+    asyncio.run(main())
+    with sqlite3.connect(tmp_path / "archive.db") as db:
+        events = [row[0] for row in db.execute("SELECT event FROM events ORDER BY id")]
+    assert events[-3:] == ["Started", "Throw detected", "Takeout started"]
+
+
+def test_archive_deletes_undone_throws(tmp_path):
+    def turn(id, *names):
+        return {"id": id, "playerId": "p1", "round": 1, "throws": [{"segment": {"name": name}} for name in names]}
+
+    def state(*turns):
+        return {"id": "m1", "set": 1, "leg": 1, "players": [{"id": "p1"}], "turns": list(turns)}
+
+    archive = EventArchive(str(tmp_path / "archive.db"), flush_interval=0.01)
+    archive.start()
+    frames = [
+        state(turn("t0", "T20", "S1")),
+        state(turn("t0", "T20")),
+        state(turn("t0", "T20", "T19")),
+        state(turn("t0", "T20", "T19", "S5"), turn("t1", "D16")),
+        # Undo into the previous turn: t1 is removed.
+        state(turn("t0", "T20", "T19", "S5")),
+    ]
+    # All in one batch, so the deletes must run between the inserts.
+    for frame in frames:
+        for kind, row in archive.match_rows(frame):
+            archive.put(kind, row)
+    archive.close()
+
+    with sqlite3.connect(tmp_path / "archive.db") as db:
+        throws = list(db.execute("SELECT turn_id, idx, segment FROM throws ORDER BY turn_id, idx"))
+        turns = [row[0] for row in db.execute("SELECT id FROM turns")]
+    assert throws == [("t0", 0, "T20"), ("t0", 1, "T19"), ("t0", 2, "S5")]
+    assert turns == ["t0"]
+
+
+def test_archive_rejects_unknown_kinds_and_survives_bad_rows(tmp_path):
+    archive = EventArchive(str(tmp_path / "archive.db"), flush_interval=0.01)
+    archive.start()
+    with pytest.raises(AutoDartException):
+        archive.put("unknown", ())
+    # A row of the wrong length fails its batch only.
+    archive.put("event", ("board-1", "Started"))
+    time.sleep(0.1)
+    assert archive.thread.is_alive()
+    archive.put("event", ("board-1", "Stopped", 1.0, "{}"))
+    archive.close()
+    with sqlite3.connect(tmp_path / "archive.db") as db:
+        assert [row[0] for row in db.execute("SELECT event FROM events")] == ["Stopped"]
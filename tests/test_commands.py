@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from autodarts import AutoDartException
+from autodarts.commands import BoardCommand, BoardCommandQueue
+from autodarts.testing import FakeAutodartsServer
+
+from helpers import new_board, wait_until
+
+
+def test_commands_resolve_on_the_event_of_their_frame():
+    async def main():
+        async with FakeAutodartsServer(autoplay=False) as server:
+            session, board = await new_board(server)
+            board.connect()
+            await wait_until(lambda: server.subscriber_count("autodarts.boards") == 2)
+            board.commands.window = 0
+            assert await board.commands.async_start() == "start"
+            assert board.ws_data["event"] == "Started"
+            assert await board.commands.async_stop() == "stop"
+            assert board.ws_data["event"] == "Stopped"
+            board.commands.close()
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+class Response:
+    ok = True
+    status = 200
+
+
+class FakeBoard:
+    """Board whose commands are confirmed by confirm(), or at once with autoconfirm."""
+
+    id = "board-1"
+    is_connected = True
+
+    def __init__(self, autoconfirm=True):
+        self.autoconfirm = autoconfirm
+        self.callbacks = {}
+        self.sent = []
+
+    def register_callback(self, cb, event):
+        self.callbacks[event] = cb
+        return lambda: self.callbacks.pop(event, None)
+
+    def confirm(self, name):
+        event = BoardCommand.EVENTS[name]
+        self.callbacks[event]({"event": event})
+
+    async def _command(self, name):
+        self.sent.append(name)
+        if self.autoconfirm:
+            asyncio.get_running_loop().call_soon(self.confirm, name)
+        return Response()
+
+    async def async_start(self):
+        return await self._command("start")
+
+    async def async_stop(self):
+        return await self._command("stop")
+
+    async def async_reset(self):
+        return await self._command("reset")
+
+
+def test_repeated_resets_collapse():
+    async def main():
+        board = FakeBoard()
+        queue = BoardCommandQueue(board, window=0.02)
+        results = await asyncio.gather(*(queue.submit("reset") for _ in range(3)))
+        assert results == ["reset"] * 3
+        assert board.sent == ["reset"] and (queue.sent, queue.collapsed) == (1, 2)
+        queue.close()
+
+    asyncio.run(main())
+
+
+def test_stop_replaces_a_start_in_the_window():
+    async def main():
+        board = FakeBoard()
+        queue = BoardCommandQueue(board, window=0.02)
+        start, stop = queue.submit("start"), queue.submit("stop")
+        assert await asyncio.gather(start, stop) == ["stop", "stop"]
+        assert board.sent == ["stop"] and queue.collapsed == 1
+        queue.close()
+
+    asyncio.run(main())
+
+
+def test_burst_is_collapsed():
+    async def main():
+        board = FakeBoard()
+        queue = BoardCommandQueue(board, window=0.02)
+        waiters = [queue.submit(name) for name in ("start", "stop", "start", "start", "reset", "reset")]
+        assert await asyncio.gather(*waiters) == ["start"] * 4 + ["reset"] * 2
+        assert board.sent == ["start", "reset"] and (queue.sent, queue.collapsed) == (2, 4)
+        queue.close()
+
+    asyncio.run(main())
+
+
+def test_command_joins_the_unconfirmed_one_in_flight():
+    async def main():
+        board = FakeBoard(autoconfirm=False)
+        queue = BoardCommandQueue(board)
+        first = queue.submit("start")
+        await wait_until(lambda: board.sent)
+        second = queue.submit("start")
+        assert queue.pending == ["start"] and queue.collapsed == 1
+        board.confirm("start")
+        assert await asyncio.gather(first, second) == ["start", "start"]
+        assert board.sent == ["start"]
+
+        # Once confirmed, the same command is sent again.
+        third = queue.submit("start")
+        await wait_until(lambda: len(board.sent) == 2)
+        board.confirm("start")
+        assert await third == "start"
+        queue.close()
+
+    asyncio.run(main())
+
+
+def test_unconfirmed_command_fails_after_the_timeout():
+    async def main():
+        board = FakeBoard(autoconfirm=False)
+        queue = BoardCommandQueue(board, timeout=0.05)
+        with pytest.raises(AutoDartException, match="No Stopped event"):
+            await queue.async_stop()
+        assert queue.pending == []
+        # The queue goes on with the next command.
+        board.autoconfirm = True
+        assert await queue.async_reset() == "reset"
+        queue.close()
+
+    asyncio.run(main())
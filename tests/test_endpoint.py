@@ -0,0 +1,96 @@
+import asyncio
+
+from autodarts.testing import FakeAutodartsServer
+
+from helpers import new_board, wait_until
+
+
+def test_shared_connection_refcount():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, board = await new_board(server)
+            frames = []
+
+            async def on_state(data):
+                frames.append(data)
+
+            board.connect()
+            leave = board.connect(None, on_state)
+            await wait_until(lambda: server.subscriber_count("autodarts.boards") == 2)
+            assert board.subscribers == 2
+
+            # The plain subscriber leaving keeps the raw frame callbacks of the other one.
+            board.disconnect()
+            assert board.subscribers == 1
+            await server.publish_board(board.id, status="Throw")
+            await wait_until(lambda: frames)
+            assert frames[-1]["status"] == "Throw"
+
+            # Nothing left to remove: no effect.
+            board.disconnect()
+            board.disconnect(None, lambda data: None)
+            assert board.subscribers == 1 and board.task is not None
+
+            leave()
+            leave()
+            assert board.subscribers == 0 and board.task is None
+            await wait_until(lambda: server.subscriber_count("autodarts.boards") == 0)
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+def test_disconnect_removes_matching_callbacks():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, board = await new_board(server)
+
+            async def first(data):
+                pass
+
+            async def second(data):
+                pass
+
+            board.connect(None, first)
+            board.connect(None, second)
+            board.disconnect(None, first)
+            assert board._subscribers == [(None, second)]
+            board.disconnect(None, first)
+            assert board._subscribers == [(None, second)]
+            board.disconnect(None, second)
+            assert board.task is None
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+def test_silent_connection_is_recycled():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, board = await new_board(server)
+            board.heartbeat_interval = 0.05
+            board.stale_timeout = 0.2
+            events = []
+            board.register_callback(lambda data: events.append(data["event"]), "stale", topic="events")
+            board.connect()
+            await wait_until(lambda: server.subscriber_count("autodarts.boards") == 2)
+            await wait_until(lambda: board.health.pongs_received)
+            assert board.is_connected and board.health.rtt is not None
+
+            server.answer_pings = False
+            await wait_until(lambda: board.health.reconnects)
+            assert events[0] == "stale"
+
+            # Answered again, the new connection stays up and receives frames.
+            pongs, reconnects = board.health.pongs_received, board.health.reconnects
+            server.answer_pings = True
+            # The server reads the subscriptions of the new connection before its pings.
+            await wait_until(lambda: board.health.pongs_received > pongs)
+            await server.publish_board(board.id, status="Throw")
+            await wait_until(lambda: board.ws_data.get("status") == "Throw")
+            await asyncio.sleep(0.3)
+            assert board.health.reconnects == reconnects and board.is_connected
+            board.disconnect()
+            await session.async_close()
+
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from autodarts.heatmap import HeatmapAccumulator
+
+
+class FakeMatch:
+
+    def __init__(self):
+        self.callbacks = []
+
+    def register_callback(self, callback):
+        self.callbacks.append(callback)
+        return lambda: self.callbacks.remove(callback)
+
+    def publish(self, *turns):
+        state = {"players": [{"id": "p1", "boardId": "b1"}], "turns": [dict(turn) for turn in turns]}
+        for callback in self.callbacks:
+            callback(state)
+
+
+def turn(key, *coords):
+    return {"id": key, "playerId": "p1", "throws": [{"coords": {"x": x, "y": y}} for x, y in coords]}
+
+
+def test_undone_throws_leave_the_heatmap():
+    accumulator = HeatmapAccumulator(bins=8)
+    match = FakeMatch()
+    accumulator.attach(match)
+    match.publish(turn("t0", (0.1, 0.1)))
+    match.publish(turn("t0"))
+    match.publish(turn("t0", (0.5, -0.5)))
+    heatmap = accumulator.heatmaps["p1", "b1"]
+    assert heatmap.total == 1
+    assert heatmap.counts.sum() == 1
+
+    # Undoing into the previous turn removes the whole last turn.
+    match.publish(turn("t0", (0.5, -0.5), (2.0, 2.0)), turn("t1", (0.0, 0.0)))
+    assert heatmap.total == 3
+    match.publish(turn("t0", (0.5, -0.5), (2.0, 2.0)))
+    assert heatmap.total == 2
+    assert heatmap.outside == 1
+    match.publish(turn("t0", (0.5, -0.5)))
+    assert heatmap.total == 1
+    assert heatmap.outside == 0
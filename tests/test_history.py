@@ -0,0 +1,98 @@
+import asyncio
+
+from autodarts.history import EventHistory
+from autodarts.testing import FakeAutodartsServer
+
+from helpers import new_board, wait_until
+
+
+def test_history_ring_buffer_and_patterns():
+    history = EventHistory(3)
+    for index, event in enumerate(["Throw detected", "Takeout started", "Throw detected", "Takeout finished"]):
+        history.append("state", {"event": event}, ts=index)
+    assert len(history) == 3
+    assert [record.ts for record in history] == [1, 2, 3]
+    assert [record.event for record in history.between(event="Takeout*")] == ["Takeout started", "Takeout finished"]
+    assert [record.ts for record in history.between(start=2, event="Throw detected")] == [2]
+
+
+async def _board_with_frames(server, statuses):
+    session, board = await new_board(server)
+    board.enable_history(64)
+    board.connect()
+    await wait_until(lambda: server.subscriber_count("autodarts.boards") == 2)
+    for status in statuses:
+        await server.publish_board(board.id, status=status, event="Throw detected" if status != "Takeout" else "Takeout")
+    await wait_until(lambda: board.ws_data.get("status") == statuses[-1])
+    return session, board
+
+
+def test_sync_replay_has_live_payload_shape():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, board = await _board_with_frames(server, ["s0", "Takeout", "s2"])
+            received = []
+            board.register_callback(lambda state: received.append(state), replay_since=0)
+            # Like live state callbacks, the whole state of the board, as it was then.
+            assert all(payload["id"] == board.id for payload in received)
+            assert [payload["state"]["status"] for payload in received] == ["s0", "Takeout", "s2"]
+
+            throws = []
+            board.register_callback(lambda state: throws.append(state["state"]["status"]), "Throw*", replay_since=0)
+            assert throws == ["s0", "s2"]
+
+            await server.publish_board(board.id, status="s3", event="Throw detected")
+            await wait_until(lambda: len(received) == 4)
+            assert received[-1] is board._state and throws == ["s0", "s2", "s3"]
+            board.disconnect()
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+def test_async_replay_comes_before_live_frames():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, board = await _board_with_frames(server, ["s0", "s1", "s2"])
+            received = []
+
+            async def slow(state):
+                received.append(state["state"]["status"])
+                await asyncio.sleep(0.05)
+
+            board.register_async_callback(slow, replay_since=0)
+            assert len(board._replays) == 1
+            for status in ["s3", "s4"]:
+                await server.publish_board(board.id, status=status)
+            await wait_until(lambda: len(received) == 5)
+            await server.publish_board(board.id, status="s5")
+            await wait_until(lambda: len(received) == 6)
+            assert received == ["s0", "s1", "s2", "s3", "s4", "s5"]
+            await wait_until(lambda: not board._replays)
+            board.disconnect()
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+def test_async_replay_unregistered_while_replaying():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, board = await _board_with_frames(server, ["s0", "s1"])
+            received = []
+
+            async def slow(state):
+                received.append(state["state"]["status"])
+                await asyncio.sleep(0.05)
+
+            unregister = board.register_async_callback(slow, replay_since=0)
+            await wait_until(lambda: received)
+            unregister()
+            await server.publish_board(board.id, status="s2")
+            await asyncio.sleep(0.2)
+            assert received == ["s0"]
+            assert board.callbacks.count("state") == 0
+            board.disconnect()
+            await session.async_close()
+
+    asyncio.run(main())
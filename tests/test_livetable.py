@@ -0,0 +1,83 @@
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from autodarts.livetable import (HEADER_SIZE, ROW_SIZE, _SEQ, AutoDartLiveTableException, LiveStateReader,
+                                 LiveStateTable)
+
+
+def _write_rows(path, ready, stop):
+    table = LiveStateTable(rows=4, path=path)
+    ready.set()
+    i = 0
+    while not stop.is_set():
+        # Every field of a row is derived from i, so a torn row is visible.
+        table.update(f"match-{i % 4}", "match", round=i % 65536, throws=i % 256, scores=[i % 65536] * 8)
+        i += 1
+    table.close(unlink=False)
+
+
+def _check(rows):
+    for row in rows:
+        if row["kind"]:
+            assert (row["scores"] == row["round"]).all() and row["throws"] == row["round"] % 256
+            assert not row["seq"] & 1
+
+
+def test_snapshot_waits_for_the_row_being_written(tmp_path):
+    with LiveStateTable(rows=2, path=str(tmp_path / "live.tbl")) as table:
+        row = slice(HEADER_SIZE + _SEQ.size, HEADER_SIZE + ROW_SIZE)
+        table.update("board-1", "board", status="Throw", throws=1)
+        old = bytes(table.buf[row])
+        table.update("board-1", "board", status="Takeout", throws=2)
+        new = bytes(table.buf[row])
+        seq = _SEQ.unpack_from(table.buf, HEADER_SIZE)[0]
+
+        def finish():
+            table.buf[row] = new
+            _SEQ.pack_into(table.buf, HEADER_SIZE, seq + 2)
+
+        with LiveStateReader(table.path, timeout=1) as reader:
+            # The writer is in the middle of the row: odd sequence, old fields.
+            _SEQ.pack_into(table.buf, HEADER_SIZE, seq + 1)
+            table.buf[row] = old
+            writer = threading.Timer(0.05, finish)
+            writer.start()
+            snapshot = reader.snapshot()
+            writer.join()
+            assert snapshot[0]["throws"] == 2 and snapshot[0]["seq"] == seq + 2
+            del snapshot
+
+            _SEQ.pack_into(table.buf, HEADER_SIZE, seq + 3)
+            reader.timeout = 0.05
+            with pytest.raises(AutoDartLiveTableException):
+                reader.snapshot()
+            _SEQ.pack_into(table.buf, HEADER_SIZE, seq + 4)
+
+
+def test_snapshots_are_consistent_while_another_process_writes(tmp_path):
+    path = str(tmp_path / "live.tbl")
+    context = multiprocessing.get_context("spawn")
+    ready, stop = context.Event(), context.Event()
+    writer = context.Process(target=_write_rows, args=(path, ready, stop), daemon=True)
+    writer.start()
+    try:
+        assert ready.wait(30)
+        with LiveStateReader(path, timeout=1) as reader:
+            deadline = time.monotonic() + 1
+            snapshots = 0
+            while time.monotonic() < deadline:
+                snapshot = reader.snapshot()
+                _check(snapshot)
+                snapshots += 1
+                del snapshot
+                for fields in reader:
+                    assert fields["scores"] == [fields["round"]] * 8
+            assert snapshots
+    finally:
+        stop.set()
+        writer.join(10)
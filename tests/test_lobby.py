@@ -0,0 +1,61 @@
+import asyncio
+
+from autodarts import AutoDartSession, Lobby, Match
+from autodarts.testing import FakeAutodartsServer
+
+from helpers import wait_until
+
+SETTINGS = {"baseScore": 101, "inMode": "Straight", "outMode": "Straight"}
+NAMES = ["ann", "bob", "cid", "dan"]
+
+
+async def _setup(server, session):
+    board = server.add_board()
+    players = [{"name": name, "boardId": board["id"]} for name in NAMES]
+    return await Lobby.async_setup_match(session, "X01", SETTINGS, players)
+
+
+def test_setup_match_returns_the_connected_match():
+    async def main():
+        async with FakeAutodartsServer(autoplay=False) as server:
+            session = AutoDartSession(**server.session_kwargs())
+            match = await _setup(server, session)
+            assert isinstance(match, Match) and match.id in server.matches
+            assert [player["name"] for player in server.matches[match.id]["players"]] == NAMES
+            assert not server.lobbies
+            await wait_until(lambda: server.subscriber_count("autodarts.matches") == 2)
+            match.disconnect()
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+def test_players_added_out_of_order_are_put_back_in_order():
+    async def main():
+        async with FakeAutodartsServer(autoplay=False) as server:
+            session = AutoDartSession(**server.session_kwargs())
+            post = session.post
+
+            async def late_first_player(url, **kwargs):
+                # The first player reaches the server last.
+                if (kwargs.get("json") or {}).get("name") == NAMES[0]:
+                    await asyncio.sleep(0.05)
+                return await post(url, **kwargs)
+
+            session.post = late_first_player
+            delete, deleted = session.delete, []
+
+            async def recorded_delete(url, **kwargs):
+                deleted.append(url.rsplit("/", 1)[-1])
+                return await delete(url, **kwargs)
+
+            session.delete = recorded_delete
+            match = await _setup(server, session)
+            # All of them were misplaced, removed from the end.
+            assert deleted == ["3", "2", "1", "0"]
+            assert [player["name"] for player in server.matches[match.id]["players"]] == NAMES
+            assert [player["index"] for player in server.matches[match.id]["players"]] == [0, 1, 2, 3]
+            match.disconnect()
+            await session.async_close()
+
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+import asyncio
+import inspect
+
+import pytest
+
+from autodarts.endpoint import AutoDartEndpointWs
+from autodarts.match import Match
+
+
+class Response:
+    ok = True
+    status = 200
+
+
+async def sent():
+    return Response()
+
+
+def entity():
+    entity = AutoDartEndpointWs({"id": "board-1", "state": {"running": False, "numThrows": 0}}, None,
+                                "boards/", "autodarts.boards")
+    entity.optimistic = True
+    entity.optimistic_timeout = 0.05
+    ops = []
+    entity.register_pending_callback(lambda op: ops.append(op.status))
+    return entity, ops
+
+
+def test_custom_confirm_waits_for_the_confirming_frame():
+    async def main():
+        board, ops = entity()
+        await board.async_optimistic("throw", sent(), {"numThrows": 1}, lambda frame: frame.get("numThrows") == 1)
+        await board.on_state_message({"event": "Takeout finished", "numThrows": 0})
+        assert ops == ["pending"]
+        await board.on_state_message({"event": "Throw detected", "numThrows": 1})
+        assert ops == ["pending", "confirmed"] and not board.pending
+
+    asyncio.run(main())
+
+
+def test_unconfirmed_operations_are_withdrawn_after_the_timeout():
+    async def main():
+        board, ops = entity()
+        await board.async_optimistic("start", sent(), {"running": True})
+        await board.async_optimistic("undo", sent())
+        assert board.ws_data["running"] is True
+        # Without changes nor confirm, no frame tells.
+        await board.on_state_message({"event": "Throw detected", "numThrows": 1})
+        assert ops == ["pending", "pending"]
+        await asyncio.sleep(0.1)
+        assert ops == ["pending", "pending", "unconfirmed", "unconfirmed"]
+        assert board.ws_data["running"] is False and not board.pending
+
+    asyncio.run(main())
+
+
+def test_contradicting_frame_rolls_back():
+    async def main():
+        board, ops = entity()
+        await board.async_optimistic("start", sent(), {"running": True})
+        await board.on_state_message({"event": "Stopped", "running": False})
+        assert ops == ["pending", "rolled_back"]
+        await asyncio.sleep(0.1)
+        assert ops == ["pending", "rolled_back"]
+
+    asyncio.run(main())
+
+
+def test_failing_changes_close_the_request():
+    async def main():
+        board, ops = entity()
+        request = sent()
+
+        def changes(state):
+            raise KeyError("turns")
+
+        with pytest.raises(KeyError):
+            await board.async_optimistic("throw", request, changes)
+        assert inspect.getcoroutinestate(request) == inspect.CORO_CLOSED
+        assert not ops and not board.pending
+
+    asyncio.run(main())
+
+
+def test_optimistic_undo_drops_the_last_throw():
+    class Session:
+        def post(self, url, **kwargs):
+            return sent()
+
+    def turns(*counts):
+        return [{"id": f"t{index}", "throws": [{"segment": {"name": "S1"}}] * count}
+                for index, count in enumerate(counts)]
+
+    async def main():
+        match = Match({"id": "match-1", "turns": turns(3, 1)}, Session())
+        match.optimistic = True
+        match.optimistic_timeout = 0.05
+        ops = []
+        match.register_pending_callback(lambda op: ops.append(op.status))
+
+        await match.async_undo()
+        assert match.ws_data["turns"] == turns(3, 0)
+        await match.on_state_message({"id": "match-1", "turns": turns(3, 0)})
+        assert ops == ["pending", "confirmed"]
+
+        # An empty last turn: undo goes back into the previous one.
+        await match.async_undo()
+        assert match.ws_data["turns"] == turns(2)
+        await asyncio.sleep(0.1)
+        assert ops[-1] == "unconfirmed"
+        assert match.ws_data["turns"] == turns(3, 0)
+
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from autodarts import FrameProfiler
+from autodarts.callbacks import CallbackRegistry
+
+from autodarts.testing import FakeAutodartsServer
+
+from helpers import new_board, wait_until
+
+
+def test_registry_times_each_callback_only_with_a_timer():
+    async def main():
+        registry = CallbackRegistry(("state",))
+        calls, timings = [], []
+        registry.register(calls.append)
+        await registry.dispatch("state", "Throw detected", 1)
+        await registry.dispatch("state", "Throw detected", 2, lambda *timing: timings.append(timing))
+        assert calls == [1, 2]
+        assert [(stage, cb) for stage, cb, _ in timings] == [("callback", calls.append)]
+
+    asyncio.run(main())
+
+
+def test_profiler_times_the_frame_path_of_the_entity():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, board = await new_board(server)
+            profiler = FrameProfiler(threshold=0.001, lag_interval=0, log=False).attach(board)
+            slow_calls, frames = [], []
+
+            def slow(state):
+                sum(range(100000))
+                slow_calls.append(state)
+
+            async def on_state(data):
+                frames.append(data)
+
+            board.register_callback(slow, "Throw detected")
+            board.connect(on_state_cb=on_state)
+            await wait_until(lambda: server.subscriber_count("autodarts.boards") == 2)
+            await server.publish_board(board.id, event="Throw detected", numThrows=1)
+            await wait_until(lambda: slow_calls and frames)
+
+            report = profiler.report()
+            assert report["frames"] >= 1
+            assert {"decode", "route", "merge", "callback", "frame_callback"} <= set(report["stages"])
+            assert any(name.endswith("slow") for name in report["callbacks"])
+            assert any(record.event == "Throw detected" and record.callback.endswith("slow")
+                       for record in profiler.slow)
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+def test_frame_path_does_not_read_the_clock_without_profiler(monkeypatch):
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, board = await new_board(server)
+            frames = []
+            board.register_callback(frames.append)
+            board.connect()
+            await wait_until(lambda: server.subscriber_count("autodarts.boards") == 2)
+
+            def perf_counter():
+                raise AssertionError("clock read without profiler")
+
+            monkeypatch.setattr(time, "perf_counter", perf_counter)
+            await server.publish_board(board.id, event="Throw detected", numThrows=1)
+            await wait_until(lambda: frames)
+            monkeypatch.undo()
+            await session.async_close()
+
+    asyncio.run(main())
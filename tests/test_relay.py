@@ -0,0 +1,72 @@
+import asyncio
+
+import aiohttp
+
+from autodarts.relay import RelayServer
+from autodarts.testing import FakeAutodartsServer
+
+from helpers import new_board, wait_until
+
+
+def subscribe(board_id: str, kind: str = "state", type: str = "subscribe") -> dict:
+    return {"type": type, "channel": "autodarts.boards", "topic": f"{board_id}.{kind}"}
+
+
+def test_relay_shares_one_upstream_subscription():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, board = await new_board(server)
+            async with RelayServer(session) as relay, aiohttp.ClientSession() as http:
+                clients = [await http.ws_connect(relay.ws_url) for _ in range(3)]
+                for ws in clients:
+                    await ws.send_json(subscribe(board.id))
+                await wait_until(lambda: server.subscriber_count("autodarts.boards") == 2)
+                assert len(relay.upstreams) == 1 and board.subscribers == 1
+
+                # A plain subscriber of the same entity doesn't take the relay one down.
+                board.connect()
+                board.disconnect()
+                assert board.subscribers == 1
+
+                await server.publish_board(board.id, status="Throw")
+                for ws in clients:
+                    frame = await asyncio.wait_for(ws.receive_json(), 5)
+                    while frame["data"].get("status") != "Throw":
+                        frame = await asyncio.wait_for(ws.receive_json(), 5)
+                    assert frame["topic"] == f"{board.id}.state"
+
+                for ws in clients:
+                    await ws.send_json(subscribe(board.id, type="unsubscribe"))
+                await wait_until(lambda: not relay.upstreams)
+                assert board.subscribers == 0
+                for ws in clients:
+                    await ws.close()
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+def test_relay_evicts_slow_consumer():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, board = await new_board(server)
+            async with RelayServer(session, max_queue=4) as relay, aiohttp.ClientSession() as http:
+                slow = await http.ws_connect(relay.ws_url)
+                await slow.send_json(subscribe(board.id))
+                await wait_until(lambda: relay.upstreams and board.ws is not None)
+                blob = "x" * 200000
+                for index in range(40):
+                    await server.publish_board(board.id, status=f"s{index}", blob=blob)
+                    if relay.counters["evicted"]:
+                        break
+                await wait_until(lambda: relay.counters["evicted"] == 1)
+                assert not relay.clients and not relay.upstreams
+
+                msg = await asyncio.wait_for(slow.receive(), 5)
+                while msg.type == aiohttp.WSMsgType.TEXT:
+                    msg = await asyncio.wait_for(slow.receive(), 5)
+                assert msg.type == aiohttp.WSMsgType.CLOSE
+                assert msg.data == aiohttp.WSCloseCode.POLICY_VIOLATION
+            await session.async_close()
+
+    asyncio.run(main())
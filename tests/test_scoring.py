@@ -0,0 +1,91 @@
+from autodarts.match import ThrowCursor
+from autodarts.scoring import X01Scorer
+
+PLAYERS = [{"id": "p1"}, {"id": "p2"}]
+
+
+def dart(number, multiplier=1):
+    return {"segment": {"number": number, "multiplier": multiplier}}
+
+
+def state(*turns, out_mode="Double"):
+    return {
+        "settings": {"baseScore": 101, "inMode": "Straight", "outMode": out_mode},
+        "players": PLAYERS,
+        "set": 1,
+        "leg": 1,
+        "turns": [{"id": f"t{i}", "playerId": PLAYERS[i % 2]["id"], "throws": list(throws)}
+                  for i, throws in enumerate(turns)],
+    }
+
+
+def test_bust_takes_the_turn_back():
+    scorer = X01Scorer()
+    scorer.on_state(state([dart(20, 3), dart(20), dart(1)]))
+    assert scorer.remaining(0) == 20 and scorer.players[0].darts == 3
+
+    # 20 left on double out: a single 19 leaves 1, which busts.
+    scorer.on_state(state([dart(20, 3), dart(20), dart(1)], [dart(5)], [dart(19)]))
+    player = scorer.players[0]
+    assert player.busts == 1 and player.remaining == 20 and player.darts_left == 0
+    assert player.points == 81 and player.darts == 4
+
+    scorer.on_state(state([dart(20, 3), dart(20), dart(1)], [dart(5)], [dart(19)], [dart(1)], [dart(10, 2)]))
+    assert scorer.remaining(0) == 0 and scorer.players[0].points == 101
+
+
+def test_undo_reverts_points_and_darts():
+    scorer = X01Scorer()
+    scorer.on_state(state([dart(20, 3), dart(20)]))
+    assert scorer.remaining(0) == 21 and scorer.players[0].darts == 2
+
+    scorer.on_state(state([dart(20, 3)]))
+    player = scorer.players[0]
+    assert (player.remaining, player.darts, player.points) == (41, 1, 60)
+
+    scorer.on_state(state([dart(20, 3), dart(5)]))
+    assert (player.remaining, player.darts, player.points) == (36, 2, 65)
+
+
+def test_undo_of_a_bust_and_of_a_removed_turn():
+    scorer = X01Scorer()
+    scorer.on_state(state([dart(20, 3), dart(20), dart(1)], [dart(1)], [dart(19)]))
+    assert scorer.players[0].busts == 1
+
+    # Undoing the busting dart.
+    scorer.on_state(state([dart(20, 3), dart(20), dart(1)], [dart(1)], []))
+    player = scorer.players[0]
+    assert (player.busts, player.remaining, player.darts, player.points) == (0, 20, 3, 81)
+
+    # Undoing back into the turn of the other player removes the empty turn.
+    scorer.on_state(state([dart(20, 3), dart(20), dart(1)], []))
+    assert scorer.remaining(1) == 101 and scorer.players[1].darts == 0
+    assert scorer.remaining(0) == 20
+
+
+def test_cursor_resumes_from_the_last_turn():
+    cursor = ThrowCursor()
+    assert len(cursor.advance(state([dart(1), dart(2), dart(3)], [dart(4)]))) == 4
+    assert [throw["segment"]["number"] for _, throw in
+            cursor.advance(state([dart(1), dart(2), dart(3)], [dart(4), dart(5)], [dart(6)]))] == [5, 6]
+    assert not cursor.rewound
+
+    assert cursor.advance(state([dart(1), dart(2), dart(3)], [dart(4), dart(5)])) == []
+    assert cursor.rewound and cursor.rewound_turns == [("t2", None)]
+
+
+def test_correction_shifts_points_and_survives_an_undo():
+    scorer = X01Scorer()
+    frame = state([dart(20, 3), dart(20)])
+    # The server counted a 10 instead of the 20.
+    frame["gameScores"] = [31, 101]
+    scorer.on_state(frame)
+    player = scorer.players[0]
+    assert scorer.mismatches == 1
+    assert (player.remaining, player.points, player.darts) == (31, 70, 2)
+
+    frame = state([dart(20, 3)])
+    frame["gameScores"] = [41, 101]
+    scorer.on_state(frame)
+    assert scorer.mismatches == 1
+    assert (player.remaining, player.points, player.darts, player.busts) == (41, 60, 1, 0)
@@ -0,0 +1,86 @@
+import asyncio
+
+from autodarts.endpoint import AutoDartEndpointWs
+from autodarts.selectors import darts_left
+
+
+class Response:
+    ok = True
+    status = 200
+
+
+async def sent():
+    return Response()
+
+
+def entity():
+    return AutoDartEndpointWs({"id": "board-1", "state": {"running": False, "numThrows": 0, "status": "Ready"}},
+                              None, "boards/", "autodarts.boards")
+
+
+def test_frames_not_touching_the_deps_do_not_recompute():
+    async def main():
+        board = entity()
+        selector = board.select(lambda state: state["numThrows"] * 2, ["numThrows"])
+        assert selector.value == 0 and selector.computations == 1
+        await board.on_state_message({"event": "Takeout started", "status": "Takeout"})
+        # The same value again is no change either.
+        await board.on_state_message({"event": "Throw detected", "numThrows": 0})
+        assert selector.value == 0 and selector.computations == 1 and not selector.stale
+        await board.on_state_message({"event": "Throw detected", "numThrows": 2})
+        assert selector.stale
+        assert selector.value == 4 and selector.computations == 2
+
+    asyncio.run(main())
+
+
+def test_subscribers_are_notified_only_when_the_value_changes():
+    async def main():
+        board = entity()
+        changes = []
+        selector = board.select(lambda state: state["numThrows"] > 0, ["numThrows"], name="thrown")
+        selector.subscribe(lambda value, previous: changes.append((value, previous)))
+        for count in (1, 2, 3):
+            await board.on_state_message({"event": "Throw detected", "numThrows": count})
+        assert changes == [(True, False)] and selector.computations == 4
+        await board.on_state_message({"event": "Takeout finished", "numThrows": 0})
+        assert changes == [(True, False), (False, True)]
+
+        selector.close()
+        assert board.selectors == [] and "numThrows" not in board._key_versions
+
+    asyncio.run(main())
+
+
+def test_optimistic_changes_and_invalidation_bump_versions():
+    async def main():
+        board = entity()
+        board.optimistic = True
+        changes = []
+        selector = board.select(lambda state: state["running"], ["running"])
+        selector.subscribe(lambda value, previous: changes.append(value))
+        version = board._key_versions["running"]
+
+        await board.async_optimistic("start", sent(), {"running": True})
+        assert board._key_versions["running"] > version and changes == [True]
+        version = board._key_versions["running"]
+        # The board says it is stopped: the start is rolled back.
+        await board.on_state_message({"event": "Stopped", "running": False})
+        assert board._key_versions["running"] > version and changes == [True, False]
+
+        # A state change other than by frames, as a REST load.
+        board.ws_data["running"] = True
+        assert selector.value is False
+        board.invalidate_selectors()
+        assert selector.value is True and changes == [True, False, True]
+
+    asyncio.run(main())
+
+
+def test_depends_on_declares_the_deps():
+    board = entity()
+    selector = board.select(darts_left)
+    assert selector.deps == ("turns",) and selector.value == 3
+    board.ws_data["turns"] = [{"throws": [{}]}]
+    board.invalidate_selectors()
+    assert selector.value == 2
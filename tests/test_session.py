@@ -0,0 +1,43 @@
+import asyncio
+
+from autodarts import AutoDartSession
+from autodarts.testing import FakeAutodartsServer
+
+
+def test_session_created_outside_a_loop():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(FakeAutodartsServer().start())
+    session = AutoDartSession(**server.session_kwargs())
+    assert session.loop is None
+
+    async def main():
+        response = await session.get(server.url + "/bs/v0/boards/")
+        assert response.ok
+        assert session.loop is asyncio.get_running_loop()
+        await session.async_close()
+        assert session.session is None
+        await server.close()
+
+    try:
+        loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+
+def test_session_closed_before_use():
+    session = AutoDartSession(**FakeAutodartsServer().session_kwargs())
+    assert session.close() is None
+    assert session.session is None
+
+
+def test_session_bound_to_running_loop():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session = AutoDartSession(**server.session_kwargs())
+            assert session.loop is asyncio.get_running_loop()
+            response = await session.get(server.url + "/bs/v0/boards/")
+            assert response.ok
+            await session.async_close()
+            await session.async_close()
+
+    asyncio.run(main())
@@ -0,0 +1,149 @@
+import asyncio
+
+from autodarts.sharding import HashRing, ShardCoordinator
+
+IDS = [f"board-{i}" for i in range(1000)]
+
+
+class Commands(list):
+    """Command queue of a fake worker."""
+
+    put = list.append
+
+
+class Process:
+    def __init__(self) -> None:
+        self.alive = True
+        self.exitcode = None
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def join(self, timeout=None) -> None:
+        self.alive = False
+
+    def terminate(self) -> None:
+        self.alive = False
+
+
+def _coordinator(*workers):
+    coordinator = ShardCoordinator({}, workers=0)
+    for worker in workers:
+        coordinator.ring.add(worker)
+        coordinator._commands[worker] = Commands()
+        coordinator._processes[worker] = Process()
+    return coordinator
+
+
+def test_hash_ring_moves_only_the_keys_of_the_new_node():
+    ring = HashRing(["a", "b", "c"])
+    before = {key: ring.node_for(key) for key in IDS}
+    ring.add("d")
+    after = {key: ring.node_for(key) for key in IDS}
+    moved = [key for key in IDS if before[key] != after[key]]
+    assert all(after[key] == "d" for key in moved)
+    assert 0.1 < len(moved) / len(IDS) < 0.4
+
+    ring.remove("d")
+    assert {key: ring.node_for(key) for key in IDS} == before
+
+
+def test_moved_entity_switches_worker_once_the_new_one_is_subscribed():
+    async def main():
+        coordinator = _coordinator("old")
+        frames = []
+        coordinator.register_callback(lambda frame: frames.append((frame.worker, frame.data["n"])))
+        coordinator.subscribe("board", "b1")
+        assert coordinator._commands["old"] == [("subscribe", "board", "b1")]
+        await coordinator._async_on_message(("subscribed", "old", "board", "b1", {"n": 0}))
+        assert coordinator.owners["b1"] == "old"
+
+        coordinator.ring.remove("old")
+        coordinator.ring.add("new")
+        coordinator._commands["new"] = Commands()
+        assert coordinator._rebalance() == ["b1"]
+        assert coordinator._commands["new"] == [("subscribe", "board", "b1")]
+
+        # Make before break: the old worker keeps the entity until the new one has it.
+        await coordinator._async_on_message(("frame", "old", "board", "b1", "state", {"n": 1}))
+        await coordinator._async_on_message(("subscribed", "new", "board", "b1", {"n": 1}))
+        assert coordinator.owners["b1"] == "new"
+        assert coordinator._commands["old"][-1] == ("unsubscribe", "board", "b1")
+        await coordinator._async_on_message(("frame", "old", "board", "b1", "state", {"n": 2}))
+        await coordinator._async_on_message(("frame", "new", "board", "b1", "state", {"n": 2}))
+        assert frames == [("old", 1), ("new", 2)]
+
+    asyncio.run(main())
+
+
+def test_exited_worker_is_removed_and_its_entities_moved():
+    async def main():
+        coordinator = _coordinator("a", "b")
+        coordinator.watch_interval = 0.01
+        ids = IDS[:50]
+        for id in ids:
+            coordinator.subscribe("board", id)
+            await coordinator._async_on_message(("subscribed", coordinator.shard_of(id), "board", id, {}))
+        lost = [id for id in ids if coordinator.owners[id] == "a"]
+        assert lost and len(lost) < len(ids)
+
+        coordinator._processes["a"].alive = False
+        watcher = asyncio.create_task(coordinator._async_watch())
+        await asyncio.sleep(0.05)
+        watcher.cancel()
+
+        assert coordinator.workers == ["b"] and "a" not in coordinator._commands
+        assert all(id not in coordinator.owners for id in lost)
+        assert [command[2] for command in coordinator._commands["b"][len(ids) - len(lost):]] == lost
+        # A late ack of the exited worker is ignored.
+        await coordinator._async_on_message(("subscribed", "a", "board", lost[0], {}))
+        assert lost[0] not in coordinator.owners
+
+    asyncio.run(main())
+
+
+def test_removed_worker_passes_frames_until_its_entities_moved():
+    async def main():
+        coordinator = _coordinator("a", "b")
+        frames = []
+        coordinator.register_callback(lambda frame: frames.append((frame.id, frame.worker)))
+        ids = IDS[:50]
+        for id in ids:
+            coordinator.subscribe("board", id)
+            await coordinator._async_on_message(("subscribed", coordinator.shard_of(id), "board", id, {}))
+        moved = [id for id in ids if coordinator.owners[id] == "a"]
+        commands = coordinator._commands["a"]
+
+        remove = asyncio.create_task(coordinator.async_remove_worker("a"))
+        await asyncio.sleep(0.01)
+        assert not remove.done() and coordinator.workers == ["b"]
+        assert all(coordinator.owners[id] == "a" for id in moved)
+        assert [command[2] for command in coordinator._commands["b"][len(ids) - len(moved):]] == moved
+
+        # The old worker keeps the entities until the new one acks each.
+        await coordinator._async_on_message(("frame", "a", "board", moved[0], "state", {}))
+        for id in moved:
+            await coordinator._async_on_message(("subscribed", "b", "board", id, {}))
+        await coordinator._async_on_message(("frame", "a", "board", moved[0], "state", {}))
+        await asyncio.wait_for(remove, 1)
+
+        assert frames == [(moved[0], "a")]
+        assert all(coordinator.owners[id] == "b" for id in ids)
+        assert commands[-1] == ("stop",)
+        assert [command[2] for command in commands[len(moved):-1]] == moved
+        assert "a" not in coordinator._processes and not coordinator._subscribed
+
+    asyncio.run(main())
+
+
+def test_removed_worker_is_stopped_after_the_timeout():
+    async def main():
+        coordinator = _coordinator("a", "b")
+        for id in IDS[:20]:
+            coordinator.subscribe("board", id)
+            await coordinator._async_on_message(("subscribed", coordinator.shard_of(id), "board", id, {}))
+        await coordinator.async_remove_worker("a", timeout=0.01)
+        assert set(coordinator.owners.values()) == {"b"}
+        assert "a" not in coordinator._commands and not coordinator._subscribed
+
+    asyncio.run(main())
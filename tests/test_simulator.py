@@ -0,0 +1,66 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from autodarts import classify_codes
+from autodarts.segments import (BULL_RADIUS, DOUBLE_INNER_RADIUS, DOUBLE_OUTER_RADIUS, OUTER_BULL_RADIUS, SEGMENTS,
+                                TRIPLE_INNER_RADIUS, TRIPLE_OUTER_RADIUS, classify_code, target_point)
+from autodarts.simulator import ThrowSimulator, checkout_routes
+
+EDGES = (BULL_RADIUS, OUTER_BULL_RADIUS, TRIPLE_INNER_RADIUS, TRIPLE_OUTER_RADIUS, DOUBLE_INNER_RADIUS,
+         DOUBLE_OUTER_RADIUS)
+
+
+def assert_same_codes(xs, ys):
+    expected = [classify_code(x, y) for x, y in zip(xs.tolist(), ys.tolist())]
+    assert classify_codes(xs, ys).tolist() == expected
+
+
+def test_classify_codes_matches_classify_code():
+    rng = np.random.default_rng(0)
+    assert_same_codes(rng.uniform(-1.1, 1.1, 20000), rng.uniform(-1.1, 1.1, 20000))
+
+
+def test_classify_codes_next_to_ring_and_sector_edges():
+    # Exactly on a sector edge, numpy and math atan2 may differ by an ulp, so only next to it.
+    radii = np.array([edge * factor for edge in EDGES for factor in (1 - 1e-12, 1 + 1e-12)])
+    angles = np.radians(np.arange(-9.0, 360.0, 18.0))
+    r, a = np.meshgrid(radii, np.concatenate([angles + 1e-9, angles - 1e-9]))
+    assert_same_codes((r * np.sin(a)).ravel(), (r * np.cos(a)).ravel())
+    # On the axes the radius is exact, so the ring edges themselves agree.
+    edges = np.array(EDGES)
+    assert_same_codes(np.concatenate([edges, np.zeros(6), [0.0]]),
+                      np.concatenate([np.zeros(6), [math.nextafter(edge, 2) for edge in EDGES], [0.0]]))
+
+
+def test_target_points_hit_their_segment():
+    for code, (name, _, _) in enumerate(SEGMENTS):
+        assert classify_code(*target_point(name)) == code, name
+
+
+def test_checkout_routes():
+    assert checkout_routes(170) == [("T20", "T20", "Bull")]
+    assert checkout_routes(2) == [("D1",)]
+    assert checkout_routes(3) == [("S1", "D1")]
+    assert checkout_routes(3, "Straight") == [("S3",), ("T1",)]
+    assert checkout_routes(100) == [("Bull", "Bull"), ("T20", "D20")]
+    assert checkout_routes(171) == []
+
+
+def test_best_checkouts_are_seeded_and_sorted():
+    odds = ThrowSimulator(seed=1).best_checkouts(40, sigma=0.06, visits=5000)
+    assert odds == ThrowSimulator(seed=1).best_checkouts(40, sigma=0.06, visits=5000)
+    assert odds[0][0] == ("D20",)
+    assert [chance for _, chance in odds] == sorted((chance for _, chance in odds), reverse=True)
+    assert all(0 <= chance <= 1 for _, chance in odds)
+
+
+def test_sigma_for_ppr_inverts_ppr():
+    sim = ThrowSimulator(seed=2)
+    ppr = sim.ppr(0.08, visits=300000)
+    assert 40 < ppr < 100
+    assert sim.sigma_for_ppr(ppr) == pytest.approx(0.08, abs=0.003)
+    # Tighter throws score more.
+    assert sim.ppr(0.04, visits=300000) > ppr
@@ -0,0 +1,46 @@
+import asyncio
+import struct
+
+import pytest
+
+from autodarts import CloudBoard, Match
+from autodarts.snapshot import (SNAPSHOT_MAGIC, SNAPSHOT_VERSION, AutoDartSnapshotException, SnapshotStore,
+                                dump_snapshot)
+
+BOARD = {"id": "board-1", "name": "Board 1", "state": {"status": "Throw", "numThrows": 2}}
+MATCH = {"id": "match-1", "variant": "X01", "turns": [{"id": "t0", "throws": [{"segment": {"name": "T20"}}]}]}
+
+
+def test_save_and_restore_round_trip(tmp_path):
+    async def main():
+        path = str(tmp_path / "snapshot.bin")
+        store = SnapshotStore(path, None)
+        board, match = CloudBoard.from_state(None, BOARD), Match.from_state(None, MATCH)
+        store.track(board, match)
+        await store.async_save()
+        assert not (tmp_path / "snapshot.bin.tmp").exists()
+
+        restored = await SnapshotStore(path, None).async_restore()
+        assert [(type(entity), entity.id) for entity in restored] == [(CloudBoard, "board-1"), (Match, "match-1")]
+        assert restored[0]._state == BOARD and restored[1]._state == MATCH
+        assert await SnapshotStore(str(tmp_path / "missing.bin"), None).async_restore() == []
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"NOSNAP" + bytes(5),
+    struct.pack("<6sBI", SNAPSHOT_MAGIC, SNAPSHOT_VERSION + 1, 0),
+    struct.pack("<6sBI", SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 1) + b"not zlib",
+    # Two records announced, none stored.
+    struct.pack("<6sBI", SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 2) + dump_snapshot([])[struct.calcsize("<6sBI"):],
+], ids=["empty", "magic", "version", "payload", "count"])
+def test_corrupted_snapshot_is_rejected(tmp_path, data):
+    async def main():
+        path = tmp_path / "snapshot.bin"
+        path.write_bytes(data)
+        with pytest.raises(AutoDartSnapshotException):
+            await SnapshotStore(str(path), None).async_restore()
+
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+import asyncio
+import math
+
+import pytest
+
+from autodarts import AutoDartSession, User
+from autodarts.stats import BulkStatsFetcher
+from autodarts.testing import FakeAutodartsServer
+
+np = pytest.importorskip("numpy")
+
+
+class SlowUser:
+    """A user whose stats take a while, counting the requests."""
+
+    def __init__(self, id: str, delay: float = 0.1) -> None:
+        self.id = id
+        self.name = id
+        self.delay = delay
+        self.calls = 0
+
+    async def get_stat(self, variant, limit=10):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return {"average": 50.0 + self.calls}
+
+
+def test_fetch_deduplicates_and_builds_tables():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session = AutoDartSession(**server.session_kwargs())
+            users = [User(session, f"u{i}", server.add_user(f"u{i}")["id"]) for i in range(5)]
+            fetcher = BulkStatsFetcher(session, concurrency=2)
+
+            def stat_requests():
+                return server.counters["requests"] - server.counters["tokens"]
+
+            tables = await fetcher.async_fetch(users + users, ("x01", "cricket"))
+            assert stat_requests() == 10
+            assert len(tables["x01"]) == 10 and not any(math.isnan(v) for v in tables["x01"]["average"])
+            await fetcher.async_fetch(users, ("x01",))
+            assert stat_requests() == 10
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_doesnt_hang_waiters():
+    async def main():
+        fetcher = BulkStatsFetcher(None)
+        user = SlowUser("u1")
+        leader = asyncio.create_task(fetcher.async_get_stat(user, "x01"))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.create_task(fetcher.async_get_stat(user, "x01"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        payload = await asyncio.wait_for(waiter, 2)
+        assert payload == {"average": 52.0} and user.calls == 2
+        assert not fetcher._inflight
+
+        # A cancelled waiter leaves the call running for the others.
+        fetcher.clear_cache()
+        first = asyncio.create_task(fetcher.async_get_stat(user, "x01"))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(fetcher.async_get_stat(user, "x01"))
+        await asyncio.sleep(0.01)
+        second.cancel()
+        assert await asyncio.wait_for(first, 2) == {"average": 53.0}
+        assert second.cancelled() and user.calls == 3
+
+    asyncio.run(main())
+
+
+def test_cache_is_bounded():
+    async def main():
+        fetcher = BulkStatsFetcher(None, max_cached=3)
+        users = [SlowUser(f"u{i}", delay=0) for i in range(5)]
+        for user in users:
+            await fetcher.async_get_stat(user, "x01")
+        assert [key[0] for key in fetcher._cache] == ["u2", "u3", "u4"]
+        await fetcher.async_get_stat(users[4], "x01")
+        assert users[4].calls == 1
+
+    asyncio.run(main())
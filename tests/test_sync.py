@@ -0,0 +1,75 @@
+import socket
+import threading
+import time
+
+from autodarts import CloudBoard, SyncClient
+from autodarts.testing import FakeAutodartsServer
+
+
+def wait_until(predicate, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.01)
+
+
+def start_client():
+    # The server runs on the client loop, on a port known before the session is created.
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = FakeAutodartsServer(port=port)
+    client = SyncClient(**server.session_kwargs())
+    client.run(server.start())
+    return server, client
+
+
+def test_proxy_runs_plain_methods_on_the_loop_thread():
+    server, client = start_client()
+    try:
+        board_id = server.add_board()["id"]
+        board = client.proxy(client.run(CloudBoard.from_id(client.session, board_id)))
+        assert board.name == board_id
+        leave = board.connect()
+        wait_until(lambda: server.subscriber_count("autodarts.boards") == 2)
+        unregister = board.register_callback(lambda state: None)
+        assert client.call(board._target.callbacks.count, "state") == 1
+        unregister()
+        assert client.call(board._target.callbacks.count, "state") == 0
+        leave()
+        wait_until(lambda: server.subscriber_count("autodarts.boards") == 0)
+    finally:
+        client.run(server.close())
+        client.close()
+
+
+def test_callbacks_get_copies_in_frame_order():
+    server, client = start_client()
+    try:
+        board_id = server.add_board()["id"]
+        entity = client.run(CloudBoard.from_id(client.session, board_id))
+        received, threads = [], set()
+
+        def on_state(state):
+            threads.add(threading.current_thread().name)
+            state["state"]["throws"].append("changed")
+            received.append(state["state"]["status"])
+
+        client.register_callback(entity, on_state)
+        client.connect(entity)
+        wait_until(lambda: server.subscriber_count("autodarts.boards") == 2)
+        for index in range(30):
+            client.run(server.publish_board(board_id, status=f"s{index}", throws=[]))
+        wait_until(lambda: len(received) == 30)
+        assert received == [f"s{index}" for index in range(30)]
+        assert len(threads) == 1 and threading.current_thread().name not in threads
+        assert client.call(lambda: entity.ws_data["throws"]) == []
+
+        frames = client.register_callback(entity)
+        client.run(server.publish_board(board_id, status="queued"))
+        assert frames.get(timeout=5)["state"]["status"] == "queued"
+        frames.unregister()
+        client.disconnect(entity)
+    finally:
+        client.run(server.close())
+        client.close()
@@ -0,0 +1,78 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from autodarts.throwlog import MAX_DELTA, RECORD_STRUCT, ThrowLogReader, ThrowLogWriter
+
+
+def throw(name, x=0.0, y=0.0):
+    return {"segment": {"name": name}, "coords": {"x": x, "y": y}}
+
+
+def state(*turns, finished=False):
+    return {"id": "m1", "finished": finished, "turns": [
+        {"id": f"t{index}", "playerId": player, "round": index // 2 + 1, "throws": list(throws)}
+        for index, (player, throws) in enumerate(turns)
+    ]}
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "throws.log")
+    with ThrowLogWriter(path) as writer:
+        writer.match_state(state(("p1", [throw("T20", 0.1, 0.5)])), ts=1000.0)
+        writer.match_state(state(("p1", [throw("T20", 0.1, 0.5), throw("S5")])), ts=1001.0)
+        writer.match_state(state(("p1", [throw("T20", 0.1, 0.5), throw("S5")]), ("p2", [throw("D16")])), ts=1002.5)
+    reader = ThrowLogReader(path)
+    assert len(reader) == 3
+    assert reader.points.tolist() == [60, 5, 32]
+    assert reader.dart.tolist() == [0, 1, 0]
+    assert reader.round.tolist() == [1, 1, 1]
+    assert reader.timestamps.tolist() == [1000.0, 1001.0, 1002.5]
+    assert reader.player_mask("p2").tolist() == [False, False, True]
+    assert [record["segment"] for record in reader] == ["T20", "S5", "D16"]
+    assert reader.x[0] == pytest.approx(0.1)
+
+
+def test_undone_throws_are_retracted(tmp_path):
+    path = str(tmp_path / "throws.log")
+    with ThrowLogWriter(path) as writer:
+        writer.match_state(state(("p1", [throw("T20"), throw("S1")])), ts=1.0)
+        # Undo the second dart, then rethrow it.
+        writer.match_state(state(("p1", [throw("T20")])), ts=2.0)
+        writer.match_state(state(("p1", [throw("T20"), throw("T19")])), ts=3.0)
+        writer.match_state(state(("p1", [throw("T20"), throw("T19")]), ("p2", [throw("S20")])), ts=4.0)
+        # Undo into the previous turn: the whole last turn goes.
+        writer.match_state(state(("p1", [throw("T20"), throw("T19")])), ts=5.0)
+        writer.match_state(state(("p1", [throw("T20"), throw("T19")]), ("p2", [throw("D20")])), ts=6.0)
+    reader = ThrowLogReader(path)
+    assert len(reader) == 3
+    assert reader.points.tolist() == [60, 57, 40]
+    assert reader.segment_counts() == {"T20": 1, "T19": 1, "D20": 1}
+    assert reader.timestamps.tolist() == [1.0, 3.0, 6.0]
+
+
+def test_reopen_appends_and_drops_partial_record(tmp_path):
+    path = str(tmp_path / "throws.log")
+    with ThrowLogWriter(path) as writer:
+        writer.append("m1", "p1", "T20", ts=10.0)
+    with open(path, "ab") as f:
+        f.write(b"\1" * (RECORD_STRUCT.size // 2))
+    with ThrowLogWriter(path) as writer:
+        writer.append("m1", "p2", "S1", ts=12.0)
+    reader = ThrowLogReader(path)
+    assert reader.points.tolist() == [60, 1]
+    assert reader.timestamps.tolist() == [10.0, 12.0]
+    assert reader.ids == ["m1", "p1", "p2"]
+
+
+def test_gap_records(tmp_path):
+    path = str(tmp_path / "throws.log")
+    later = 1.0 + (5 * MAX_DELTA // 2) / 1000
+    with ThrowLogWriter(path) as writer:
+        writer.append("m1", "p1", "T20", ts=1.0)
+        writer.append("m1", "p1", "S20", ts=later)
+    reader = ThrowLogReader(path)
+    assert len(reader.records) == 4
+    assert len(reader) == 2
+    assert reader.points.tolist() == [60, 20]
+    assert reader.timestamps.tolist() == [1.0, later]
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from autodarts import AutoDartSession, CloudBoard, Lobby
+from autodarts.tournament import Fixture, TournamentScheduler, round_robin
+from autodarts.testing import FakeAutodartsServer
+
+SETTINGS = {"baseScore": 101, "inMode": "Straight", "outMode": "Straight"}
+PLAYERS = [{"name": "ann"}, {"name": "bob"}, {"name": "cid"}, {"name": "dan"}]
+
+
+async def _scheduler(server, fixtures, boards=2):
+    session = AutoDartSession(**server.session_kwargs())
+    pool = [await CloudBoard.from_id(session, server.add_board()["id"]) for _ in range(boards)]
+    scheduler = TournamentScheduler(session, pool, fixtures, "X01", SETTINGS)
+    # The fake matches may finish before the subscription.
+    scheduler.poll_interval = 0.2
+    return session, scheduler
+
+
+def test_round_robin_plays_every_fixture():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session, scheduler = await _scheduler(server, round_robin(PLAYERS))
+            fixtures = await asyncio.wait_for(scheduler.async_run(), 30)
+            assert len(fixtures) == 6
+            assert all(fixture.status == Fixture.FINISHED and fixture.winner for fixture in fixtures)
+            assert len(server.matches) == 6
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+def test_failed_setup_deletes_its_lobby():
+    async def main():
+        async with FakeAutodartsServer() as server:
+            session = AutoDartSession(**server.session_kwargs())
+            with pytest.raises(Exception):
+                await Lobby.async_setup_match(session, "X01", SETTINGS, [{"name": "ann", "boardId": "nowhere"}],
+                                              connect=False)
+            assert not server.lobbies and not server.matches
+            await session.async_close()
+
+    asyncio.run(main())
+
+
+def test_error_while_following_doesnt_set_the_match_up_again():
+    async def main():
+        async with FakeAutodartsServer(autoplay=False) as server:
+            session, scheduler = await _scheduler(server, round_robin(PLAYERS[:2]), boards=1)
+
+            async def lost(match):
+                raise ConnectionError("network down")
+
+            scheduler._async_wait_finished = lost
+            fixtures = await asyncio.wait_for(scheduler.async_run(), 10)
+            assert fixtures[0].status == Fixture.FAILED and fixtures[0].attempts == 1
+            assert len(server.matches) == 1
+            await session.async_close()
+
+    asyncio.run(main())